@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-window CPU time and allocations of audio preprocessing
+Compares the old temporary-heavy pipeline against AudioPreprocessor
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.audio_preprocessor import AudioPreprocessor
+
+SAMPLE_RATE = 16000
+
+
+def legacy_pipeline(audio_data):
+    """The original record_and_transcribe_fast preprocessing"""
+    if np.any(np.isnan(audio_data)) or np.any(np.isinf(audio_data)):
+        return None
+    audio_squared = audio_data**2
+    audio_squared = np.nan_to_num(audio_squared, nan=0.0, posinf=0.0, neginf=0.0)
+    volume = np.sqrt(np.mean(audio_squared))
+    if volume < 0.001 or np.isnan(volume) or np.isinf(volume):
+        return None
+    audio_data = np.clip(audio_data * 3.0, -1.0, 1.0)
+    audio_data = np.nan_to_num(audio_data, nan=0.0, posinf=1.0, neginf=-1.0)
+    return (audio_data.flatten() * 32767).astype(np.int16).tobytes()
+
+
+def preprocessor_pipeline(preprocessor, audio_data):
+    """The buffered AudioPreprocessor path used by the assistant"""
+    volume, peak = preprocessor.measure(audio_data)
+    if np.isnan(volume) or volume < 0.001:
+        return None
+    gain = preprocessor.update_gain(volume, peak)
+    return preprocessor.to_pcm16(audio_data, gain)
+
+
+def bench(label, fn, windows, iterations):
+    """Time fn over the windows and measure the largest traced allocation peak of any window"""
+    # Warm up (first-touch page faults, buffer creation)
+    for window in windows[:3]:
+        fn(window)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(windows[i % len(windows)])
+    elapsed = time.perf_counter() - start
+
+    worst = 0
+    tracemalloc.start()
+    for window in windows:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        fn(window)
+        _, peak = tracemalloc.get_traced_memory()
+        worst = max(worst, peak - baseline)
+    tracemalloc.stop()
+
+    per_window_us = elapsed / iterations * 1e6
+    print(f"{label:<22} {per_window_us:>10.1f} µs/window   peak alloc {worst / 1024:>8.1f} KiB/window (max)")
+
+
+def main():
+    iterations = int(os.getenv('BENCH_ITERATIONS', '500'))
+    rng = np.random.default_rng(0)
+
+    print("🧪 Audio preprocessing microbenchmark")
+    print("=" * 70)
+
+    for seconds in (2, 8):
+        frames = seconds * SAMPLE_RATE
+        windows = [
+            (rng.standard_normal((frames, 1)) * 0.02).astype(np.float32)
+            for _ in range(8)
+        ]
+        preprocessor = AudioPreprocessor(max_samples=frames)
+
+        print(f"\n{seconds}s window ({frames} samples)")
+        bench("legacy", legacy_pipeline, windows, iterations)
+        bench("AudioPreprocessor", lambda w: preprocessor_pipeline(preprocessor, w), windows, iterations)
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
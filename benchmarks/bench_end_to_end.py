@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark
+Drives AutoVoiceAssistant turns from WAV fixtures against local fake OpenAI, Ollama
+and Telegram backends - no audio devices or network needed
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import contextlib
+from collections import defaultdict
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fakes import (
+    FakeServiceConfig, FakeServices, FakeTelegramClient, FixturePlayer,
+    install_fake_devices, install_fake_mcp_telegram, synth_utterance, write_wav, read_wav
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# (fixture, seconds, has speech, transcript) - one conversation per iteration
+SCENARIO = [
+    ("activation.wav", 2, True, "Hello"),
+    ("send_message.wav", 8, True, "Send message to alice saying I'll be late"),
+    ("chat.wav", 8, True, "What's a good name for a cat"),
+    ("follow_up.wav", 8, True, "Also tell her to bring snacks"),
+    ("silence.wav", 8, False, ""),
+    ("goodbye.wav", 8, True, "Goodbye"),
+]
+WARMUP = [("silence.wav", 2, False, "")] * 5  # Lets the noise floor settle
+
+BENCH_CONTACTS = {"alice": "@alice_bench", "bob": "@bob_bench"}
+
+
+def ensure_fixtures(fixtures_dir: str) -> dict:
+    """Load WAV fixtures, synthesizing any that are missing"""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    audio = {}
+    for seed, (name, seconds, speech, _) in enumerate(SCENARIO + WARMUP[:1]):
+        path = os.path.join(fixtures_dir, name)
+        if not os.path.exists(path):
+            write_wav(path, synth_utterance(seconds, speech, seed))
+        audio[name] = read_wav(path)
+    return audio
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(q * len(values) + 0.999999) - 1))]
+
+
+async def drive(assistant, player: FixturePlayer, timeout: float) -> tuple:
+    """
+    Run the orchestrator until every fixture window has been consumed and handled
+
+    Returns:
+        (completed, sends went through the in-process MCP mount)
+    """
+    task = asyncio.create_task(assistant.run_async())
+    deadline = time.monotonic() + timeout
+    mounted = False
+    try:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+            if task.done():
+                task.result()
+            mounted = mounted or assistant.mcp_client is not None  # Cleared when run_async exits
+            if player.exhausted.is_set() and assistant._idle.is_set() and assistant.event_bus.depth == 0:
+                return True, mounted
+        return False, mounted
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end voice assistant benchmark")
+    parser.add_argument("--iterations", type=int, default=5, help="Conversations to run")
+    parser.add_argument("--realtime", action="store_true", help="Make sd.rec take the window's real duration")
+    parser.add_argument("--transcribe-latency", type=float, default=0.15)
+    parser.add_argument("--intent-latency", type=float, default=0.4)
+    parser.add_argument("--intent-token-latency", type=float, default=0.005)
+    parser.add_argument("--ollama-first-token", type=float, default=0.2)
+    parser.add_argument("--ollama-token-latency", type=float, default=0.02)
+    parser.add_argument("--telegram-latency", type=float, default=0.12)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--send-path", choices=["mcp", "direct"], default="mcp",
+                        help="Send through the in-process MCP mount (MCP_IN_PROCESS=true) or the shared client")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory of WAV fixtures")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    parser.add_argument("--verbose", action="store_true", help="Show assistant output")
+    args = parser.parse_args()
+
+    config = FakeServiceConfig(
+        transcribe_latency=args.transcribe_latency,
+        intent_latency=args.intent_latency,
+        intent_token_latency=args.intent_token_latency,
+        ollama_first_token=args.ollama_first_token,
+        ollama_token_latency=args.ollama_token_latency,
+        telegram_latency=args.telegram_latency,
+        tts_latency=args.tts_latency
+    )
+    services = FakeServices(config).start()
+
+    # Point every client at the fakes before the assistant modules read their config
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{services.base_url}/v1",
+        "OLLAMA_BASE_URL": services.base_url,
+        "ENABLE_TELEGRAM_LISTENER": "false",
+        "LOG_DIR": tempfile.mkdtemp(prefix="gemma-bench-"),  # Keep logs/ untouched
+        "MEMORY_PATH": "",  # Keep data/ untouched
+        "MCP_IN_PROCESS": "true" if args.send_path == "mcp" else "false",
+    })
+
+    player = FixturePlayer(services, realtime=args.realtime)
+    install_fake_devices(player, config.tts_latency)
+
+    from src.core import tracing
+    tracing._tracer = tracing.Tracer(max_turns=100000)
+    from src.core.auto_voice_assistant import AutoVoiceAssistant
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+    else:
+        logging.getLogger().addHandler(logging.NullHandler())
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    telegram = FakeTelegramClient(config.telegram_latency)
+    with output:
+        if args.send_path == "mcp" and not install_fake_mcp_telegram(telegram):
+            print("⚠️ Telegram MCP server can't be loaded - sends will use the shared client", file=sys.stderr)
+        assistant = AutoVoiceAssistant()
+        assistant.contacts = dict(BENCH_CONTACTS)
+        assistant.shared_telegram_client = telegram
+        assistant.telegram_enabled = True
+        assistant.ollama.warm_up()  # As start() does
+
+        audio = ensure_fixtures(args.fixtures)
+        for name, _, _, transcript in WARMUP:
+            player.add(audio[name], transcript)
+        for _ in range(args.iterations):
+            for name, _, _, transcript in SCENARIO:
+                player.add(audio[name], transcript)
+
+        start = time.monotonic()
+        completed, mounted = asyncio.run(drive(assistant, player, timeout=600))
+        wall = time.monotonic() - start
+
+    services.stop()
+
+    stages = assistant.tracer.percentiles()
+    turns = [t for t in assistant.tracer.recent_turns(100000)]
+    by_kind = defaultdict(list)
+    for turn in turns:
+        by_kind[turn.get("action") or turn["kind"]].append(turn["duration_ms"])
+
+    print("🧪 Offline end-to-end benchmark")
+    print("=" * 72)
+    if not completed:
+        print("⚠️  Timed out before all fixtures were handled - results are partial")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'mean ms':>11}")
+    for stage, s in sorted(stages.items()):
+        print(f"{stage:<16}{s['count']:>7}{s['p50_ms']:>11.1f}{s['p95_ms']:>11.1f}{s['p99_ms']:>11.1f}{s['mean_ms']:>11.1f}")
+
+    print("\nEnd-to-end by turn type")
+    for kind, durations in sorted(by_kind.items()):
+        print(f"{kind:<16}{len(durations):>7}{percentile(durations, 0.5):>11.1f}"
+              f"{percentile(durations, 0.95):>11.1f}{percentile(durations, 0.99):>11.1f}")
+
+    print(f"\nTurns: {len(turns)} in {wall:.2f}s → {len(turns) / wall:.2f} turns/s")
+    print(f"Service calls: {services.requests}")
+    if mounted:
+        send_path = "in-process MCP mount"
+    elif args.send_path == "mcp":
+        send_path = "shared client (in-process mount failed)"
+    else:
+        send_path = "shared client (MCP_IN_PROCESS=false)"
+    print(f"Telegram sends: {len(telegram.sent)} via {send_path}")
+    print(f"Speculative chat: {assistant.speculation_stats}")
+    print(f"Ollama prompt tokens evaluated: {services.ollama_prompt_eval}")
+    print(f"Uploaded audio: {services.uploaded_bytes / 1024:.1f} KiB")
+    intent_stats = assistant.intent_parser.get_stats()
+    print(f"Intent tokens ({intent_stats['model']}): {intent_stats['prompt_tokens']} prompt "
+          f"({intent_stats['cached_tokens']} cached), {intent_stats['completion_tokens']} completion "
+          f"over {intent_stats['calls']} calls")
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                "stages": stages,
+                "turns": len(turns),
+                "wall_seconds": wall,
+                "throughput": len(turns) / wall,
+                "service_calls": services.requests,
+                "send_path": "mcp" if mounted else "direct",
+                "uploaded_bytes": services.uploaded_bytes,
+                "intent_tokens": intent_stats
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upload bytes and latency of transcription encoders
+Compares the WAV path with silence-trimmed FLAC and Opus uploads over simulated links
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.transcriber import WavEncoder, get_encoder, trim_silence
+from src.core.noise_gate import db_to_rms
+
+SAMPLE_RATE = 16000
+LINKS_KBPS = (256, 1000, 10000)  # Slow mobile, average DSL, broadband uplink
+
+
+def synth_command_window(seconds=8, speech_start=2.5, speech_seconds=2.0, seed=0):
+    """An 8s window of room noise with a short speech-like burst in the middle"""
+    rng = np.random.default_rng(seed)
+    n = seconds * SAMPLE_RATE
+    audio = rng.standard_normal(n) * 0.003
+
+    t = np.arange(int(speech_seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.5 * (1 - np.cos(2 * np.pi * 3 * t)) * 0.3  # Syllable-rate modulation
+    voiced = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((140, 280, 420, 560, 700), 1))
+    start = int(speech_start * SAMPLE_RATE)
+    audio[start:start + t.shape[0]] += envelope * voiced * 0.4
+
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+
+
+def bench_encoder(label, encoder, pcm, threshold, iterations):
+    """Encode time (ms) and payload size (bytes) for one encoder"""
+    payload = b""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        trimmed = trim_silence(pcm, SAMPLE_RATE, threshold) if threshold else pcm
+        payload = encoder.encode(trimmed, SAMPLE_RATE)
+    encode_ms = (time.perf_counter() - start) / iterations * 1000
+
+    uplink = "   ".join(
+        f"{encode_ms + len(payload) * 8 / kbps:>7.1f} ms @{kbps}kbps" for kbps in LINKS_KBPS
+    )
+    print(f"{label:<18} {len(payload) / 1024:>7.1f} KiB  encode {encode_ms:>6.2f} ms   {uplink}")
+
+
+def main():
+    iterations = int(os.getenv('BENCH_ITERATIONS', '20'))
+    pcm = synth_command_window()
+    threshold = int(0.003 * db_to_rms(3.0) * 32767)  # Same rule as the assistant: floor + gate close SNR
+
+    print("🧪 Transcription upload benchmark (8s command window, 2s of speech)")
+    print("   Latency = encode + uplink transfer (server time excluded)")
+    print("=" * 100)
+
+    bench_encoder("wav (current)", WavEncoder(), pcm, 0, iterations)
+    bench_encoder("wav + trim", WavEncoder(), pcm, threshold, iterations)
+    for name in ("flac", "opus"):
+        encoder = get_encoder(name)
+        if encoder.name != name:
+            print(f"{name:<18} unavailable (install soundfile with libsndfile >= 1.0.29)")
+            continue
+        bench_encoder(f"{name} + trim", encoder, pcm, threshold, iterations)
+
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the benchmark harness
+Fake OpenAI + Ollama HTTP services, a fake Telegram backend and fake audio devices
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import types
+import wave
+import asyncio
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class FakeServiceConfig:
+    """Latency knobs for the fake services (seconds)"""
+
+    def __init__(self, transcribe_latency=0.15, intent_latency=0.4, intent_token_latency=0.005,
+                 ollama_first_token=0.2, ollama_token_latency=0.02, ollama_tokens=20,
+                 ollama_load_latency=1.5, ollama_prompt_token_latency=0.0005,
+                 telegram_latency=0.12, tts_latency=0.3):
+        self.transcribe_latency = transcribe_latency
+        self.intent_latency = intent_latency
+        self.intent_token_latency = intent_token_latency  # Per completion token
+        self.ollama_first_token = ollama_first_token
+        self.ollama_token_latency = ollama_token_latency
+        self.ollama_tokens = ollama_tokens
+        self.ollama_load_latency = ollama_load_latency  # Cold model load
+        self.ollama_prompt_token_latency = ollama_prompt_token_latency  # Per prompt token not in the KV cache
+        self.telegram_latency = telegram_latency
+        self.tts_latency = tts_latency
+
+
+_SEND_PATTERN = re.compile(r"(?:send (?:a )?message to|tell|text|message|notify) (\w+) (?:saying |that |to )?(.+)", re.IGNORECASE)
+
+
+def fake_intent(command: str) -> dict:
+    """Deterministic replacement for the GPT intent parser"""
+    match = _SEND_PATTERN.search(command)
+    if match:
+        return {
+            "action": "send_message",
+            "recipient": match.group(1).lower(),
+            "message": match.group(2),
+            "confidence": 0.95,
+            "reasoning": "fake: send pattern"
+        }
+    return {"action": "general_chat", "recipient": None, "message": None,
+            "confidence": 0.9, "reasoning": "fake: no send pattern"}
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """Clients hang up on purpose (cancelled speculative streams) - don't print a traceback for it"""
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeServices:
+    """One HTTP server speaking enough of the OpenAI and Ollama APIs for the assistant"""
+
+    def __init__(self, config: FakeServiceConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeServiceConfig()
+        self.transcripts = deque()  # Transcript to return for each upload, in order
+        self.requests = {"transcriptions": 0, "chat_completions": 0, "ollama_generate": 0, "ollama_chat": 0,
+                         "ollama_cancelled": 0}
+        self.uploaded_bytes = 0
+        self.ollama_prompt_eval = 0
+        self._ollama_loaded = False
+        self._ollama_prefix = ""  # Prompt text behind the fake KV cache
+        self._lock = threading.Lock()
+
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self) -> bytes:
+                length = int(self.headers.get("Content-Length", 0))
+                return self.rfile.read(length) if length else b""
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.endswith("/api/tags"):
+                    self._send(200, json.dumps({"models": [{"name": "fake"}]}).encode(), "application/json")
+                else:
+                    self._send(404, b"{}", "application/json")
+
+            def do_POST(self):
+                body = self._body()
+                path = self.path.split("?")[0]
+                if path.endswith("/audio/transcriptions"):
+                    services._transcription(self, body)
+                elif path.endswith("/chat/completions"):
+                    services._chat_completion(self, body)
+                elif path.endswith("/api/generate") or path.endswith("/api/chat"):
+                    services._ollama(self, path, body)
+                else:
+                    self._send(404, b"{}", "application/json")
+
+        self.server = _QuietHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="FakeServices")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.requests[key] += 1
+
+    def _transcription(self, handler, body: bytes):
+        self._count("transcriptions")
+        with self._lock:
+            self.uploaded_bytes += len(body)
+            text = self.transcripts.popleft() if self.transcripts else ""
+        time.sleep(self.config.transcribe_latency)
+        handler._send(200, text.encode(), "text/plain")
+
+    def _chat_completion(self, handler, body: bytes):
+        self._count("chat_completions")
+        request = json.loads(body or b"{}")
+        last = request.get("messages", [{}])[-1].get("content", "")
+        command = re.search(r'"([^"\n]*)"\s*$', last)
+        intent = fake_intent(command.group(1) if command else last)
+
+        # A json_schema response only carries the schema's fields
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            properties = response_format["json_schema"]["schema"]["properties"]
+            intent = {key: value for key, value in intent.items() if key in properties}
+
+        content = json.dumps(intent)
+        time.sleep(self.config.intent_latency + self.config.intent_token_latency * (len(content) // 4))
+        response = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": len(body) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": len(body) // 4 + len(content) // 4
+            }
+        }
+        handler._send(200, json.dumps(response).encode(), "application/json")
+
+    def _ollama(self, handler, path: str, body: bytes):
+        is_chat = path.endswith("/api/chat")
+        self._count("ollama_chat" if is_chat else "ollama_generate")
+        request = json.loads(body or b"{}")
+
+        # Cold load unless a previous request pinned the model (Ollama's default keep_alive is 5m)
+        with self._lock:
+            load = 0.0 if self._ollama_loaded else self.config.ollama_load_latency
+            self._ollama_loaded = request.get("keep_alive") not in (0, "0")
+
+        # Only the prompt text past the cached prefix needs evaluating
+        if is_chat:
+            prompt = "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in request.get("messages", []))
+        else:
+            prompt = request.get("prompt", "")
+        with self._lock:
+            common = len(os.path.commonprefix([self._ollama_prefix, prompt]))
+            self._ollama_prefix = prompt
+            prompt_eval = (len(prompt) - common) // 4
+            self.ollama_prompt_eval += prompt_eval
+        time.sleep(load + prompt_eval * self.config.ollama_prompt_token_latency)
+
+        count = min(self.config.ollama_tokens, request.get("options", {}).get("num_predict") or self.config.ollama_tokens)
+        tokens = [f"word{i} " for i in range(count - 1)] + ["done."]
+
+        def chunk(token, done):
+            data = {"model": request.get("model", "fake"), "done": done}
+            if is_chat:
+                data["message"] = {"role": "assistant", "content": token}
+            else:
+                data["response"] = token
+            if done:
+                data["context"] = [1, 2, 3]
+                data["eval_count"] = len(tokens)
+                data["prompt_eval_count"] = prompt_eval
+            return data
+
+        time.sleep(self.config.ollama_first_token)
+        if not request.get("stream", True):
+            time.sleep(self.config.ollama_token_latency * (len(tokens) - 1))
+            final = chunk("".join(tokens), True)
+            handler._send(200, json.dumps(final).encode(), "application/json")
+            return
+
+        # Streaming: newline-delimited JSON with chunked transfer encoding
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.config.ollama_token_latency)
+                line = (json.dumps(chunk(token, i == len(tokens) - 1)) + "\n").encode()
+                handler.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                handler.wfile.flush()
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client dropped the stream (cancelled speculative generation)
+            self._count("ollama_cancelled")
+            handler.close_connection = True
+
+
+class FakeTelegramClient:
+    """Stands in for SharedTelegramClient / the MCP Telegram tools"""
+
+    def __init__(self, latency: float = 0.12):
+        self.latency = latency
+        self.account = "default"
+        self.sent = []
+
+    async def send_message(self, recipient: str, message: str) -> dict:
+        await asyncio.sleep(self.latency)
+        self.sent.append((recipient, message))
+        return {"success": True, "message": f"Message sent to {recipient}",
+                "recipient": recipient, "message_id": len(self.sent), "peer_id": None}
+
+
+def install_fake_mcp_telegram(telegram: FakeTelegramClient) -> bool:
+    """
+    Put the fake behind the Telegram MCP server's tools, so the assistant's
+    in-process mount sends through it - must run before the assistant mounts
+
+    Returns:
+        False if the server module can't be loaded (the assistant then falls back too)
+    """
+    os.environ.setdefault("TELEGRAM_API_ID", "1")  # Never used: no Telethon client is created
+    os.environ.setdefault("TELEGRAM_API_HASH", "bench")
+    try:
+        from src.mcp_servers import telegram_server
+    except Exception:
+        return False
+    telegram_server.telegram_client = telegram
+    telegram_server.account_clients = {telegram.account: telegram}
+    return True
+
+
+def synth_utterance(seconds: float, speech: bool, seed: int = 0) -> np.ndarray:
+    """Float32 mono window: room noise, optionally with a speech-like burst"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    audio = rng.standard_normal(n).astype(np.float32) * 0.002
+    if speech:
+        t = np.arange(n // 2) / SAMPLE_RATE
+        burst = 0.15 * np.sin(2 * np.pi * 180 * t) * (0.5 * (1 - np.cos(2 * np.pi * 3 * t)))
+        audio[n // 4:n // 4 + burst.shape[0]] += burst.astype(np.float32)
+    return audio
+
+
+def write_wav(path: str, audio: np.ndarray):
+    """Save a float32 window as a 16-bit WAV fixture"""
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def read_wav(path: str) -> np.ndarray:
+    """Load a 16-bit mono WAV fixture as float32"""
+    with wave.open(path, 'rb') as wav_file:
+        frames = wav_file.readframes(wav_file.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32767
+
+
+class FixturePlayer:
+    """Feeds WAV fixtures to sd.rec() one window at a time, queueing each transcript"""
+
+    def __init__(self, services: FakeServices, realtime: bool = False):
+        self.services = services
+        self.realtime = realtime
+        self.steps = deque()
+        self.exhausted = threading.Event()
+
+    def add(self, audio: np.ndarray, transcript: str = ""):
+        self.steps.append((audio, transcript))
+        self.exhausted.clear()
+
+    def rec(self, frames, samplerate=None, channels=1, dtype=None, out=None, **kwargs):
+        if out is None:
+            out = np.zeros((frames, channels), dtype=np.float32)
+        out[:] = 0.0
+
+        if self.steps:
+            audio, transcript = self.steps.popleft()
+            n = min(frames, audio.shape[0])
+            out[:n, 0] = audio[:n]
+            if transcript:
+                self.services.transcripts.append(transcript)
+        else:
+            self.exhausted.set()
+            # Quiet room tone so the noise gate drops the window
+            out[:, 0] = np.random.default_rng().standard_normal(frames).astype(np.float32) * 0.002
+            time.sleep(0.05)
+
+        if self.realtime:
+            time.sleep(frames / (samplerate or SAMPLE_RATE))
+        return out
+
+    def wait(self):
+        pass
+
+
+def install_fake_devices(player: FixturePlayer, tts_latency: float):
+    """Register fake sounddevice/pyttsx3 modules - must run before importing the assistant"""
+    sounddevice = types.ModuleType("sounddevice")
+    sounddevice.rec = player.rec
+    sounddevice.wait = player.wait
+    sys.modules["sounddevice"] = sounddevice
+
+    class FakeEngine:
+        def setProperty(self, name, value):
+            pass
+
+        def say(self, text):
+            self._text = text
+
+        def runAndWait(self):
+            time.sleep(tts_latency)
+
+    pyttsx3 = types.ModuleType("pyttsx3")
+    pyttsx3.init = lambda *args, **kwargs: FakeEngine()
+    sys.modules["pyttsx3"] = pyttsx3
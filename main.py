@@ -7,16 +7,18 @@ Run the voice assistant directly from project root
 import sys
 import os
 
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from core.auto_voice_assistant import AutoVoiceAssistant
+from src.core.structured_logging import setup_logging
+from src.core.auto_voice_assistant import AutoVoiceAssistant
 
 def main():
     """Main entry point for Gemma Voice Assistant"""
     print("🎙️  Gemma Voice Assistant")
     print("=" * 30)
     
+    setup_logging()
     assistant = AutoVoiceAssistant()
     assistant.start()
 
@@ -6,13 +6,16 @@ Run the web dashboard from project root
 
 import sys
 import os
+import threading
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from dashboard.dashboard import app
+from dashboard.dashboard import app, follow_events
 
 if __name__ == "__main__":
+    threading.Thread(target=follow_events, daemon=True).start()
+    
     print("🌐 Starting Gemma Dashboard...")
     print("📊 Open: http://localhost:5001")
     print("🎤 Say activation word and watch the dashboard!")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Audio Preprocessor
+Turns float32 capture windows into int16 PCM using preallocated buffers and AGC
+"""
+
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+INT16_FULL_SCALE = 32767.0
+
+
+class AudioPreprocessor:
+    """Allocation-free level measurement, automatic gain control and PCM conversion"""
+
+    def __init__(self, max_samples: int, channels: int = 1,
+                 target_rms: float = None, max_gain: float = None, min_gain: float = None,
+                 attack: float = 0.5, release: float = 0.1):
+        """
+        Args:
+            max_samples: Longest window (in frames) that will ever be processed
+            channels: Number of capture channels
+            target_rms: RMS level the AGC steers speech towards
+            max_gain: Upper bound on the gain applied to quiet input
+            min_gain: Lower bound on the gain applied to loud input
+            attack: Smoothing factor when the gain has to drop (fast, avoids clipping)
+            release: Smoothing factor when the gain can rise (slow, avoids pumping)
+        """
+        self.max_samples = max_samples
+        self.channels = channels
+        self.target_rms = target_rms if target_rms is not None else float(os.getenv('AGC_TARGET_RMS', '0.1'))
+        self.max_gain = max_gain if max_gain is not None else float(os.getenv('AGC_MAX_GAIN', '10.0'))
+        self.min_gain = min_gain if min_gain is not None else float(os.getenv('AGC_MIN_GAIN', '0.5'))
+        self.attack = attack
+        self.release = release
+        self.gain = 3.0  # Matches the old fixed amplification until the AGC settles
+
+        # Reusable buffers - sized once, sliced per window
+        self.capture_buffer = np.zeros((max_samples, channels), dtype=np.float32)
+        self._work = np.empty(max_samples * channels, dtype=np.float32)
+        self._pcm = np.empty(max_samples * channels, dtype=np.int16)
+
+    def capture_view(self, frames: int) -> np.ndarray:
+        """Get a (frames, channels) view of the capture buffer for sd.rec(out=...)"""
+        if frames > self.max_samples:
+            raise ValueError(f"Window of {frames} frames exceeds buffer of {self.max_samples}")
+        return self.capture_buffer[:frames]
+
+    def measure(self, audio: np.ndarray) -> tuple:
+        """
+        Compute RMS and peak of a window without temporaries
+
+        Args:
+            audio: float32 samples (any shape, must be contiguous)
+
+        Returns:
+            (rms, peak) - both NaN if the window contains NaN/inf samples
+        """
+        samples = audio.reshape(-1)
+        n = samples.shape[0]
+        if n == 0:
+            return 0.0, 0.0
+
+        work = self._work[:n]
+        np.abs(samples, out=work)
+        # NaN/inf anywhere propagates into the sum, so one check replaces isnan/isinf scans
+        sum_squares = float(np.dot(work, work))
+        if not np.isfinite(sum_squares):
+            return float('nan'), float('nan')
+
+        return (sum_squares / n) ** 0.5, float(work.max())
+
+    def update_gain(self, rms: float, peak: float) -> float:
+        """Move the AGC gain towards the target level, never letting peaks clip"""
+        if rms <= 0.0:
+            return self.gain
+
+        desired = min(max(self.target_rms / rms, self.min_gain), self.max_gain)
+        if peak > 0.0:
+            desired = min(desired, 0.99 / peak)
+
+        coeff = self.attack if desired < self.gain else self.release
+        self.gain += coeff * (desired - self.gain)
+        return self.gain
+
+    def to_pcm16(self, audio: np.ndarray, gain: float = None) -> np.ndarray:
+        """
+        Apply gain and convert to int16 PCM in the reusable output buffer
+
+        Args:
+            audio: float32 samples (any shape, must be contiguous)
+            gain: Gain to apply (defaults to current AGC gain)
+
+        Returns:
+            int16 view into the internal PCM buffer - valid until the next call
+        """
+        samples = audio.reshape(-1)
+        n = samples.shape[0]
+        work = self._work[:n]
+        pcm = self._pcm[:n]
+
+        scale = (self.gain if gain is None else gain) * INT16_FULL_SCALE
+        np.multiply(samples, scale, out=work)
+        np.clip(work, -INT16_FULL_SCALE, INT16_FULL_SCALE, out=work)
+        np.copyto(pcm, work, casting='unsafe')
+        return pcm
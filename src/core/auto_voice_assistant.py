@@ -8,32 +8,47 @@ import os
 import sys
 import time
 import tempfile
-import requests
 import pyttsx3
 import sounddevice as sd
 import numpy as np
-import wave
 from openai import OpenAI
 from dotenv import load_dotenv
 import json
+import logging
 from datetime import datetime
 import threading
 import asyncio
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Add src to path for MCP imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.core.mcp_client import MCPClientSync
 from src.core.intent_parser import IntentParser
+from src.core.ollama_client import OllamaClient
+from src.core.conversation_memory import ConversationMemory
+from src.core.audio_preprocessor import AudioPreprocessor
+from src.core.noise_gate import NoiseGate
+from src.core.transcriber import WhisperTranscriber
+from src.core.reply_state import ReplyStateMachine
+from src.core.event_bus import EventBus, EventType
+from src.core.tracing import get_tracer
+from src.core.structured_logging import setup_logging, stop_logging, log_event
+from src.messaging.message_store import close_message_stores
 
 # Load config from project root
 config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
 load_dotenv(config_path)
 
+logger = logging.getLogger(__name__)
+
 class AutoVoiceAssistant:
     def __init__(self):
         self.ollama_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
         self.ollama_model = os.getenv('OLLAMA_MODEL', 'gemma2:2b')
+        self.ollama = OllamaClient(base_url=self.ollama_url, model=self.ollama_model)
 
         # Initialize OpenAI client
         self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
@@ -48,14 +63,13 @@ class AutoVoiceAssistant:
         self.last_received_message = None
         self.pending_notification = None
         self.notification_just_announced = False  # Flag to prevent double responses
-        self.in_reply_mode = False  # Auto-reply mode after notification
-        self.notification_time = 0  # When notification was announced
+        self.reply_state = ReplyStateMachine(reply_window=60)  # Auto-reply mode after notification
 
         # Persistent context tracking
         self.last_messaged_recipient = None  # Remember who we last sent a message to
-        self.message_context_history = []  # Track recent messaging activity
+        self.message_context_history = deque(maxlen=10)  # Track recent messaging activity
 
-        # Event loop for Telegram operations
+        # Event loop for Telegram operations (the orchestrator loop, set in run())
         self.telegram_loop = None
 
         # Audio settings optimized for real-time processing
@@ -65,175 +79,123 @@ class AutoVoiceAssistant:
         self.command_duration = 8  # Recording time for user questions (increased to 8s)
         self.chunk_size = 1024  # Smaller chunks for real-time
 
-        print("🔧 TTS will initialize on first use...")
+        # Preallocated capture/PCM buffers sized for the longest window, with AGC
+        self.audio_preprocessor = AudioPreprocessor(
+            max_samples=int(max(self.chunk_duration, self.command_duration) * self.sample_rate),
+            channels=self.channels
+        )
+
+        # Adaptive noise floor + SNR gate in front of the transcription API
+        self.noise_gate = NoiseGate()
+
+        logger.info("🔧 TTS will initialize on first use...")
         self.tts_engine = None  # Lazy init to avoid hanging
 
-        print("✅ OpenAI Whisper API ready!")
+        # Transcription backend (encoder via TRANSCRIPTION_ENCODER: wav, flac, opus)
+        self.transcriber = WhisperTranscriber(self.openai_client, sample_rate=self.sample_rate)
+        logger.info(f"✅ OpenAI Whisper API ready! ({self.transcriber.encoder.name} upload)")
 
-        self.is_processing = False
         self.in_conversation = False
         self.conversation_timeout = 60  # 1 minute timeout like Siri
         self.last_interaction_time = 0
-        self.conversation_history = []
+        # Bounded chat memory: recent turns verbatim, older ones summarized by the local model, persisted
+        self.conversation_history = ConversationMemory(summarizer=self.ollama.summarize)
+
+        # Speculative chat: generate the Ollama reply while the intent is still being parsed
+        self.speculative_chat = os.getenv('SPECULATIVE_CHAT', 'true').lower() == 'true'
+        self.speculative_max_tokens = int(os.getenv('SPECULATIVE_MAX_TOKENS', '80'))
+        self.speculative_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative")
+        self.speculation_stats = {"launched": 0, "used": 0, "discarded": 0}
 
         # Initialize Telegram client - use shared client directly to avoid database locks
-        print("🔌 Initializing Telegram client...")
+        logger.info("🔌 Initializing Telegram client...")
         self.telegram_enabled = False
         self.intent_parser = IntentParser()  # AI-powered intent understanding
         self.shared_telegram_client = None
+        self.mcp_client = None  # In-process Telegram MCP tools, mounted by run_async()
 
         try:
             from src.messaging.shared_telegram_client import get_shared_client
             self.shared_telegram_client = get_shared_client()
             self.telegram_enabled = True
-            print("✅ Telegram messaging enabled (shared client)!")
+            logger.info("✅ Telegram messaging enabled (shared client)!")
         except Exception as e:
-            print(f"⚠️  Telegram setup failed: {e}")
-            print("⚠️  Continuing without Telegram messaging")
-
-        print("✅ Voice Assistant ready!")
-
-        # Start Telegram listener in background (optional)
+            logger.warning(f"⚠️  Telegram setup failed: {e}")
+            logger.warning("⚠️  Continuing without Telegram messaging")
+
+        logger.info("✅ Voice Assistant ready!")
+
+        # Per-stage latency tracing (turn events go to logs/events.jsonl for the dashboard)
+        self.tracer = get_tracer()
+
+        # Orchestrator: one asyncio loop, blocking work in explicit single-thread executors
+        self.loop = None
+        self.event_bus = EventBus()
+        self.audio_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio")
+        self.tts_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self.turn_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turn")
+        self._tts_lock = threading.Lock()  # speak() is also used from turn handling (confirmations)
+        self._idle = None  # Set when nothing is speaking and no turn is running - gates capture
+        self._turn_active = False
+        self._pending_speech = 0
+        self._capturing = False
+
+        # Telegram listener (optional) - runs as a task on the orchestrator loop
         self.telegram_listener = None
-        if os.getenv('ENABLE_TELEGRAM_LISTENER', 'false').lower() == 'true':
-            print("📩 Starting incoming message listener...")
-            self._start_telegram_listener()
+        self.notification_queue = None
+        self.listener_enabled = os.getenv('ENABLE_TELEGRAM_LISTENER', 'false').lower() == 'true'
+        if self.listener_enabled:
+            logger.info("📩 Incoming message listener will start with the assistant")
         else:
-            print("📵 Message listener disabled (set ENABLE_TELEGRAM_LISTENER=true to enable)")
-
-    def _start_telegram_listener(self):
-        """Start Telegram message listener in background thread"""
-        def run_listener():
-            """Run async listener in background"""
+            logger.info("📵 Message listener disabled (set ENABLE_TELEGRAM_LISTENER=true to enable)")
+
+    async def _run_telegram_listener(self):
+        """Keep the Telegram listener connected, with auto-reconnect"""
+        from src.messaging.telegram_listener import TelegramMessageListener
+        from src.messaging.notification_queue import NotificationQueue
+        from src.messaging.shared_telegram_client import Backoff
+
+        # Survives reconnects so pending notifications and metrics aren't lost
+        self.notification_queue = NotificationQueue()
+
+        async def on_message(msg):
+            """Listener callback - hand the message to the event bus and wait until it was announced"""
+            handled = self.loop.create_future()
+            await self.event_bus.publish(EventType.INCOMING_MESSAGE, message=msg, handled=handled)
+            # Backpressure: the next notification stays queued (and keeps coalescing) meanwhile
+            await handled
+
+        backoff = Backoff(base=float(os.getenv('LISTENER_BACKOFF_BASE', '1')),
+                          cap=float(os.getenv('LISTENER_BACKOFF_CAP', '60')))
+        while True:
+            connected_at = time.monotonic()
             try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                self.telegram_loop = loop  # Store loop for message sending
-
-                async def start_listening():
-                    """Keep listener running with auto-reconnect"""
-                    retry_count = 0
-                    max_retries = 999  # Essentially infinite
-
-                    while retry_count < max_retries:
-                        try:
-                            from src.messaging.telegram_listener import TelegramMessageListener
-                            if retry_count == 0:
-                                print("📡 Initializing listener...")
-                            else:
-                                print(f"🔄 Reconnecting listener (attempt {retry_count + 1})...")
-
-                            async def on_message(msg):
-                                """Callback when message received - with error handling"""
-                                try:
-                                    print(f"📨 Callback triggered for message from {msg.get('sender_name', 'Unknown')}")
-                                    self.last_received_message = msg
-                                    sender = msg['sender_name']
-                                    text = msg['message']
-                                    notification = f"New message from {sender}: {text}"
-
-                                    # If in conversation, interrupt with notification
-                                    if self.in_conversation:
-                                        print(f"\n📩 {notification}")
-                                        self.notification_just_announced = True  # Skip next general chat
-                                        self.in_reply_mode = True  # Enter auto-reply mode
-                                        self.notification_time = time.time()
-
-                                        # Use threading to avoid blocking the listener
-                                        def announce():
-                                            try:
-                                                self.speak(notification)
-                                                time.sleep(0.5)  # Let speaker finish
-                                                self.speak("Say 'reply' to respond.")
-                                                time.sleep(0.8)  # Wait for audio to clear before next listen
-                                            except Exception as e:
-                                                print(f"⚠️ TTS error in notification: {e}")
-
-                                        # Run in separate thread to not block listener
-                                        threading.Thread(target=announce, daemon=True).start()
-                                    else:
-                                        # Not in conversation - auto-start one to allow reply
-                                        print(f"\n📩 {notification}")
-
-                                        # Announce in separate thread to not block
-                                        def announce_and_activate():
-                                            try:
-                                                self.speak(notification)
-                                                time.sleep(0.5)  # Let speaker finish
-                                                self.speak("Say 'reply' to respond.")
-                                                time.sleep(1.0)  # Wait for audio to clear before listening
-
-                                                # Auto-start conversation for easy reply
-                                                if not self.in_conversation:
-                                                    print("🔥 Auto-activating for reply...")
-                                                    self.in_reply_mode = True
-                                                    self.notification_time = time.time()
-                                                    self.start_conversation(skip_greeting=True)
-                                            except Exception as e:
-                                                print(f"⚠️ Error in announce_and_activate: {e}")
-
-                                        threading.Thread(target=announce_and_activate, daemon=True).start()
-
-                                    print("✅ Message callback completed successfully")
-                                except Exception as e:
-                                    print(f"❌ Error in message callback: {e}")
-                                    import traceback
-                                    traceback.print_exc()
-                                    # Don't re-raise - keep listener alive!
-
-                            self.telegram_listener = TelegramMessageListener(on_message_callback=on_message)
-                            print("👂 Listener connecting to Telegram...")
-                            await self.telegram_listener.start()
-
-                            # If we get here, listener disconnected
-                            print("⚠️ Listener disconnected, will reconnect in 5s...")
-                            await asyncio.sleep(5)
-                            retry_count += 1
-
-                        except Exception as e:
-                            print(f"\n❌ Listener error: {e}")
-                            import traceback
-                            traceback.print_exc()
-                            print("🔄 Retrying in 10 seconds...")
-                            await asyncio.sleep(10)
-                            retry_count += 1
-
-                loop.run_until_complete(start_listening())
-            except Exception as e:
-                print(f"\n❌ Failed to start listener thread: {e}")
-                import traceback
-                traceback.print_exc()
-            finally:
-                try:
-                    loop.close()
-                except:
-                    pass
+                if backoff.attempt == 0:
+                    logger.info("📡 Initializing listener...")
+                else:
+                    logger.info(f"🔄 Reconnecting listener (attempt {backoff.attempt + 1})...")
 
-        listener_thread = threading.Thread(target=run_listener, daemon=True, name="TelegramListener")
-        listener_thread.start()
+                self.telegram_listener = TelegramMessageListener(
+                    on_message_callback=on_message,
+                    notifications=self.notification_queue
+                )
+                logger.info("👂 Listener connecting to Telegram...")
+                await self.telegram_listener.start()
 
-        # Wait for event loop to be ready
-        for i in range(50):  # Wait up to 5 seconds
-            if self.telegram_loop:
-                print("✅ Message listener thread started")
-                break
-            time.sleep(0.1)
+                # If we get here, listener disconnected
+                logger.warning("⚠️ Listener disconnected")
 
-        if not self.telegram_loop:
-            print("⚠️ Warning: Telegram loop not ready yet")
-
-        # Start monitoring thread
-        def monitor_listener():
-            """Monitor listener thread and report status"""
-            while True:
-                time.sleep(30)  # Check every 30 seconds
-                if listener_thread.is_alive():
-                    print("💚 Listener thread is alive")
-                else:
-                    print("❌ WARNING: Listener thread died!")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"\n❌ Listener error: {e}", exc_info=True)
 
-        monitor_thread = threading.Thread(target=monitor_listener, daemon=True, name="ListenerMonitor")
-        monitor_thread.start()
+            # A connection that stayed up for a while starts the backoff over
+            if time.monotonic() - connected_at > backoff.cap:
+                backoff.reset()
+            delay = backoff.next_delay()
+            logger.info(f"🔄 Retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
 
     def _load_contacts(self) -> dict:
         """Load contacts from contacts.json"""
@@ -244,7 +206,7 @@ class AutoVoiceAssistant:
                     return json.load(f)
             return {}
         except Exception as e:
-            print(f"⚠️  Could not load contacts: {e}")
+            logger.warning(f"⚠️  Could not load contacts: {e}")
             return {}
 
     def fuzzy_match_contact(self, spoken_name: str) -> dict:
@@ -259,7 +221,7 @@ class AutoVoiceAssistant:
             # First try exact match (case-insensitive)
             spoken_lower = spoken_name.lower()
             if spoken_lower in contact_names:
-                print(f"✅ Exact match found: '{spoken_name}' → '{spoken_lower}'")
+                logger.info(f"✅ Exact match found: '{spoken_name}' → '{spoken_lower}'")
                 return {
                     "matched": True,
                     "name": spoken_lower,
@@ -275,7 +237,7 @@ class AutoVoiceAssistant:
                 best_match = close_matches[0]
                 confidence = difflib.SequenceMatcher(None, spoken_lower, best_match).ratio()
 
-                print(f"🔍 Fuzzy match: '{spoken_name}' → '{best_match}' (confidence: {confidence:.2f})")
+                logger.info(f"🔍 Fuzzy match: '{spoken_name}' → '{best_match}' (confidence: {confidence:.2f})")
 
                 return {
                     "matched": True,
@@ -286,57 +248,42 @@ class AutoVoiceAssistant:
                 }
 
             # No match found
-            print(f"❌ No match found for '{spoken_name}'")
+            logger.warning(f"❌ No match found for '{spoken_name}'")
             return {"matched": False, "name": spoken_name, "needs_confirmation": False}
 
 
         except Exception as e:
-            print(f"❌ Fuzzy match error: {e}")
+            logger.error(f"❌ Fuzzy match error: {e}")
             return {"matched": False, "name": spoken_name, "needs_confirmation": False}
 
     def log_conversation(self, user_input, ai_response):
-        """Log conversation to JSON file for dashboard"""
-        
-        # Use data directory from project root
-        log_file = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'conversations.json')
-        
-        # Load existing conversations
-        conversations = []
-        if os.path.exists(log_file):
-            try:
-                with open(log_file, 'r') as f:
-                    conversations = json.load(f)
-            except:
-                conversations = []
-        
-        # Add new conversation
-        entry = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "user": user_input,
-            "ai": ai_response,
-            "id": len(conversations) + 1
-        }
-        conversations.append(entry)
-        
-        # Save to file
-        with open(log_file, 'w') as f:
-            json.dump(conversations, f, indent=2)
+        """Emit a conversation event for the dashboard (queued, never touches disk here)"""
+        log_event(
+            "conversation",
+            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            user=user_input,
+            ai=ai_response
+        )
     
     def speak(self, text):
-        """Convert text to speech using local or OpenAI TTS"""
-        print(f"🗣️  Gemma: {text}")
+        """Convert text to speech using local or OpenAI TTS (blocking, one utterance at a time)"""
+        with self._tts_lock, self.tracer.span("tts"):
+            self._speak(text)
+
+    def _speak(self, text):
+        logger.info(f"🗣️  Gemma: {text}")
 
         # Lazy init TTS engine
         if self.tts_engine is None and not self.use_openai_tts:
             try:
-                print("🔧 Initializing TTS engine...")
+                logger.info("🔧 Initializing TTS engine...")
                 import pyttsx3
                 self.tts_engine = pyttsx3.init()
                 self.tts_engine.setProperty('rate', 140)
                 self.tts_engine.setProperty('volume', 0.9)
-                print("✅ TTS ready")
+                logger.info("✅ TTS ready")
             except Exception as e:
-                print(f"⚠️ TTS init failed: {e}")
+                logger.warning(f"⚠️ TTS init failed: {e}")
                 self.tts_engine = False  # Mark as failed
 
         if self.use_openai_tts:
@@ -364,7 +311,7 @@ class AutoVoiceAssistant:
                     os.unlink(tmp_file.name)
                     
             except Exception as e:
-                print(f"OpenAI TTS error: {e}, falling back to local TTS")
+                logger.error(f"OpenAI TTS error: {e}, falling back to local TTS")
                 self.tts_engine.say(text)
                 self.tts_engine.runAndWait()
         else:
@@ -374,120 +321,142 @@ class AutoVoiceAssistant:
                     self.tts_engine.say(text)
                     self.tts_engine.runAndWait()
                 except:
-                    print("TTS Error - but continuing...")
+                    logger.error("TTS Error - but continuing...")
             else:
-                print("⚠️ TTS not available - text only")
+                logger.warning("⚠️ TTS not available - text only")
     
     def query_ollama(self, prompt):
         """Query local Ollama model with conversation context"""
         try:
-            print("🧠 Thinking...")
-            
-            # Build context from recent conversation
-            context = ""
-            if len(self.conversation_history) > 0:
-                context = "Previous conversation:\n"
-                for i, (user_msg, ai_msg) in enumerate(self.conversation_history[-3:]):  # Last 3 exchanges
-                    context += f"User: {user_msg}\nGemma: {ai_msg}\n"
-                context += "\nCurrent question:\n"
-            
-            full_prompt = f"You are Gemma, a helpful voice assistant. Keep responses very short (1-2 sentences). {context}User: {prompt}"
-            
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.ollama_model,
-                    "prompt": full_prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json().get('response', 'I did not understand that.').strip()
-                sentences = result.split('.')[:2]
-                ai_response = '.'.join(sentences).strip() + '.'
-                
-                # Add to conversation history
-                self.conversation_history.append((prompt, ai_response))
-                
-                return ai_response
-            else:
+            logger.info("🧠 Thinking...")
+            ai_response = self.generate_chat(prompt)
+            if ai_response is None:
                 return "I'm having trouble thinking right now."
-                
+
+            # Add to conversation history
+            self._remember_exchange(prompt, ai_response)
+            return ai_response
+
         except Exception as e:
-            print(f"Ollama error: {e}")
+            logger.error(f"Ollama error: {e}")
             return "Sorry, I'm having connection issues."
-    
+
+    def generate_chat(self, prompt, max_tokens=None, cancelled=None):
+        """
+        Stream a short reply from Ollama (does not touch conversation history)
+
+        Args:
+            prompt: User text
+            max_tokens: Cap on generated tokens (num_predict), None for the model default
+            cancelled: threading.Event - generation stops and the connection is dropped once set
+
+        Returns:
+            The reply trimmed to two sentences, or None on HTTP error or cancellation
+        """
+        with self.tracer.span("chat"):
+            result = self.ollama.chat(
+                prompt,
+                history=self.conversation_history.recent(),
+                summary=self.conversation_history.summary,
+                max_tokens=max_tokens,
+                cancelled=cancelled
+            )
+        if result is None:
+            return None
+
+        result = result.strip() or 'I did not understand that.'
+        sentences = result.split('.')[:2]
+        return '.'.join(sentences).strip() + '.'
+
+    def _remember_exchange(self, prompt, ai_response):
+        """Add a chat exchange to conversation memory"""
+        self.conversation_history.append((prompt, ai_response))
+
+    def _start_speculative_chat(self, user_text):
+        """Launch chat generation alongside intent parsing - returns (future, cancel event)"""
+        cancelled = threading.Event()
+        future = self.speculative_executor.submit(
+            contextvars.copy_context().run, self.generate_chat, user_text, self.speculative_max_tokens, cancelled
+        )
+        self.speculation_stats["launched"] += 1
+        return future, cancelled
+
+    def _finish_speculative_chat(self, user_text, future):
+        """Use the speculative reply for a general chat turn"""
+        try:
+            logger.info("🧠 Thinking... (speculative)")
+            ai_response = future.result(timeout=30)
+        except Exception as e:
+            logger.error(f"Ollama error: {e}")
+            return "Sorry, I'm having connection issues."
+
+        if ai_response is None:
+            return "I'm having trouble thinking right now."
+
+        self.speculation_stats["used"] += 1
+        self.tracer.annotate(speculative="used")
+        self._remember_exchange(user_text, ai_response)
+        return ai_response
+
+    def _discard_speculative_chat(self, future, cancelled):
+        """The turn is not a chat - stop the speculative generation"""
+        cancelled.set()
+        future.cancel()
+        self.speculation_stats["discarded"] += 1
+        self.tracer.annotate(speculative="discarded")
+
     def record_and_transcribe_fast(self, duration, description=""):
         """Fast record and transcribe using OpenAI Whisper API with optimizations"""
-        print(f"🎤 {description} ({duration}s)")
+        logger.debug(f"🎤 {description} ({duration}s)")
         
         try:
-            # Record with minimal processing
-            audio_data = sd.rec(
-                int(duration * self.sample_rate),
-                samplerate=self.sample_rate,
-                channels=self.channels,
-                dtype=np.float32
-            )
-            sd.wait()
+            # Record straight into the reusable capture buffer
+            frames = int(duration * self.sample_rate)
+            with self.tracer.span("record"):
+                audio_data = sd.rec(
+                    frames,
+                    samplerate=self.sample_rate,
+                    channels=self.channels,
+                    dtype=np.float32,
+                    out=self.audio_preprocessor.capture_view(frames)
+                )
+                sd.wait()
 
-            # Check for invalid audio data
-            if np.any(np.isnan(audio_data)) or np.any(np.isinf(audio_data)):
-                return ""
+            with self.tracer.span("preprocess"):
+                # RMS/peak in one allocation-free pass (NaN if the window is corrupt)
+                volume, peak = self.audio_preprocessor.measure(audio_data)
+                if np.isnan(volume):
+                    return ""
 
-            # Quick volume check with MORE SENSITIVE threshold
-            audio_squared = audio_data**2
-            # Handle potential overflow
-            audio_squared = np.nan_to_num(audio_squared, nan=0.0, posinf=0.0, neginf=0.0)
-            volume = np.sqrt(np.mean(audio_squared))
+                # Adaptive SNR gate - lenient while a conversation expects speech
+                speech_rms = self.noise_gate.process(volume, expecting_speech=self.in_conversation)
+                if not speech_rms:
+                    return ""
 
-            # Lowered thresholds for better sensitivity
-            threshold = 0.002 if description == "Listening..." else 0.001
-            if volume < threshold or np.isnan(volume) or np.isinf(volume):
-                return ""
+                # AGC instead of fixed 3x gain, converted to int16 in place
+                gain = self.audio_preprocessor.update_gain(volume, peak)
+                pcm = self.audio_preprocessor.to_pcm16(audio_data, gain)
+
+            # Edge frames quieter than the gate's own speech bar are trimmed before upload
+            silence_threshold = int(speech_rms * gain * 32767)
 
-            # Amplify MORE for better sensitivity (3x instead of 1.5x)
-            audio_data = np.clip(audio_data * 3.0, -1.0, 1.0)
-            # Clean up any remaining NaN/inf values
-            audio_data = np.nan_to_num(audio_data, nan=0.0, posinf=1.0, neginf=-1.0)
-            
-            # Create audio file in memory buffer
-            import io
-            wav_buffer = io.BytesIO()
-            
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(self.sample_rate)
-                wav_file.writeframes((audio_data.flatten() * 32767).astype(np.int16).tobytes())
-            
-            wav_buffer.seek(0)
-            
             try:
-                # Use Whisper-1 (best accuracy)
-                transcript = self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=("audio.wav", wav_buffer.read(), "audio/wav"),
-                    language="en",
-                    response_format="text"
-                )
-                
-                text = transcript.strip() if transcript else ""
-                
+                # Trimmed, compressed upload through the transcription backend
+                with self.tracer.span("transcribe"):
+                    text = self.transcriber.transcribe(pcm, silence_threshold)
+
                 if text and len(text) > 1:
-                    print(f"👂 {text}")
+                    logger.info(f"👂 {text}")
                     return text
                 else:
                     return ""
                         
             except Exception as e:
-                print(f"API error: {e}")
+                logger.error(f"API error: {e}")
                 return ""
                     
         except Exception as e:
-            print(f"Recording error: {e}")
+            logger.error(f"Recording error: {e}")
             return ""
     
     def detect_activation(self, text):
@@ -503,7 +472,7 @@ class AutoVoiceAssistant:
 
         for phrase in activations:
             if phrase in text_lower:
-                print(f"🔥 Activation detected: '{phrase}' in '{text}'")
+                logger.info(f"🔥 Activation detected: '{phrase}' in '{text}'")
                 return True
 
         return False
@@ -528,10 +497,22 @@ class AutoVoiceAssistant:
         return message.strip()
 
     def send_telegram_message_sync(self, message: str, recipient: str) -> str:
-        """Synchronous wrapper for async send_message"""
+        """Send from the turn executor: through the in-process MCP tools when mounted, else the shared client"""
         if not self.telegram_loop:
             return None
 
+        if self.mcp_client is not None:
+            try:
+                with self.tracer.span("telegram_send"):
+                    result = self.mcp_client.send_telegram_message(message, recipient=recipient)
+            except Exception as e:
+                logger.error(f"❌ Error sending message: {e}")
+                return None
+            if result.success:
+                return f"Message sent to {recipient} successfully"
+            logger.error(f"❌ Send failed: {result.error}")
+            return None
+
         async def _send():
             result = await self.shared_telegram_client.send_message(recipient, message)
             if result.get("success"):
@@ -542,9 +523,10 @@ class AutoVoiceAssistant:
         # Use the listener's event loop to avoid loop conflicts
         future = asyncio.run_coroutine_threadsafe(_send(), self.telegram_loop)
         try:
-            return future.result(timeout=10)  # 10 second timeout
+            with self.tracer.span("telegram_send"):
+                return future.result(timeout=10)  # 10 second timeout
         except Exception as e:
-            print(f"❌ Error sending message: {e}")
+            logger.error(f"❌ Error sending message: {e}")
             return None
 
     def handle_user_input(self, user_text):
@@ -554,81 +536,35 @@ class AutoVoiceAssistant:
         """
         user_lower = user_text.lower()
 
-        # Check if we're in auto-reply mode (within 60 seconds of notification)
-        time_since_notification = time.time() - self.notification_time
-        if self.in_reply_mode and time_since_notification < 60 and self.last_received_message:
-            # Check if user wants to exit reply mode
-            if any(phrase in user_lower for phrase in ["never mind", "no thanks", "skip", "ignore", "cancel"]):
-                self.in_reply_mode = False
-                return "Okay, cancelled."
-
-            # Check if this is NOT a new send command or general question
-            if not any(word in user_lower for word in ["send message to", "tell someone", "notify someone", "what", "how", "why", "when", "who"]):
-                # Treat this as a reply to the last message
-                sender = self.last_received_message["sender_name"].split()[0].lower()
-
-                # Normalize to 1st person
-                message = self.normalize_message_to_first_person(user_text)
+        # Reply fast path: deterministic reply/confirm/cancel handling, no model calls
+        reply = self.reply_state.handle(user_text)
+        if reply["action"] in ("prompt", "cancel"):
+            return reply["response"]
 
-                print(f"💬 Auto-reply to {sender}: {message}")
+        if reply["action"] == "send":
+            sender = reply["recipient"]
+            message = self.normalize_message_to_first_person(reply["message"])
+            logger.info(f"💬 Reply to {sender}: {message}")
 
-                try:
-                    result = self.send_telegram_message_sync(message, sender)
-                    if result and "successfully" in result:
-                        # Track this messaging activity
-                        self.last_messaged_recipient = sender
-                        self.message_context_history.append({
-                            "recipient": sender,
-                            "message": message,
-                            "type": "auto_reply"
-                        })
-                        # Exit reply mode after successful send
-                        self.in_reply_mode = False
-                        return f"Reply sent to {sender}!"
-                    else:
-                        self.in_reply_mode = False
-                        return f"Failed to send reply. Error: {result}"
-                except Exception as e:
-                    print(f"❌ Telegram error: {e}")
-                    self.in_reply_mode = False
-                    return "Sorry, I had trouble sending that reply."
-
-        # Check for explicit "reply" command
-        is_reply = any(word in user_lower for word in ["reply", "respond", "answer"])
-
-        if is_reply and self.last_received_message:
-            # This is a reply to the last message
-            sender = self.last_received_message["sender_name"].split()[0].lower()
-
-            # Extract the message content (remove "reply" keywords only)
-            import re
-            # Remove reply keywords but keep the actual message
-            message = user_text
-            # Remove leading "reply/respond/answer" keywords
-            message = re.sub(r'^\s*(reply|respond|answer)\s*,?\s*', '', message, flags=re.IGNORECASE)
-
-            # Normalize to 1st person
-            message = self.normalize_message_to_first_person(message)
-
-            if len(message) > 2:
-                print(f"💬 Quick reply to {sender}: {message}")
-
-                try:
-                    result = self.send_telegram_message_sync(message, sender)
-                    if result and "successfully" in result:
-                        # Track this messaging activity
-                        self.last_messaged_recipient = sender
-                        self.message_context_history.append({
-                            "recipient": sender,
-                            "message": message,
-                            "type": "reply"
-                        })
-                        return f"Reply sent to {sender}!"
-                    else:
-                        return f"Failed to send reply. Error: {result}"
-                except Exception as e:
-                    print(f"❌ Telegram error: {e}")
-                    return "Sorry, I had trouble sending that reply."
+            try:
+                result = self.send_telegram_message_sync(message, sender)
+                if result and "successfully" in result:
+                    # Track this messaging activity
+                    self.reply_state.mark_sent()
+                    self.last_messaged_recipient = sender
+                    self.message_context_history.append({
+                        "recipient": sender,
+                        "message": message,
+                        "type": "reply"
+                    })
+                    return f"Reply sent to {sender}!"
+                else:
+                    self.reply_state.mark_failed()
+                    return f"Failed to send reply. Error: {result}"
+            except Exception as e:
+                logger.error(f"❌ Telegram error: {e}")
+                self.reply_state.mark_failed()
+                return "Sorry, I had trouble sending that reply."
 
         # Check if this is a follow-up message (no explicit recipient mentioned)
         # Keywords that suggest follow-up: "also", "and", "plus", "additionally"
@@ -647,7 +583,7 @@ class AutoVoiceAssistant:
             # Normalize to 1st person
             message = self.normalize_message_to_first_person(message)
 
-            print(f"📤 Follow-up message to {recipient}: {message}")
+            logger.info(f"📤 Follow-up message to {recipient}: {message}")
 
             try:
                 result = self.send_telegram_message_sync(message, recipient)
@@ -662,10 +598,10 @@ class AutoVoiceAssistant:
                 else:
                     return f"Failed to send message. Error: {result}"
             except Exception as e:
-                print(f"❌ Telegram error: {e}")
+                logger.error(f"❌ Telegram error: {e}")
                 return "Sorry, I had trouble sending that message."
 
-        print("🧠 Understanding intent with context...")
+        logger.info("🧠 Understanding intent with context...")
 
         # Update intent parser with last messaged recipient context
         if self.last_messaged_recipient:
@@ -675,35 +611,53 @@ class AutoVoiceAssistant:
                 self.last_messaged_recipient
             )
 
-        # Pass conversation history to intent parser for context
-        intent = self.intent_parser.parse(user_text, self.conversation_history)
-
-        if intent["action"] == "send_message" and intent["success"]:
+        # Speculatively start the chat reply so chat turns cost max(intent, chat), not the sum
+        speculation = self._start_speculative_chat(user_text) if self.speculative_chat else None
+
+        # The parser keeps its own recipient-aware context (update_context)
+        with self.tracer.span("intent"):
+            intent = self.intent_parser.parse(user_text)
+        self.tracer.annotate(
+            action=intent["action"],
+            intent_prompt_tokens=self.intent_parser.last_usage.get("prompt_tokens", 0),
+            intent_cached_tokens=self.intent_parser.last_usage.get("cached_tokens", 0),
+            intent_completion_tokens=self.intent_parser.last_usage.get("completion_tokens", 0)
+        )
+
+        is_chat = not (intent["action"] == "send_message" and intent["success"])
+        if speculation and is_chat:
+            return self._finish_speculative_chat(user_text, speculation[0])
+        if speculation:
+            self._discard_speculative_chat(*speculation)
+
+        if not is_chat:
             # User wants to send a message
-            print(f"📱 Detected message intent (confidence: {intent.get('confidence', 0):.2f})")
-            print(f"   Reasoning: {intent.get('reasoning', 'N/A')}")
+            logger.info(f"📱 Detected message intent (confidence: {intent.get('confidence', 0):.2f})")
+            logger.info(f"   Reasoning: {intent.get('reasoning', 'N/A')}")
 
             message = intent.get("message")
-            recipient = intent.get("recipient", "recipient")
+            recipient = intent.get("recipient") or "unknown"  # The schema allows null
 
             if not message:
                 return "I understood you want to send a message, but I couldn't figure out what to say."
 
             # Normalize message to 1st person
             message = self.normalize_message_to_first_person(message)
-            print(f"📝 Normalized message: {message}")
+            logger.info(f"📝 Normalized message: {message}")
 
             # Check if this is a reply to last received message
             if recipient.lower() in ["him", "her", "them", "unknown"] and self.last_received_message:
-                recipient = self.last_received_message["sender_name"].lower().split()[0]
-                print(f"💬 Replying to last sender: {recipient}")
+                recipient = (self.last_received_message.get("contact_key")
+                             or self.last_received_message["sender_name"].lower().split()[0])
+                logger.info(f"💬 Replying to last sender: {recipient}")
             # Check if recipient is vague but we have last messaged context
             elif recipient.lower() in ["him", "her", "them", "unknown"] and self.last_messaged_recipient:
                 recipient = self.last_messaged_recipient
-                print(f"💬 Continuing conversation with: {recipient}")
+                logger.info(f"💬 Continuing conversation with: {recipient}")
 
             # Fuzzy match the recipient name
-            match_result = self.fuzzy_match_contact(recipient)
+            with self.tracer.span("contact_match"):
+                match_result = self.fuzzy_match_contact(recipient)
 
             if not match_result["matched"]:
                 return f"I couldn't find '{recipient}' in your contacts. Can you spell it or try another name?"
@@ -747,9 +701,6 @@ class AutoVoiceAssistant:
                         "message": message,
                         "type": "sent"
                     })
-                    # Keep only last 10 messages for context
-                    if len(self.message_context_history) > 10:
-                        self.message_context_history = self.message_context_history[-10:]
 
                     # Update intent parser context with this interaction
                     self.intent_parser.update_context(user_text, response, recipient)
@@ -757,158 +708,310 @@ class AutoVoiceAssistant:
                 else:
                     return f"Failed to send the message. Error: {result}"
             except Exception as e:
-                print(f"❌ Telegram error: {e}")
+                logger.error(f"❌ Telegram error: {e}")
                 return "Sorry, I had trouble sending that message."
 
         else:
             # Regular conversation - use Ollama
             return self.query_ollama(user_text)
     
-    def start_conversation(self, skip_greeting=False):
+    def _update_idle(self):
+        """Capture may run only when no turn is in progress and nothing is being spoken"""
+        if self._idle is None:
+            return
+        if self._turn_active or self._pending_speech:
+            self._idle.clear()
+        else:
+            self._idle.set()
+
+    def _run_traced(self, executor, func, *args):
+        """run_in_executor carrying this task's context, so spans land in the current turn"""
+        return self.loop.run_in_executor(executor, contextvars.copy_context().run, func, *args)
+
+    async def say(self, text):
+        """Speak on the TTS executor - capture pauses until SPEECH_DONE"""
+        self._pending_speech += 1
+        self._update_idle()
+        try:
+            await self._run_traced(self.tts_executor, self.speak, text)
+        finally:
+            self._pending_speech -= 1
+            if not self.event_bus.publish_nowait(EventType.SPEECH_DONE, text=text):
+                self._update_idle()
+
+    async def _begin_conversation(self, skip_greeting=False):
         """Start a new conversation session (like Siri)"""
         self.in_conversation = True
         self.last_interaction_time = time.time()
         # Don't clear conversation history - maintain context across activations
-        # self.conversation_history = []  # Keep context!
 
-        print("\n🔥 Conversation started! (60s timeout)")
+        logger.info("\n🔥 Conversation started! (60s timeout)")
 
         # Show context info
         if self.last_messaged_recipient:
-            print(f"💬 Context: Last messaged {self.last_messaged_recipient}")
+            logger.info(f"💬 Context: Last messaged {self.last_messaged_recipient}")
 
         # Announce pending notifications first
         if self.pending_notification:
-            self.speak(self.pending_notification)
-            self.speak("Say 'reply' to respond, or ask me anything else.")
+            notification = self.pending_notification
             self.pending_notification = None
             # Enter reply mode for pending notifications too
-            self.in_reply_mode = True
-            self.notification_time = time.time()
+            self.reply_state.expect_reply()
+            await self.say(notification)
+            await self.say("Say 'reply' to respond, or ask me anything else.")
         elif not skip_greeting:
             # Only greet if not skipping (e.g., auto-activated by notification)
-            self.speak("Hi! What can I help you with?")
-        
-        # Enter conversation loop
-        while self.in_conversation:
+            await self.say("Hi! What can I help you with?")
+
+    def _end_conversation(self):
+        """Return to activation-word listening"""
+        self.in_conversation = False
+        gate_stats = self.noise_gate.get_stats()
+        logger.info(f"🔇 Noise gate: {gate_stats['windows_forwarded']} forwarded / {gate_stats['windows_gated']} gated "
+              f"(floor {gate_stats['noise_floor_db']} dBFS)")
+        if self.notification_queue:
+            queue_stats = self.notification_queue.get_stats()
+            logger.info(f"📩 Notifications: {queue_stats['received']} received, {queue_stats['delivered']} announced, "
+                        f"{queue_stats['dropped']} dropped (max depth {queue_stats['max_depth']})")
+        logger.info("\n👂 Back to listening for activation word...")
+
+    async def _capture_loop(self):
+        """Record windows back to back whenever the assistant is idle"""
+        while True:
             try:
-                # Check timeout BEFORE trying to record
-                elapsed_time = time.time() - self.last_interaction_time
-                if elapsed_time > self.conversation_timeout:
-                    print("⏰ Conversation timeout - returning to listening mode")
-                    self.speak("I'm going back to sleep now. Say 'Hello' to wake me up!")
-                    self.in_conversation = False
-                    break
-                
-                # Show remaining time
-                remaining_time = int(self.conversation_timeout - elapsed_time)
-
-                # Show reply mode indicator
-                mode_indicator = ""
-                if self.in_reply_mode and self.last_received_message:
-                    mode_indicator = f" [REPLY MODE: {self.last_received_message['sender_name']}]"
-
-                # Listen for user input
-                user_text = self.record_and_transcribe_fast(
-                    self.command_duration,
-                    f"Listening... ({remaining_time}s left){mode_indicator}"
-                )
-                
-                if user_text and len(user_text.strip()) > 2:
-                    # Reset timeout on valid input
-                    self.last_interaction_time = time.time()
-                    print(f"👤 User: {user_text}")
-
-                    # Check if notification was just announced - skip this input to avoid double response
-                    if self.notification_just_announced:
-                        print("🔕 Skipping response (notification just announced)")
-                        self.notification_just_announced = False
+                await self._idle.wait()
+
+                if self.in_conversation:
+                    # Check timeout BEFORE trying to record
+                    elapsed_time = time.time() - self.last_interaction_time
+                    if elapsed_time > self.conversation_timeout:
+                        logger.info("⏰ Conversation timeout - returning to listening mode")
+                        self._end_conversation()
+                        await self.say("I'm going back to sleep now. Say 'Hello' to wake me up!")
                         continue
 
-                    # Check for goodbye/exit commands
-                    text_lower = user_text.lower()
-                    if any(word in text_lower for word in ["goodbye", "bye", "thanks", "that's all", "stop", "exit"]):
-                        self.speak("Goodbye! Say 'Hello' when you need me again.")
-                        self.in_conversation = False
-                        break
+                    remaining_time = int(self.conversation_timeout - elapsed_time)
+                    duration = self.command_duration
+                    description = f"Listening... ({remaining_time}s left){self.reply_state.mode_indicator()}"
+                else:
+                    duration = self.chunk_duration
+                    description = "Listening..."
 
-                    # Use AI to intelligently handle input (Telegram or chat)
-                    if self.telegram_enabled:
-                        response = self.handle_user_input(user_text)
-                    else:
-                        response = self.query_ollama(user_text)
+                self._capturing = True
+                turn = self.tracer.begin_turn("conversation" if self.in_conversation else "activation")
+                try:
+                    text = await self._run_traced(
+                        self.audio_executor, self.record_and_transcribe_fast, duration, description
+                    )
+                finally:
+                    self._capturing = False
 
-                    self.speak(response)
-                    self.log_conversation(user_text, response)
-                    
+                await self.event_bus.publish(EventType.AUDIO_SEGMENT, text=text)
+                if not text:
+                    self.tracer.end_turn(keep=False)
                 else:
-                    # No clear input - DON'T reset timer, let it timeout naturally
-                    remaining_time = int(self.conversation_timeout - (time.time() - self.last_interaction_time))
-                    if remaining_time > 5:
-                        print(f"🔇 Silence... ({remaining_time}s until timeout)")
-                    elif remaining_time > 0:
-                        print(f"⏰ Timing out in {remaining_time}s...")
-                    
-            except KeyboardInterrupt:
-                self.in_conversation = False
-                break
+                    # Block further capture until the turn (and its speech) is done
+                    self._turn_active = True
+                    self._update_idle()
+                    await self.event_bus.publish(EventType.TRANSCRIPT, text=text, turn=turn)
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"Conversation error: {e}")
-                # Don't reset timeout on errors - let conversation timeout naturally
-    
+                logger.error(f"Error: {e}")
+                await asyncio.sleep(1)
+
+    async def _on_audio_segment(self, event):
+        """Report silence while a conversation is waiting for input"""
+        if event["text"] or not self.in_conversation:
+            return
+        # No clear input - DON'T reset timer, let it timeout naturally
+        remaining_time = int(self.conversation_timeout - (time.time() - self.last_interaction_time))
+        if remaining_time > 5:
+            logger.debug(f"🔇 Silence... ({remaining_time}s until timeout)")
+        elif remaining_time > 0:
+            logger.info(f"⏰ Timing out in {remaining_time}s...")
+
+    async def _on_transcript(self, event):
+        """Handle one transcribed window: activation word or a conversation turn"""
+        user_text = event["text"]
+        self.tracer.attach(event.get("turn"))
+        try:
+            if not self.in_conversation:
+                if self.detect_activation(user_text):
+                    await self._begin_conversation()
+                return
+
+            if len(user_text.strip()) <= 2:
+                return
+
+            # Reset timeout on valid input
+            self.last_interaction_time = time.time()
+            logger.info(f"👤 User: {user_text}")
+
+            # Check if notification was just announced - skip this input to avoid double response
+            if self.notification_just_announced:
+                logger.info("🔕 Skipping response (notification just announced)")
+                self.notification_just_announced = False
+                return
+
+            # Check for goodbye/exit commands
+            # (skipped while dictating a reply - "thanks" may be the reply itself)
+            text_lower = user_text.lower()
+            if not self.reply_state.is_dictating and any(word in text_lower for word in ["goodbye", "bye", "thanks", "that's all", "stop", "exit"]):
+                self._end_conversation()
+                await self.say("Goodbye! Say 'Hello' when you need me again.")
+                return
+
+            # Use AI to intelligently handle input (Telegram or chat) off the loop
+            handler = self.handle_user_input if self.telegram_enabled else self.query_ollama
+            response = await self._run_traced(self.turn_executor, handler, user_text)
+            self.event_bus.publish_nowait(EventType.INTENT, text=user_text, response=response)
+
+            await self.say(response)
+            self.log_conversation(user_text, response)
+
+        except Exception as e:
+            logger.error(f"Conversation error: {e}")
+            # Don't reset timeout on errors - let conversation timeout naturally
+        finally:
+            self.tracer.annotate(text=user_text)
+            record = self.tracer.end_turn(keep=True)
+            if record:
+                log_event("turn", **record)
+            self._turn_active = False
+            self._update_idle()
+
+    async def _on_incoming_message(self, event):
+        """Announce a received Telegram message and enter reply mode"""
+        try:
+            await self._announce_message(event["message"])
+        finally:
+            handled = event.get("handled")
+            if handled is not None and not handled.done():
+                handled.set_result(None)
+
+    async def _announce_message(self, msg):
+        """Speak a notification batch and open a conversation for the reply"""
+        logger.info(f"📨 Callback triggered for message from {msg.get('sender_name', 'Unknown')}")
+        self.last_received_message = msg
+        self.reply_state.on_notification(msg)  # Enter auto-reply mode
+        if msg.get("count", 1) > 1:
+            notification = f"{msg['count']} new messages from {msg['sender_name']}. Latest: {msg['message']}"
+        else:
+            notification = f"New message from {msg['sender_name']}: {msg['message']}"
+        logger.info(f"\n📩 {notification}")
+
+        if self.in_conversation and self._capturing:
+            # The window being recorded right now will pick up the announcement
+            self.notification_just_announced = True
+
+        await self.say(notification)
+        await self.say("Say 'reply' to respond.")
+
+        if not self.in_conversation:
+            # Not in conversation - auto-start one to allow reply
+            logger.info("🔥 Auto-activating for reply...")
+            self.reply_state.expect_reply()
+            await self._begin_conversation(skip_greeting=True)
+
+    async def _on_speech_done(self, event):
+        self._update_idle()
+
+    def _on_task_done(self, task: asyncio.Task):
+        """Report orchestrator tasks that die (replaces the polling monitor thread)"""
+        if not task.cancelled() and task.exception():
+            logger.error(f"❌ WARNING: {task.get_name()} died: {task.exception()}")
+
+    async def run_async(self):
+        """Run the orchestrator: event dispatch, audio capture and the Telegram listener"""
+        self.loop = asyncio.get_running_loop()
+        self.telegram_loop = self.loop  # Used by send_telegram_message_sync from the turn executor
+        self._idle = asyncio.Event()
+        self._update_idle()
+
+        self.event_bus.subscribe(EventType.AUDIO_SEGMENT, self._on_audio_segment)
+        self.event_bus.subscribe(EventType.TRANSCRIPT, self._on_transcript)
+        self.event_bus.subscribe(EventType.INCOMING_MESSAGE, self._on_incoming_message)
+        self.event_bus.subscribe(EventType.SPEECH_DONE, self._on_speech_done)
+
+        tasks = [
+            asyncio.create_task(self.event_bus.run(), name="EventBus"),
+            asyncio.create_task(self._capture_loop(), name="AudioCapture"),
+        ]
+        if self.listener_enabled:
+            logger.info("📩 Starting incoming message listener...")
+            tasks.append(asyncio.create_task(self._run_telegram_listener(), name="TelegramListener"))
+
+        # Accounts other than the pinned listener client disconnect once idle
+        reaper = None
+        if self.telegram_enabled:
+            from src.messaging.shared_telegram_client import get_account_registry
+            reaper = asyncio.create_task(get_account_registry().run_idle_reaper(), name="TelegramIdleReaper")
+
+        # Sends go through the Telegram MCP tools served from this loop against
+        # the shared client - no subprocess and no second MTProto connection
+        if self.telegram_enabled and os.getenv('MCP_IN_PROCESS', 'true').lower() == 'true':
+            mcp_client = MCPClientSync(loop=self.loop)
+            if await mcp_client.mount_telegram():
+                self.mcp_client = mcp_client
+            else:
+                logger.warning("⚠️ Sending through the shared Telegram client directly")
+        for task in tasks:
+            task.add_done_callback(self._on_task_done)
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if reaper is not None:
+                reaper.cancel()
+            if self.mcp_client is not None:
+                await self.mcp_client.client.close()
+                self.mcp_client = None
+
     def run(self):
         """Run voice activation mode"""
         print("\n🎙️  Voice Activation Mode Active!")
         print("Say 'Hello', 'Hi', 'Computer', or 'Assistant' to activate!")
         print("Press Ctrl+C to stop")
         print("=" * 40)
-        
-        while True:
-            try:
-                if not self.is_processing:
-                    # Listen for activation with fast processing
-                    text = self.record_and_transcribe_fast(
-                        self.chunk_duration, 
-                        "Listening..."
-                    )
-                    
-                    if text and self.detect_activation(text):
-                        self.start_conversation()
-                        print("\n👂 Back to listening for activation word...")
-                else:
-                    time.sleep(0.5)
-                    
-            except KeyboardInterrupt:
-                print("\n👋 Voice assistant stopped!")
-                break
-            except Exception as e:
-                print(f"Error: {e}")
-                time.sleep(1)
-    
+
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print("\n👋 Voice assistant stopped!")
+        finally:
+            for executor in (self.audio_executor, self.tts_executor, self.turn_executor, self.speculative_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.ollama.close()
+            self.conversation_history.close()
+            close_message_stores()
+            stop_logging()
+
     def start(self):
         """Start the assistant"""
         # Check Ollama
-        try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=3)
-            if response.status_code != 200:
-                print("❌ Ollama not running! Start it with: ollama serve")
-                return
-            print("✅ Ollama connected")
-        except:
-            print("❌ Cannot connect to Ollama. Start it with: ollama serve")
+        if not self.ollama.is_available():
+            logger.error("❌ Cannot connect to Ollama. Start it with: ollama serve")
             return
+        logger.info("✅ Ollama connected")
+
+        # Load and pin the model now so the first "hello" doesn't wait for it
+        if self.ollama.warm_up():
+            logger.info(f"✅ {self.ollama_model} loaded (keep_alive {self.ollama.keep_alive})")
         
         # Check OpenAI API key
         if not os.getenv('OPENAI_API_KEY') or os.getenv('OPENAI_API_KEY') == 'your_openai_api_key_here':
-            print("❌ OpenAI API key not set! Please add it to .env file")
+            logger.error("❌ OpenAI API key not set! Please add it to .env file")
             return
         
-        print("✅ OpenAI API key loaded")
+        logger.info("✅ OpenAI API key loaded")
         
         # Start voice activation
         self.run()
 
 def main():
+    setup_logging()
     assistant = AutoVoiceAssistant()
     assistant.start()
 
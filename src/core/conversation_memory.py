@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Conversation Memory
+Fixed-capacity chat history with rolling summarization of older turns,
+persisted so context survives restarts
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'memory.json')
+DROPPED_MARKER = "… "  # Starts a summary whose oldest part was cut
+
+
+def _clip_summary(summary: str, max_chars: int) -> str:
+    """
+    Keep the newest part of a summary within max_chars
+
+    Cuts at a word boundary and marks the dropped head, so the model sees
+    that earlier context existed instead of a sentence starting mid-word.
+    """
+    summary = summary.strip()
+    if len(summary) <= max_chars:
+        return summary
+    start = len(summary) - (max_chars - len(DROPPED_MARKER))
+    while start < len(summary) and not summary[start - 1].isspace():
+        start += 1  # Skip the partial first word
+    return (DROPPED_MARKER + summary[start:].lstrip()).rstrip()
+
+
+class ConversationMemory:
+    """
+    Recent (user, assistant) exchanges plus a summary of everything older
+
+    When the ring is full, the oldest half is folded into the summary in one
+    go - between folds the history only grows, so a model's cached prompt
+    prefix stays valid.
+    """
+
+    def __init__(self, capacity: int = None, summarizer=None, path: str = None,
+                 max_summary_chars: int = 600):
+        """
+        Args:
+            capacity: Exchanges kept verbatim (default: MEMORY_CAPACITY or 8)
+            summarizer: callable(summary, exchanges) -> new summary; None drops old turns
+            path: JSON file for persistence (default: MEMORY_PATH or data/memory.json, "" disables)
+            max_summary_chars: Hard cap on the stored summary
+        """
+        self.capacity = max(2, capacity or int(os.getenv('MEMORY_CAPACITY', '8')))
+        self.summarizer = summarizer
+        self.path = os.getenv('MEMORY_PATH', DEFAULT_MEMORY_PATH) if path is None else path
+        self.max_summary_chars = max_summary_chars
+
+        self._lock = threading.Lock()
+        self._turns = deque(maxlen=self.capacity)
+        self.summary = ""
+        self.version = 0  # Bumped on every fold (the prompt prefix changed)
+
+        # Summarization and disk writes run here, off the turn path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __iter__(self):
+        return iter(self.recent())
+
+    def recent(self, limit: int = None) -> list:
+        """Kept exchanges as (user, assistant) tuples, oldest first"""
+        with self._lock:
+            turns = list(self._turns)
+        return turns[-limit:] if limit else turns
+
+    def append(self, exchange: tuple):
+        """Add a (user, assistant) exchange, folding the oldest half into the summary when full"""
+        with self._lock:
+            evicted = []
+            if len(self._turns) == self.capacity:
+                evicted = [self._turns.popleft() for _ in range(self.capacity // 2)]
+            self._turns.append(tuple(exchange))
+
+        if evicted:
+            self._executor.submit(self._fold, evicted)
+        else:
+            self._executor.submit(self.save)
+
+    def _fold(self, evicted: list):
+        """Merge evicted exchanges into the rolling summary"""
+        summary = self.summary
+        if self.summarizer:
+            try:
+                summary = self.summarizer(summary, evicted) or summary
+            except Exception as e:
+                logger.warning(f"⚠️ Memory summarization failed: {e}")
+        with self._lock:
+            self.summary = _clip_summary(summary, self.max_summary_chars)
+            self.version += 1
+        logger.debug(f"🧠 Folded {len(evicted)} turns into memory summary ({len(self.summary)} chars)")
+        self.save()
+
+    def clear(self):
+        """Forget everything"""
+        with self._lock:
+            self._turns.clear()
+            self.summary = ""
+            self.version += 1
+        self._executor.submit(self.save)
+
+    def load(self):
+        """Restore summary and recent turns from disk"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            with self._lock:
+                self.summary = _clip_summary(data.get("summary", ""), self.max_summary_chars)
+                self._turns.extend(tuple(turn) for turn in data.get("turns", [])[-self.capacity:])
+            logger.info(f"✅ Restored conversation memory ({len(self._turns)} turns)")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load conversation memory: {e}")
+
+    def save(self):
+        """Write summary and recent turns atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {"summary": self.summary, "turns": list(self._turns)}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save conversation memory: {e}")
+
+    def close(self):
+        """Finish pending summarization/writes"""
+        self._executor.shutdown(wait=True)
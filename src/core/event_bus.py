@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Event Bus
+Single-loop asyncio pub/sub used by the assistant orchestrator
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class EventType:
+    """Events flowing through the assistant"""
+    AUDIO_SEGMENT = "audio_segment"        # A capture window finished (text may be empty)
+    TRANSCRIPT = "transcript"              # Non-empty transcription of a window
+    INTENT = "intent"                      # A turn was handled and produced a response
+    INCOMING_MESSAGE = "incoming_message"  # Telegram message received by the listener
+    SPEECH_DONE = "speech_done"            # TTS finished speaking
+
+
+class EventBus:
+    """Ordered event dispatch on one asyncio loop - handlers never run concurrently"""
+
+    def __init__(self, maxsize: int = 100):
+        self._handlers = defaultdict(list)
+        self._queue = None
+        self._maxsize = maxsize
+        self.published = defaultdict(int)
+
+    def subscribe(self, event_type: str, handler):
+        """Register an async handler(event: dict) for an event type"""
+        self._handlers[event_type].append(handler)
+
+    def _ensure_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._maxsize)
+        return self._queue
+
+    async def publish(self, event_type: str, **data):
+        """Queue an event (must be called on the bus loop)"""
+        self.published[event_type] += 1
+        await self._ensure_queue().put({"type": event_type, **data})
+
+    def publish_nowait(self, event_type: str, **data) -> bool:
+        """Queue an event without waiting (safe inside handlers) - False if the queue is full"""
+        try:
+            self._ensure_queue().put_nowait({"type": event_type, **data})
+        except asyncio.QueueFull:
+            logger.warning(f"⚠️ Event queue full, dropped {event_type}")
+            return False
+        self.published[event_type] += 1
+        return True
+
+    @property
+    def depth(self) -> int:
+        """Events waiting to be dispatched"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def run(self):
+        """Dispatch events to their handlers in publish order, forever"""
+        queue = self._ensure_queue()
+        while True:
+            event = await queue.get()
+            try:
+                for handler in self._handlers.get(event["type"], []):
+                    try:
+                        await handler(event)
+                    except Exception as e:
+                        logger.error(f"❌ Handler error for {event['type']}: {e}", exc_info=True)
+            finally:
+                queue.task_done()
@@ -6,7 +6,9 @@ Uses OpenAI GPT-4o-mini to understand user intent naturally with conversation co
 
 import os
 import json
+import time
 import logging
+from collections import deque
 from openai import OpenAI
 from dotenv import load_dotenv
 
@@ -16,14 +18,85 @@ load_dotenv(config_path)
 
 logger = logging.getLogger(__name__)
 
+# Static prefix - must stay byte-identical across calls so the provider can cache it.
+# Anything that changes per call (context, the command) goes in the last message.
+SYSTEM_PROMPT = """You parse voice commands for an assistant that can send Telegram messages.
+
+Decide the action:
+- "send_message": the user wants a message delivered to someone
+- "general_chat": anything else (questions, small talk)
+
+Recipient:
+- The person's name, lowercase
+- "him"/"her"/"them", or "also"/"and"/"too"/"plus" with no name, means the LAST recipient in the context
+
+Message - clean content only, drop command and filler words:
+- "send message to John saying that I won't" -> "I won't"
+- "tell him that I'll be late" -> "I'll be late"
+- "tell Sarthal to drink water" -> "drink water"
+- "remind him to eat healthy food" -> "eat healthy food"
+- "notify him I'm running late" -> "I'm running late"
+- "and tell him about the meeting" -> "about the meeting"
+
+For send_message with no identifiable recipient, recipient is "unknown".
+For general_chat, recipient and message are null.
+confidence is 0.0-1.0."""
+
+INTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": ["send_message", "general_chat"]},
+        "recipient": {"type": ["string", "null"]},
+        "message": {"type": ["string", "null"]},
+        "confidence": {"type": "number"}
+    },
+    "required": ["action", "recipient", "message", "confidence"],
+    "additionalProperties": False
+}
+
+# Used when INTENT_STRUCTURED_OUTPUT=false (models without json_schema support)
+JSON_OBJECT_SUFFIX = """
+
+Respond ONLY with JSON: {"action": ..., "recipient": ..., "message": ..., "confidence": ...}"""
+
 
 class IntentParser:
     """Uses GPT-4o-mini to parse user intent naturally with conversation history"""
 
-    def __init__(self):
+    def __init__(self, model: str = None, max_tokens: int = None, structured_output: bool = None):
+        """
+        Args:
+            model: Chat model (default: INTENT_MODEL or gpt-4o-mini)
+            max_tokens: Output token cap (default: INTENT_MAX_TOKENS or 80)
+            structured_output: Use a strict json_schema response (default: INTENT_STRUCTURED_OUTPUT or true)
+        """
         self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.conversation_context = []  # Store recent messages for context
-        logger.info("✅ AI Intent Parser initialized (GPT-4o-mini)")
+        self.model = model or os.getenv('INTENT_MODEL', 'gpt-4o-mini')
+        self.max_tokens = max_tokens or int(os.getenv('INTENT_MAX_TOKENS', '80'))
+        if structured_output is None:
+            structured_output = os.getenv('INTENT_STRUCTURED_OUTPUT', 'true').lower() == 'true'
+        self.structured_output = structured_output
+
+        if structured_output:
+            self.system_prompt = SYSTEM_PROMPT
+            self.response_format = {
+                "type": "json_schema",
+                "json_schema": {"name": "intent", "strict": True, "schema": INTENT_SCHEMA}
+            }
+        else:
+            self.system_prompt = SYSTEM_PROMPT + JSON_OBJECT_SUFFIX
+            self.response_format = {"type": "json_object"}
+
+        self.conversation_context = deque(maxlen=5)  # Last 5 exchanges for context
+
+        # Token usage
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.last_usage = {}
+
+        logger.info(f"✅ AI Intent Parser initialized ({self.model})")
 
     def update_context(self, user_text: str, assistant_response: str = None, recipient: str = None):
         """Update conversation context for better parsing"""
@@ -32,92 +105,67 @@ class IntentParser:
             "assistant": assistant_response,
             "recipient": recipient
         })
-        # Keep only last 5 exchanges for context
-        if len(self.conversation_context) > 5:
-            self.conversation_context = self.conversation_context[-5:]
 
-    def parse(self, user_text: str, conversation_history: list = None) -> dict:
+    def build_messages(self, user_text: str) -> list:
+        """Static system prefix first, then one message with context and the command"""
+        lines = []
+        for ctx in list(self.conversation_context)[-3:]:  # Last 3 exchanges
+            if ctx.get("recipient"):
+                lines.append(f"- {ctx.get('user', '')} [recipient: {ctx['recipient']}]")
+            else:
+                lines.append(f"- {ctx.get('user', '')}")
+
+        content = f'Command: "{user_text}"'
+        if lines:
+            content = "Context (oldest first):\n" + "\n".join(lines) + "\n\n" + content
+
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": content}
+        ]
+
+    def _record_usage(self, usage, latency: float):
+        """Accumulate token usage reported by the API"""
+        details = getattr(usage, "prompt_tokens_details", None)
+        prompt = getattr(usage, "prompt_tokens", None) or 0
+        cached = getattr(details, "cached_tokens", None) or 0
+        completion = getattr(usage, "completion_tokens", None) or 0
+
+        self.calls += 1
+        self.prompt_tokens += prompt
+        self.cached_tokens += cached
+        self.completion_tokens += completion
+        self.last_usage = {
+            "model": self.model,
+            "prompt_tokens": prompt,
+            "cached_tokens": cached,
+            "completion_tokens": completion,
+            "latency": latency
+        }
+
+    def parse(self, user_text: str) -> dict:
         """
         Use GPT-4o-mini to understand what the user wants to do with conversation context
 
+        Context comes from the exchanges recorded with update_context().
+
         Args:
             user_text: Natural language from user
-            conversation_history: Recent conversation for context (list of tuples)
 
         Returns:
             dict with parsed intent
         """
+        self.last_usage = {}
         try:
-            # Build context messages for GPT
-            context_messages = []
-
-            # System prompt
-            system_prompt = """You are an intent parser for a voice assistant. Analyze user commands and extract:
-1. Whether they want to send a message
-2. Who the recipient is (including pronouns like "him", "her", "them")
-3. What message to send
-
-CRITICAL RULES FOR MESSAGE EXTRACTION:
-- Extract CLEAN message content - remove command words and filler words
-- Remove: "tell him", "remind him", "notify him", "saying", "that", "to" at start
-- "send message to John saying that I won't" → message: "I won't"
-- "tell him that I'll be late" → message: "I'll be late"
-- "tell Sarthal to drink water" → message: "drink water"
-- "remind him to eat healthy food" → message: "eat healthy food"
-- "notify him I'm running late" → message: "I'm running late"
-
-CONTEXT AND FOLLOW-UP RULES:
-- Keywords "also", "and", "too", "plus" indicate FOLLOW-UP to same recipient
-- "also notify him to eat healthy" → use LAST recipient, message: "eat healthy"
-- "and tell him about the meeting" → use LAST recipient, message: "about the meeting"
-- If user says "him", "her", "them" without name, ALWAYS use LAST recipient from context
-- If NO explicit recipient AND user says "also/and/too", use LAST recipient
-- For follow-up messages, ALWAYS resolve to actual recipient name from context
-
-EXAMPLES:
-- "send message to Sarthal saying drink water" → recipient: "sarthal", message: "drink water"
-- "also notify him to eat healthy food" → recipient: "{LAST_RECIPIENT}", message: "eat healthy food"
-- "and tell him I'll be late" → recipient: "{LAST_RECIPIENT}", message: "I'll be late"
-- "tell him about the meeting" → recipient: "{LAST_RECIPIENT}", message: "about the meeting"
-- "how are you" → action: "general_chat"
-
-Respond ONLY with valid JSON:
-{
-  "action": "send_message" or "general_chat",
-  "recipient": "name or use context recipient",
-  "message": "the actual content to send (cleaned of command words)",
-  "confidence": 0.0 to 1.0,
-  "reasoning": "brief explanation"
-}"""
-
-            context_messages.append({"role": "system", "content": system_prompt})
-
-            # Add conversation history AND self.conversation_context for recipient tracking
-            if self.conversation_context and len(self.conversation_context) > 0:
-                context_str = "Recent conversation with recipients:\n"
-                for ctx in self.conversation_context[-3:]:  # Last 3 exchanges
-                    user_msg = ctx.get("user", "")
-                    recipient = ctx.get("recipient", "")
-                    if recipient:
-                        context_str += f"User: {user_msg} [Recipient was: {recipient}]\n"
-                    else:
-                        context_str += f"User: {user_msg}\n"
-                context_messages.append({"role": "user", "content": f"Context:\n{context_str}\n\nIMPORTANT: When user says 'him', 'her', or 'also', use the LAST recipient from context above."})
-
-            # Add current user input
-            context_messages.append({
-                "role": "user",
-                "content": f'Analyze this command: "{user_text}"'
-            })
-
-            # Call GPT-4o (full model for best accuracy)
+            start = time.monotonic()
             response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=context_messages,
+                model=self.model,
+                messages=self.build_messages(user_text),
                 temperature=0.1,  # Low temp for consistent parsing
-                max_tokens=200,
-                response_format={"type": "json_object"}  # Force JSON output
+                max_tokens=self.max_tokens,
+                response_format=self.response_format
             )
+            self._record_usage(response.usage, time.monotonic() - start)
 
             ai_response = response.choices[0].message.content.strip()
             parsed = json.loads(ai_response)
@@ -126,6 +174,7 @@ Respond ONLY with valid JSON:
             parsed["success"] = parsed.get("confidence", 0) > 0.7
 
             logger.info(f"✅ Intent: {parsed['action']} | Recipient: {parsed.get('recipient')} | Confidence: {parsed.get('confidence', 0):.2f}")
+            logger.debug(f"Intent tokens: {self.last_usage}")
 
             return parsed
 
@@ -133,6 +182,17 @@ Respond ONLY with valid JSON:
             logger.error(f"❌ Intent parsing error: {e}")
             return self._fallback_parse(user_text)
 
+    def get_stats(self) -> dict:
+        """Get token usage totals"""
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cache_hit_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+        }
+
     def _fallback_parse(self, user_text: str) -> dict:
         """Simple fallback if AI parsing fails"""
         text_lower = user_text.lower()
@@ -175,23 +235,22 @@ if __name__ == "__main__":
         "can you help me with something",
     ]
 
-    print("🧪 Testing GPT-4o-mini Intent Parser")
+    print(f"🧪 Testing Intent Parser ({parser.model})")
     print("=" * 60)
 
     # Simulate conversation history
-    history = [
-        ("send message to John saying hello", "Message sent to John!"),
-        ("also tell him about the meeting", "Message sent to John!")
-    ]
+    parser.update_context("send message to John saying hello", "Message sent to John!", recipient="john")
+    parser.update_context("also tell him about the meeting", "Message sent to John!", recipient="john")
 
     for phrase in test_phrases:
         print(f"\n📝 Input: '{phrase}'")
-        result = parser.parse(phrase, conversation_history=history)
+        result = parser.parse(phrase)
         print(f"✅ Action: {result['action']}")
         print(f"   Recipient: {result.get('recipient', 'N/A')}")
         print(f"   Message: {result.get('message', 'N/A')}")
         print(f"   Confidence: {result.get('confidence', 0):.2f}")
         print(f"   Reasoning: {result.get('reasoning', 'N/A')}")
 
+    print(f"\n📊 Token usage: {parser.get_stats()}")
     print("\n" + "=" * 60)
     print("✅ Test complete!")
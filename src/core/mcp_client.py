@@ -1,27 +1,266 @@
 #!/usr/bin/env python3
 """
 MCP Client for Voice Assistant
-Connects to MCP servers (like Telegram) to execute tasks
+Connects to MCP servers (like Telegram) to execute tasks - over stdio, SSE,
+or in-process over memory streams when the server's app can be imported.
+Sessions stay open, several servers connect concurrently and tool calls can
+fan out in parallel. Each server's tool catalog is cached and arguments are
+validated locally.
 """
 
+import os
+import anyio
 import asyncio
 import logging
+import threading
+from contextlib import asynccontextmanager, AsyncExitStack
 from typing import Optional, Dict, Any
-from mcp import ClientSession, StdioServerParameters
+from jsonschema import validators
+from jsonschema.exceptions import best_match
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
+from mcp.client.sse import sse_client
+from mcp.shared.memory import create_client_server_memory_streams
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
 
 logger = logging.getLogger(__name__)
 
+# Per-call timeout for fan-out calls
+CALL_TIMEOUT = float(os.getenv('MCP_CALL_TIMEOUT', '30'))
+
+
+class ToolResult:
+    """Outcome of a tool call, read from the server's structured content"""
+
+    def __init__(self, success: bool, text: str = None, data: dict = None):
+        self.success = success
+        self.text = text        # Human-readable text, for display only
+        self.data = data or {}  # Structured fields (message_id, peer_id, error_code, ...)
+
+    @classmethod
+    def from_call(cls, result) -> "ToolResult":
+        """Build from an mcp CallToolResult"""
+        text = result.content[0].text if result.content else None
+        data = getattr(result, "structuredContent", None) or {}
+        return cls(data.get("success", not result.isError), text, data)
+
+    @classmethod
+    def failure(cls, error: str, error_code: str) -> "ToolResult":
+        """A call that failed on the client side (never reached the tool)"""
+        return cls(False, None, {"success": False, "error": error, "error_code": error_code})
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.data.get("error")
+
+    @property
+    def error_code(self) -> Optional[str]:
+        return self.data.get("error_code")
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        """Seconds to wait before retrying (flood waits), None if not rate limited"""
+        return self.data.get("retry_after")
+
+    @property
+    def message_id(self) -> Optional[int]:
+        return self.data.get("message_id")
+
+    @property
+    def peer_id(self) -> Optional[int]:
+        return self.data.get("peer_id")
+
+    def __repr__(self):
+        return f"ToolResult(success={self.success}, data={self.data})"
+
 
 class MCPClient:
     """MCP Client to interact with various MCP servers"""
 
     def __init__(self):
         self.servers = {}
-        self.sessions = {}
+        self.sessions = {}  # Open sessions: name -> initialized ClientSession
+        self._mounts = {}   # name -> (stop event, task holding the session, in-process app or None)
+        self._lost = {}     # Persistent sessions that died: name -> (server target, app), reopened on the next call
+        self._reconnect_lock = asyncio.Lock()
+
+        # Tool catalogs: server -> {tool name: (Tool, compiled validator)}
+        self.catalogs = {}
+        self._stale_catalogs = set()  # Servers that sent tools/list_changed
+        self.rejected_calls = 0
         logger.info("✅ MCP Client initialized")
 
-    async def connect_server(self, server_name: str, command: str, args: list):
+    def _message_handler(self, server_name: str):
+        """Session callback - a tools/list_changed notification marks the catalog for refresh"""
+        async def handle(message):
+            if (isinstance(message, types.ServerNotification)
+                    and isinstance(message.root, types.ToolListChangedNotification)):
+                logger.info(f"🔄 {server_name} tool list changed")
+                self._stale_catalogs.add(server_name)
+        return handle
+
+    async def _load_catalog(self, server_name: str, session: ClientSession):
+        """List the server's tools once and compile a validator per input schema"""
+        tools_result = await session.list_tools()
+        catalog = {}
+        for tool in tools_result.tools:
+            schema = tool.inputSchema or {"type": "object"}
+            catalog[tool.name] = (tool, validators.validator_for(schema)(schema))
+        self.catalogs[server_name] = catalog
+        self._stale_catalogs.discard(server_name)
+        logger.info(f"📚 Cached {len(catalog)} {server_name} tools")
+
+    async def refresh_catalog(self, server_name: str) -> bool:
+        """Fetch a server's tool catalog now (done at connect time)"""
+        try:
+            async with self._open_session(server_name) as session:
+                await self._load_catalog(server_name, session)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not fetch {server_name} tool catalog: {e}")
+            return False
+
+    def validate_arguments(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+        """
+        Check arguments against the cached input schema
+
+        Returns:
+            Error message, or None if valid (or no catalog is cached yet)
+        """
+        catalog = self.catalogs.get(server_name)
+        if catalog is None:
+            return None
+        if tool_name not in catalog:
+            return f"unknown tool '{tool_name}'"
+        error = best_match(catalog[tool_name][1].iter_errors(arguments))
+        if error is None:
+            return None
+        location = ".".join(str(part) for part in error.absolute_path)
+        return f"{location}: {error.message}" if location else error.message
+
+    async def mount_server(self, server_name: str, app) -> bool:
+        """
+        Run an MCP server app in this process and keep a session open to it
+
+        Tool calls then go over memory streams on the current loop - no
+        subprocess, no stdio hop, and the server reuses this process's clients.
+
+        Args:
+            server_name: Name to identify this server (e.g., "telegram")
+            app: mcp.server.Server instance (e.g., telegram_server.app)
+        """
+        if await self._start_session(server_name, app):
+            logger.info(f"✅ Mounted {server_name} MCP server in-process")
+            return True
+        return False
+
+    async def _start_session(self, server_name: str, app=None) -> bool:
+        """Open a persistent session (held by its own task) and wait until it's initialized"""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        stop = asyncio.Event()
+        task = loop.create_task(self._hold_session(server_name, ready, stop, app),
+                                name=f"MCP-{server_name}")
+        self._mounts[server_name] = (stop, task, app)
+        try:
+            await ready
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to open {server_name} session: {e}")
+            self._mounts.pop(server_name, None)
+            return False
+
+    async def _hold_session(self, server_name: str, ready: asyncio.Future, stop: asyncio.Event, app=None):
+        """Own the transport and session for a persistent connection's whole lifetime (one task)"""
+        try:
+            async with AsyncExitStack() as stack:
+                if app is not None:
+                    client_streams, server_streams = await stack.enter_async_context(
+                        create_client_server_memory_streams())
+                    server_task = asyncio.create_task(app.run(
+                        server_streams[0],
+                        server_streams[1],
+                        app.create_initialization_options()
+                    ))
+                    stack.push_async_callback(self._cancel, server_task)
+                    read, write = client_streams
+                else:
+                    read, write = await stack.enter_async_context(self._transport(server_name))
+
+                session = await stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self._message_handler(server_name)))
+                await session.initialize()
+                await self._load_catalog(server_name, session)
+                self.sessions[server_name] = session
+                stack.callback(self._drop_session, server_name, session)  # Runs first on close
+
+                ready.set_result(True)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+                return
+            logger.error(f"❌ {server_name} session closed: {e}")
+        if not stop.is_set():
+            self._forget(server_name)  # Died on its own
+
+    def _drop_session(self, server_name: str, session: ClientSession):
+        if self.sessions.get(server_name) is session:  # Not a reconnected successor
+            del self.sessions[server_name]
+
+    def _forget(self, server_name: str):
+        """Drop a dead persistent session everywhere - the next call reopens it (_reconnect)"""
+        mount = self._mounts.pop(server_name, None)
+        if mount is None:
+            return
+        stop, _, app = mount
+        stop.set()  # The holder task closes what's left of the transport
+        self.sessions.pop(server_name, None)
+        self._lost[server_name] = (self.servers.pop(server_name, None), app)
+
+    @staticmethod
+    def _connection_lost(e: Exception) -> bool:
+        """The session's transport is gone (server process exited, SSE stream dropped)"""
+        if isinstance(e, (anyio.ClosedResourceError, anyio.BrokenResourceError)):
+            return True
+        return getattr(getattr(e, "error", None), "code", None) == types.CONNECTION_CLOSED
+
+    async def _reconnect(self, server_name: str) -> bool:
+        """Reopen a persistent session that died - done by the next call, not a retry loop"""
+        async with self._reconnect_lock:
+            if server_name not in self._lost:
+                return True  # A concurrent call reopened it
+            target, app = self._lost.pop(server_name)
+            logger.info(f"🔄 Reconnecting {server_name} MCP server...")
+            if target is not None:
+                self.servers[server_name] = target
+            if await self._start_session(server_name, app):
+                return True
+            self.servers.pop(server_name, None)
+            self._lost[server_name] = (target, app)
+            return False
+
+    @staticmethod
+    async def _cancel(task: asyncio.Task):
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def close(self):
+        """Close open sessions and stop in-process servers"""
+        for stop, _, _ in self._mounts.values():
+            stop.set()
+        await asyncio.gather(*(task for _, task, _ in self._mounts.values()), return_exceptions=True)
+        self._mounts.clear()
+        self._lost.clear()
+
+    def is_connected(self, server_name: str) -> bool:
+        return server_name in self.sessions or server_name in self.servers
+
+    async def connect_server(self, server_name: str, command: str, args: list, persistent: bool = True):
         """
         Connect to an MCP server
 
@@ -29,6 +268,7 @@ class MCPClient:
             server_name: Name to identify this server (e.g., "telegram")
             command: Command to start server (e.g., "python")
             args: Arguments for command (e.g., ["src/mcp_servers/telegram_server.py"])
+            persistent: Keep the server process and session open (False: one process per call)
         """
         try:
             logger.info(f"🔌 Connecting to {server_name} MCP server...")
@@ -41,6 +281,12 @@ class MCPClient:
 
             # Store server params
             self.servers[server_name] = server_params
+            if persistent:
+                if not await self._start_session(server_name):
+                    self.servers.pop(server_name, None)
+                    return False
+            else:
+                await self.refresh_catalog(server_name)
 
             logger.info(f"✅ Connected to {server_name} server")
             return True
@@ -49,7 +295,64 @@ class MCPClient:
             logger.error(f"❌ Failed to connect to {server_name}: {e}")
             return False
 
-    async def call_tool(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    async def connect_url(self, server_name: str, url: str, persistent: bool = True) -> bool:
+        """
+        Use a shared MCP server over HTTP/SSE instead of spawning one
+
+        Args:
+            server_name: Name to identify this server (e.g., "telegram")
+            url: SSE endpoint (e.g., "http://127.0.0.1:8765/sse")
+            persistent: Keep the SSE session open (False: connect per call)
+        """
+        self.servers[server_name] = url
+        if persistent:
+            if not await self._start_session(server_name):
+                self.servers.pop(server_name, None)
+                return False
+        else:
+            await self.refresh_catalog(server_name)
+        logger.info(f"✅ Using {server_name} server at {url}")
+        return True
+
+    async def connect_all(self, specs: Dict[str, dict]) -> Dict[str, bool]:
+        """
+        Connect several servers concurrently - startup costs the slowest one
+
+        Args:
+            specs: server name -> {"app": Server} | {"url": str} | {"command": str, "args": list}
+
+        Returns:
+            server name -> connected
+        """
+        async def connect(server_name, spec):
+            if "app" in spec:
+                return await self.mount_server(server_name, spec["app"])
+            if "url" in spec:
+                return await self.connect_url(server_name, spec["url"])
+            return await self.connect_server(server_name, spec["command"], spec.get("args", []))
+
+        results = await asyncio.gather(*(connect(name, spec) for name, spec in specs.items()),
+                                       return_exceptions=True)
+        return {name: result is True for name, result in zip(specs, results)}
+
+    def _transport(self, server_name: str):
+        target = self.servers[server_name]
+        return sse_client(target) if isinstance(target, str) else stdio_client(target)
+
+    @asynccontextmanager
+    async def _open_session(self, server_name: str):
+        """Initialized session: the open one, or a fresh SSE/stdio connection"""
+        session = self.sessions.get(server_name)
+        if session is not None:
+            yield session
+            return
+
+        async with self._transport(server_name) as (read, write):
+            async with ClientSession(read, write, message_handler=self._message_handler(server_name)) as session:
+                await session.initialize()
+                yield session
+
+    async def call_tool_result(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> ToolResult:
         """
         Call a tool on an MCP server
 
@@ -59,36 +362,71 @@ class MCPClient:
             arguments: Tool arguments as dictionary
 
         Returns:
-            Result text or None if failed
+            ToolResult - check .success, then .message_id / .error_code / .retry_after
         """
         try:
-            if server_name not in self.servers:
+            if server_name in self._lost and not await self._reconnect(server_name):
+                return ToolResult.failure(f"Server {server_name} disconnected", "DISCONNECTED")
+            if not self.is_connected(server_name):
                 logger.error(f"❌ Server {server_name} not connected")
-                return None
+                return ToolResult.failure(f"Server {server_name} not connected", "NOT_CONNECTED")
+
+            # Bad arguments fail here instead of after a round trip
+            if server_name in self._stale_catalogs:
+                await self.refresh_catalog(server_name)
+            error = self.validate_arguments(server_name, tool_name, arguments)
+            if error:
+                self.rejected_calls += 1
+                logger.error(f"❌ Invalid {server_name}.{tool_name} call: {error}")
+                return ToolResult.failure(error, "INVALID_ARGUMENTS")
 
             logger.info(f"📞 Calling {server_name}.{tool_name} with args: {arguments}")
 
-            server_params = self.servers[server_name]
+            async with self._open_session(server_name) as session:
+                # Call the tool
+                result = ToolResult.from_call(await session.call_tool(tool_name, arguments))
+                logger.info(f"✅ Tool result: {result}")
+                return result
+
+        except Exception as e:
+            logger.error(f"❌ Error calling tool: {e}")
+            if self._connection_lost(e) and server_name in self._mounts:
+                # Not retried here - the call may have run; the next call reconnects
+                self._forget(server_name)
+                return ToolResult.failure(f"Server {server_name} disconnected: {e}", "DISCONNECTED")
+            return ToolResult.failure(str(e), type(e).__name__)
 
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
+    async def call_tool(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+        """
+        Call a tool and return its text (see call_tool_result for structured fields)
 
-                    # Call the tool
-                    result = await session.call_tool(tool_name, arguments)
+        Returns:
+            Result text or None if failed before reaching the tool
+        """
+        return (await self.call_tool_result(server_name, tool_name, arguments)).text
 
-                    # Extract text from result
-                    if result.content and len(result.content) > 0:
-                        response_text = result.content[0].text
-                        logger.info(f"✅ Tool result: {response_text[:100]}...")
-                        return response_text
-                    else:
-                        logger.warning("⚠️ Tool returned no content")
-                        return None
+    async def call_tools(self, calls: list, timeout: float = None) -> list:
+        """
+        Run tool calls concurrently, across servers or on one
 
-        except Exception as e:
-            logger.error(f"❌ Error calling tool: {e}")
-            return None
+        Args:
+            calls: (server_name, tool_name, arguments) tuples
+            timeout: Per-call seconds (default: MCP_CALL_TIMEOUT or 30) - a call
+                     that runs over is cancelled and yields None
+
+        Returns:
+            ToolResults in call order (error_code "TIMEOUT" for timed-out calls)
+        """
+        timeout = timeout or CALL_TIMEOUT
+
+        async def run(server_name, tool_name, arguments):
+            try:
+                return await asyncio.wait_for(self.call_tool_result(server_name, tool_name, arguments), timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"❌ {server_name}.{tool_name} timed out after {timeout}s")
+                return ToolResult.failure(f"Timed out after {timeout}s", "TIMEOUT")
+
+        return list(await asyncio.gather(*(run(*call) for call in calls)))
 
     async def list_tools(self, server_name: str) -> list:
         """
@@ -101,44 +439,90 @@ class MCPClient:
             List of tool dictionaries
         """
         try:
-            if server_name not in self.servers:
+            if server_name in self._lost and not await self._reconnect(server_name):
+                return []
+            if not self.is_connected(server_name):
                 logger.error(f"❌ Server {server_name} not connected")
                 return []
 
-            server_params = self.servers[server_name]
-
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-
-                    tools_result = await session.list_tools()
+            if server_name not in self.catalogs or server_name in self._stale_catalogs:
+                async with self._open_session(server_name) as session:
+                    await self._load_catalog(server_name, session)
 
-                    tools = []
-                    for tool in tools_result.tools:
-                        tools.append({
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": tool.inputSchema.get("properties", {})
-                        })
-
-                    return tools
+            return self._tool_dicts(tool for tool, _ in self.catalogs[server_name].values())
 
         except Exception as e:
             logger.error(f"❌ Error listing tools: {e}")
             return []
 
+    @staticmethod
+    def _tool_dicts(tools) -> list:
+        return [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.inputSchema.get("properties", {})
+            }
+            for tool in tools
+        ]
+
 
 # Synchronous wrapper for easy use
 class MCPClientSync:
     """Synchronous wrapper for MCP client"""
 
-    def __init__(self):
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        """
+        Args:
+            loop: Running loop that owns the sessions and the shared Telegram
+                  client (e.g. the assistant's). Only then can the Telegram
+                  server be mounted in-process - Telethon cannot switch loops,
+                  so without one a private loop thread is started on first
+                  use and Telegram runs as a stdio subprocess.
+        """
         self.client = MCPClient()
         self._connected = False
+        self.loop = loop
+        self.in_process = loop is not None and os.getenv('MCP_IN_PROCESS', 'true').lower() == 'true'
+
+    def _run(self, coro, timeout: float = 60):
+        """Run a client coroutine on self.loop, where the open sessions live"""
+        if self.loop is None:
+            self._start_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def _start_loop(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="MCPLoop").start()
+
+    async def mount_telegram(self) -> bool:
+        """Mount the Telegram server in-process (await on self.loop)"""
+        try:
+            from src.mcp_servers.telegram_server import app as telegram_app
+        except Exception as e:
+            logger.warning(f"⚠️ Cannot load the Telegram MCP server in-process: {e}")
+            return False
+        self._connected = await self.client.mount_server("telegram", telegram_app)
+        return self._connected
 
     def connect_telegram(self):
-        """Connect to Telegram MCP server"""
-        result = asyncio.run(self.client.connect_server(
+        """
+        Connect to Telegram MCP server: a shared HTTP server if MCP_TELEGRAM_URL
+        is set, else in-process (only on a caller-supplied loop, unless
+        MCP_IN_PROCESS=false), else a subprocess
+        """
+        url = os.getenv('MCP_TELEGRAM_URL')
+        if url:
+            self._connected = self._run(self.client.connect_url("telegram", url))
+            return self._connected
+
+        if self.in_process:
+            if self._run(self.mount_telegram()):
+                return True
+            logger.warning("⚠️ In-process Telegram server unavailable, using stdio")
+            self.in_process = False
+
+        result = self._run(self.client.connect_server(
             "telegram",
             "python",
             ["src/mcp_servers/telegram_server.py"]
@@ -146,7 +530,7 @@ class MCPClientSync:
         self._connected = result
         return result
 
-    def send_telegram_message(self, message: str, recipient: str = None, chat_id: str = None) -> Optional[str]:
+    def send_telegram_message(self, message: str, recipient: str = None, chat_id: str = None) -> ToolResult:
         """Send a Telegram message"""
         if not self._connected:
             self.connect_telegram()
@@ -157,7 +541,7 @@ class MCPClientSync:
         if chat_id:
             args["chat_id"] = chat_id
 
-        return asyncio.run(self.client.call_tool(
+        return self._run(self.client.call_tool_result(
             "telegram",
             "send_telegram_message",
             args
@@ -174,7 +558,7 @@ class MCPClientSync:
         if chat_id:
             args["chat_id"] = chat_id
 
-        return asyncio.run(self.client.call_tool(
+        return self._run(self.client.call_tool(
             "telegram",
             "send_telegram_photo",
             args
@@ -185,18 +569,27 @@ class MCPClientSync:
         if not self._connected:
             self.connect_telegram()
 
-        return asyncio.run(self.client.call_tool(
+        return self._run(self.client.call_tool(
             "telegram",
             "get_telegram_bot_info",
             {}
         ))
 
+    def call_tools(self, calls: list, timeout: float = None) -> list:
+        """Run (server, tool, arguments) calls in parallel - returns ToolResults in order"""
+        return self._run(self.client.call_tools(calls, timeout), timeout=(timeout or CALL_TIMEOUT) + 5)
+
+    def close(self):
+        """Close sessions and server processes"""
+        if self.loop is not None:
+            self._run(self.client.close())
+
     def list_telegram_tools(self) -> list:
         """List available Telegram tools"""
         if not self._connected:
             self.connect_telegram()
 
-        return asyncio.run(self.client.list_tools("telegram"))
+        return self._run(self.client.list_tools("telegram"))
 
 
 if __name__ == "__main__":
@@ -222,7 +615,7 @@ if __name__ == "__main__":
 
         print("\n4️⃣ Sending test message...")
         result = client.send_telegram_message("🧪 Test from MCP Client!")
-        print(f"✅ {result}")
+        print(f"✅ {result.text}" if result.success else f"❌ {result.error_code}: {result.error}")
     else:
         print("❌ Failed to connect")
 
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Adaptive Noise Gate
+Tracks the room's noise floor and only forwards windows with enough SNR to transcription
+"""
+
+import os
+import math
+import threading
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+
+def rms_to_db(rms: float) -> float:
+    """Convert a linear RMS level (full scale = 1.0) to dBFS"""
+    return 20.0 * math.log10(max(rms, 1e-10))
+
+
+def db_to_rms(db: float) -> float:
+    """Convert dBFS back to a linear RMS level"""
+    return 10.0 ** (db / 20.0)
+
+
+class NoiseFloorTracker:
+    """Exponential percentile tracker of window levels in the dB domain"""
+
+    def __init__(self, percentile: float = 0.2, step_db: float = 2.0,
+                 initial_floor_rms: float = 0.001, min_floor_rms: float = 1e-4,
+                 warmup_windows: int = 5):
+        """
+        Args:
+            percentile: Quantile of window levels to converge on (low = noise floor)
+            step_db: Adaptation step per window; rises by step*percentile, falls by step*(1-percentile)
+            initial_floor_rms: Starting estimate before any audio has been seen
+            min_floor_rms: Floor never drops below this (digital silence guard)
+            warmup_windows: Windows during which the floor snaps to the quietest level seen
+        """
+        self.percentile = percentile
+        self.step_db = step_db
+        self.min_floor_db = rms_to_db(min_floor_rms)
+        self.floor_db = max(rms_to_db(initial_floor_rms), self.min_floor_db)
+        self.warmup_windows = warmup_windows
+        self.windows_seen = 0
+
+    @property
+    def floor_rms(self) -> float:
+        """Current noise floor as linear RMS"""
+        return db_to_rms(self.floor_db)
+
+    def update(self, rms: float) -> float:
+        """Feed one window level and return the new floor in dBFS"""
+        level_db = rms_to_db(rms)
+        self.windows_seen += 1
+
+        if self.windows_seen <= self.warmup_windows:
+            # Fast start: the first windows set the floor directly (quietest wins)
+            if self.windows_seen == 1 or level_db < self.floor_db:
+                self.floor_db = level_db
+        elif level_db > self.floor_db:
+            self.floor_db += self.step_db * self.percentile
+        else:
+            self.floor_db -= self.step_db * (1.0 - self.percentile)
+        self.floor_db = max(self.floor_db, self.min_floor_db)
+        return self.floor_db
+
+
+class NoiseGate:
+    """SNR-based gate with hysteresis on top of a NoiseFloorTracker"""
+
+    def __init__(self, tracker: NoiseFloorTracker = None,
+                 snr_open_db: float = None, snr_close_db: float = None):
+        """
+        Args:
+            tracker: Noise floor estimator (a default one is created if omitted)
+            snr_open_db: SNR needed to open the gate from closed
+            snr_close_db: SNR below which an open gate closes (and the bar while expecting speech)
+        """
+        self.tracker = tracker or NoiseFloorTracker()
+        self.snr_open_db = snr_open_db if snr_open_db is not None else float(os.getenv('NOISE_GATE_OPEN_DB', '6.0'))
+        self.snr_close_db = snr_close_db if snr_close_db is not None else float(os.getenv('NOISE_GATE_CLOSE_DB', '3.0'))
+        self.is_open = False
+
+        self._lock = threading.Lock()
+        self.windows_total = 0
+        self.windows_gated = 0
+        self.windows_forwarded = 0
+
+    def process(self, rms: float, expecting_speech: bool = False) -> float:
+        """
+        Decide whether a window should be forwarded to transcription
+
+        Args:
+            rms: Window RMS level (linear, full scale = 1.0)
+            expecting_speech: True inside a conversation - use the lower close threshold
+
+        Returns:
+            Lowest linear RMS that counts as speech (floor + close threshold)
+            if the window should be transcribed, else 0.0. A forwarded window
+            has frames at least this loud, so trimming against it keeps speech.
+        """
+        with self._lock:
+            was_open = self.is_open
+            snr_db = rms_to_db(rms) - self.tracker.floor_db
+            threshold = self.snr_close_db if (self.is_open or expecting_speech) else self.snr_open_db
+            self.is_open = snr_db >= threshold
+            speech_rms = self.tracker.floor_rms * db_to_rms(self.snr_close_db)
+
+            # Update after deciding so a loud window cannot raise its own bar, and never
+            # with the window that opened the gate - in warm-up the floor would snap to it
+            if was_open or not self.is_open:
+                self.tracker.update(rms)
+
+            self.windows_total += 1
+            if self.is_open:
+                self.windows_forwarded += 1
+            else:
+                self.windows_gated += 1
+
+            return speech_rms if self.is_open else 0.0
+
+    def get_stats(self) -> dict:
+        """Get gate metrics"""
+        with self._lock:
+            return {
+                "windows_total": self.windows_total,
+                "windows_gated": self.windows_gated,
+                "windows_forwarded": self.windows_forwarded,
+                "forwarded_ratio": self.windows_forwarded / self.windows_total if self.windows_total else 0.0,
+                "noise_floor_db": round(self.tracker.floor_db, 1),
+                "noise_floor_rms": self.tracker.floor_rms,
+                "is_open": self.is_open
+            }
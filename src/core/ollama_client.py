@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Ollama Client
+Pooled HTTP session, keep_alive model pinning and /api/chat requests whose
+message prefix stays stable so Ollama's KV cache only evaluates new tokens
+"""
+
+import os
+import json
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are Gemma, a helpful voice assistant. Keep responses very short (1-2 sentences)."
+SUMMARY_PROMPT = ("Update the summary of a conversation between a user and a voice assistant. "
+                  "Keep names, facts, preferences and open requests. Reply with the summary only, "
+                  "at most 3 sentences.")
+
+
+class OllamaClient:
+    """Chat with a local Ollama model over one keep-alive connection pool"""
+
+    def __init__(self, base_url: str = None, model: str = None, keep_alive: str = None,
+                 system_prompt: str = SYSTEM_PROMPT, timeout: float = 30):
+        """
+        Args:
+            base_url: Ollama server (default: OLLAMA_BASE_URL or http://localhost:11434)
+            model: Model name (default: OLLAMA_MODEL or gemma2:2b)
+            keep_alive: How long Ollama keeps the model loaded after a request (default: OLLAMA_KEEP_ALIVE or 30m)
+            system_prompt: Fixed first message - never changes so the cached prefix stays valid
+            timeout: Per-request timeout in seconds
+        """
+        self.base_url = (base_url or os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')).rstrip('/')
+        self.model = model or os.getenv('OLLAMA_MODEL', 'gemma2:2b')
+        self.keep_alive = keep_alive or os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        self.system_prompt = system_prompt
+        self.system_message = {"role": "system", "content": system_prompt}
+
+        # Metrics from Ollama's final chunk
+        self.requests = 0
+        self.prompt_eval_count = 0
+        self.eval_count = 0
+
+    def is_available(self) -> bool:
+        """True if the server answers /api/tags"""
+        try:
+            return self.session.get(f"{self.base_url}/api/tags", timeout=3).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def warm_up(self) -> bool:
+        """Load the model (pinned for keep_alive) so the first turn doesn't pay a cold load"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/chat",
+                json={
+                    "model": self.model,
+                    "messages": [self.system_message],
+                    "stream": False,
+                    "keep_alive": self.keep_alive,
+                    "options": {"num_predict": 1}
+                },
+                timeout=120  # A cold load can take a while
+            )
+            return response.status_code == 200
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Ollama warm-up failed: {e}")
+            return False
+
+    def build_messages(self, prompt: str, history: list = None, summary: str = "") -> list:
+        """System prompt (+ summary), then past exchanges oldest first, then the prompt"""
+        system = self.system_message
+        if summary:
+            system = {"role": "system", "content": f"{self.system_prompt}\nEarlier in this conversation: {summary}"}
+        messages = [system]
+        for user_msg, ai_msg in history or []:
+            messages.append({"role": "user", "content": user_msg})
+            messages.append({"role": "assistant", "content": ai_msg})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def chat(self, prompt: str, history: list = None, summary: str = "", max_tokens: int = None,
+             cancelled=None) -> str:
+        """
+        Stream a reply to prompt
+
+        Args:
+            prompt: User text
+            history: Past (user, assistant) exchanges, oldest first
+            summary: Summary of exchanges older than history
+            max_tokens: Cap on generated tokens (num_predict), None for the model default
+            cancelled: threading.Event - generation stops and the stream is closed once set
+
+        Returns:
+            Reply text, or None on HTTP error or cancellation
+        """
+        payload = {
+            "model": self.model,
+            "messages": self.build_messages(prompt, history, summary),
+            "stream": True,
+            "keep_alive": self.keep_alive
+        }
+        if max_tokens:
+            payload["options"] = {"num_predict": max_tokens}
+
+        parts = []
+        with self.session.post(f"{self.base_url}/api/chat", json=payload, stream=True, timeout=self.timeout) as response:
+            if response.status_code != 200:
+                logger.error(f"❌ Ollama returned {response.status_code}")
+                return None
+            for line in response.iter_lines():
+                if cancelled is not None and cancelled.is_set():
+                    return None  # Closing the stream makes Ollama stop generating
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                parts.append(chunk.get("message", {}).get("content", ""))
+                if chunk.get("done"):
+                    self.requests += 1
+                    self.prompt_eval_count += chunk.get("prompt_eval_count", 0)
+                    self.eval_count += chunk.get("eval_count", 0)
+                    break
+
+        return "".join(parts)
+
+    def summarize(self, summary: str, exchanges: list, max_tokens: int = 150) -> str:
+        """
+        Fold exchanges into a running summary with the local model
+
+        Args:
+            summary: Current summary ("" if none)
+            exchanges: (user, assistant) tuples to fold in, oldest first
+
+        Returns:
+            The new summary (the old one on failure)
+        """
+        transcript = "\n".join(f"User: {user_msg}\nAssistant: {ai_msg}" for user_msg, ai_msg in exchanges)
+        content = f"Current summary: {summary or '(none)'}\n\nNew conversation:\n{transcript}"
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/chat",
+                json={
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": SUMMARY_PROMPT},
+                        {"role": "user", "content": content}
+                    ],
+                    "stream": False,
+                    "keep_alive": self.keep_alive,
+                    "options": {"num_predict": max_tokens}
+                },
+                timeout=self.timeout
+            )
+            if response.status_code != 200:
+                return summary
+            return response.json().get("message", {}).get("content", "").strip() or summary
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Ollama summarization failed: {e}")
+            return summary
+
+    def get_stats(self) -> dict:
+        """Get request and token counts"""
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "prompt_eval_count": self.prompt_eval_count,
+            "eval_count": self.eval_count
+        }
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
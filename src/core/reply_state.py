@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Reply State Machine
+Deterministic reply/confirm/cancel handling after a notification - no model calls
+"""
+
+import os
+import re
+import time
+import threading
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+
+class ReplyState:
+    """States of the reply flow"""
+    IDLE = "idle"                      # No message to reply to
+    NOTIFIED = "notified"              # Notification announced, reply not requested yet
+    AWAITING_REPLY = "awaiting_reply"  # User said "reply" - next utterance is the dictation
+    CONFIRMING = "confirming"          # Draft read back, waiting for yes/no
+    SENT = "sent"                      # Reply delivered
+    EXITED = "exited"                  # Cancelled or timed out
+
+
+CANCEL_PHRASES = ("never mind", "nevermind", "no thanks", "skip", "ignore", "cancel", "forget it", "don't reply")
+CONFIRM_PHRASES = ("yes", "yeah", "yep", "sure", "send it", "send", "confirm", "correct", "ok", "okay")
+DENY_PHRASES = ("no", "nope", "wrong", "don't send")
+REPLY_KEYWORDS = ("reply", "respond", "answer")
+NEW_COMMAND_PHRASES = ("send message to", "send a message to", "tell someone", "notify someone")
+QUESTION_WORDS = ("what", "how", "why", "when", "who", "where")
+
+_REPLY_PREFIX = re.compile(r'^\s*(reply|respond|answer)\s*(to\s+(him|her|them)\s*)?(with|saying|that)?\s*,?\s*', re.IGNORECASE)
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.lower().replace(',', ' ').replace('.', ' ').replace('!', ' ').replace('?', ' ').split())
+
+
+def _has_phrase(text: str, phrases) -> bool:
+    """Whole-word phrase match on normalized text"""
+    padded = f" {text} "
+    return any(f" {phrase} " in padded for phrase in phrases)
+
+
+class ReplyStateMachine:
+    """Decides what to do with an utterance while a received message is awaiting reply"""
+
+    def __init__(self, reply_window: float = 60.0, confirm_before_send: bool = None):
+        """
+        Args:
+            reply_window: Seconds after a notification during which replies are accepted
+            confirm_before_send: Read the draft back and wait for yes/no before sending
+        """
+        self.reply_window = reply_window
+        if confirm_before_send is None:
+            confirm_before_send = os.getenv('REPLY_CONFIRM', 'false').lower() == 'true'
+        self.confirm_before_send = confirm_before_send
+
+        self._lock = threading.Lock()
+        self.state = ReplyState.IDLE
+        self.message = None       # The received message being replied to
+        self.recipient = None     # Contact key of its sender
+        self.draft = None         # Reply text awaiting confirmation
+        self.entered_at = 0.0
+
+    def _enter(self, state: str):
+        self.state = state
+        self.entered_at = time.time()
+
+    def on_notification(self, message: dict):
+        """A new message was announced - it becomes the reply target"""
+        with self._lock:
+            self.message = message
+            # contacts.json key when the listener could map the sender, else their first name
+            self.recipient = message.get("contact_key") or message["sender_name"].split()[0].lower()
+            self.draft = None
+            self._enter(ReplyState.NOTIFIED)
+
+    def expect_reply(self):
+        """Put the machine into reply mode for the current target (e.g. pending notification)"""
+        with self._lock:
+            if self.message:
+                self._enter(ReplyState.NOTIFIED)
+
+    @property
+    def is_active(self) -> bool:
+        """True while an utterance may be routed to the reply flow"""
+        with self._lock:
+            return self._is_active()
+
+    @property
+    def is_dictating(self) -> bool:
+        """True when the next utterance is reply text (so it must not be read as a command)"""
+        with self._lock:
+            return self._is_active() and self.state in (ReplyState.AWAITING_REPLY, ReplyState.CONFIRMING)
+
+    def _is_active(self) -> bool:
+        if self.state not in (ReplyState.NOTIFIED, ReplyState.AWAITING_REPLY, ReplyState.CONFIRMING):
+            return False
+        if time.time() - self.entered_at > self.reply_window:
+            self.state = ReplyState.EXITED
+            self.draft = None
+            return False
+        return True
+
+    def _dictation(self, text: str) -> dict:
+        """Turn a dictated reply into a send (or confirm) action"""
+        message = _REPLY_PREFIX.sub('', text).strip()
+        if len(message) <= 2:
+            self._enter(ReplyState.AWAITING_REPLY)
+            return {"action": "prompt", "response": f"What should I say to {self.recipient}?"}
+
+        if self.confirm_before_send:
+            self.draft = message
+            self._enter(ReplyState.CONFIRMING)
+            return {"action": "prompt", "response": f"Send '{message}' to {self.recipient}? Say yes or no."}
+
+        return {"action": "send", "recipient": self.recipient, "message": message}
+
+    def handle(self, text: str) -> dict:
+        """
+        Route an utterance through the reply flow
+
+        Args:
+            text: Transcribed user utterance
+
+        Returns:
+            dict with action:
+            - "send": deliver message to recipient, then call mark_sent/mark_failed
+            - "prompt": speak response and keep listening
+            - "cancel": speak response, reply flow is over
+            - "pass": not a reply - handle as a normal command
+        """
+        with self._lock:
+            normalized = _normalize(text)
+
+            first_word = normalized.split()[0] if normalized else ""
+
+            # Explicit "reply ..." works whenever there is something to reply to
+            if not self._is_active():
+                if self.message and first_word in REPLY_KEYWORDS:
+                    return self._dictation(text)
+                return {"action": "pass"}
+
+            if _has_phrase(normalized, CANCEL_PHRASES):
+                self.draft = None
+                self._enter(ReplyState.EXITED)
+                return {"action": "cancel", "response": "Okay, cancelled."}
+
+            if self.state == ReplyState.CONFIRMING:
+                if _has_phrase(normalized, DENY_PHRASES):
+                    self.draft = None
+                    self._enter(ReplyState.AWAITING_REPLY)
+                    return {"action": "prompt", "response": "Okay, what should I say instead?"}
+                if _has_phrase(normalized, CONFIRM_PHRASES):
+                    return {"action": "send", "recipient": self.recipient, "message": self.draft}
+                # Anything else replaces the draft
+                return self._dictation(text)
+
+            if self.state == ReplyState.AWAITING_REPLY:
+                # The user asked to reply, so everything is dictation
+                return self._dictation(text)
+
+            # NOTIFIED: "reply ..." is explicit - a bare "reply" asks for the dictation
+            if first_word in REPLY_KEYWORDS:
+                return self._dictation(text)
+
+            # New commands and questions are not replies
+            if _has_phrase(normalized, NEW_COMMAND_PHRASES) or first_word in QUESTION_WORDS:
+                return {"action": "pass"}
+
+            return self._dictation(text)
+
+    def mark_sent(self):
+        """The reply was delivered"""
+        with self._lock:
+            self.draft = None
+            self._enter(ReplyState.SENT)
+
+    def mark_failed(self):
+        """The reply could not be delivered - leave reply mode"""
+        with self._lock:
+            self.draft = None
+            self._enter(ReplyState.EXITED)
+
+    def mode_indicator(self) -> str:
+        """Short status for the listening prompt"""
+        with self._lock:
+            if not self._is_active():
+                return ""
+            return f" [REPLY MODE: {self.message['sender_name']} | {self.state}]"
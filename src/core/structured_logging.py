@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Structured Logging
+Non-blocking JSON logging through a QueueHandler/QueueListener, with compressed
+rotation, per-subsystem levels and machine-readable conversation/turn events
+"""
+
+import os
+import sys
+import gzip
+import json
+import queue
+import shutil
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'logs')
+EVENTS_LOGGER = "gemma.events"
+
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class EventFormatter(logging.Formatter):
+    """Events are flat JSON: {"ts", "event", ...fields}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "event": record.getMessage(),
+            **getattr(record, "fields", {})
+        }
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _gzip_rotator(source: str, dest: str):
+    """Compress the rotated file (runs on the listener thread, never on a hot path)"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _rotating_handler(path: str) -> logging.Handler:
+    """Size-based rotation by default, time-based when LOG_ROTATE_WHEN is set"""
+    backup_count = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    when = os.getenv('LOG_ROTATE_WHEN')
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8'
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            backupCount=backup_count, encoding='utf-8'
+        )
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def _parse_levels(spec: str) -> dict:
+    """Parse 'telethon=WARNING,src.messaging=DEBUG' into {logger: level}"""
+    levels = {}
+    for item in (spec or "").split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_dir: str = None, console: bool = None) -> logging.handlers.QueueListener:
+    """
+    Route all logging through an in-memory queue to console + rotating JSON files
+
+    The console copy is only written to a terminal by default: under the
+    background script stdout is an unrotated file that would duplicate gemma.jsonl.
+
+    Files (in LOG_DIR, default logs/):
+        gemma.jsonl   - every log record as JSON
+        events.jsonl  - conversation/turn events for the dashboard
+
+    Env:
+        LOG_LEVEL         root level (default INFO)
+        LOG_LEVELS        per-subsystem levels, e.g. "telethon=WARNING,src.core.transcriber=DEBUG"
+        LOG_MAX_BYTES     size rotation threshold (default 10 MB)
+        LOG_ROTATE_WHEN   time rotation instead, e.g. "midnight"
+        LOG_BACKUP_COUNT  rotated files to keep (default 5)
+
+    Returns:
+        The running QueueListener (stopped by stop_logging())
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_dir = log_dir or os.getenv('LOG_DIR', DEFAULT_LOG_DIR)
+    os.makedirs(log_dir, exist_ok=True)
+
+    app_file = _rotating_handler(os.path.join(log_dir, 'gemma.jsonl'))
+    app_file.setFormatter(JsonFormatter())
+
+    events_file = _rotating_handler(os.path.join(log_dir, 'events.jsonl'))
+    events_file.setFormatter(EventFormatter())
+    events_file.addFilter(lambda record: record.name == EVENTS_LOGGER)
+    app_file.addFilter(lambda record: record.name != EVENTS_LOGGER)
+
+    handlers = [app_file, events_file]
+    if console is None:
+        console = sys.stdout.isatty()
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter('%(message)s'))
+        console_handler.addFilter(lambda record: record.name != EVENTS_LOGGER)
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
+    for name, level in _parse_levels(os.getenv('LOG_LEVELS', 'httpx=WARNING,telethon=WARNING')).items():
+        logging.getLogger(name).setLevel(level)
+    logging.getLogger(EVENTS_LOGGER).setLevel(logging.INFO)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def log_event(event: str, **fields):
+    """Emit a machine-readable event (conversation, turn, notification, ...) - never blocks on I/O"""
+    logging.getLogger(EVENTS_LOGGER).info(event, extra={"fields": fields})
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Turn Tracing
+Lightweight per-stage latency spans grouped by turn, with in-memory percentiles
+and Prometheus text export (completed turns are logged as `turn` events)
+"""
+
+import os
+import math
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque, defaultdict
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# The turn spans attach to - per thread / asyncio task, so listener and
+# executor work outside a turn's context never lands in it
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+class _Span:
+    """Context manager timing one stage - kept minimal so a span costs ~1µs"""
+
+    __slots__ = ("tracer", "stage", "start")
+
+    def __init__(self, tracer, stage):
+        self.tracer = tracer
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.stage, self.start, time.perf_counter())
+        return False
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Tracer:
+    """Records monotonic stage timings under a turn id"""
+
+    def __init__(self, window: int = 2048, max_turns: int = 200):
+        """
+        Args:
+            window: Durations kept per stage for percentile estimates
+            max_turns: Completed turns kept in memory for waterfalls
+        """
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._turns = deque(maxlen=max_turns)
+
+    @property
+    def current_turn(self) -> dict:
+        """Turn open in this context (None outside a turn)"""
+        return _current_turn.get()
+
+    def begin_turn(self, kind: str = "turn") -> dict:
+        """
+        Start a new turn in the current context
+
+        Spans recorded here, and in executor work run with a copy of this
+        context, attach to it until end_turn().
+
+        Returns:
+            The turn handle - pass it to attach() to continue the turn in another task
+        """
+        turn = {
+            "turn_id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "started_at": datetime.now().isoformat(timespec="milliseconds"),
+            "_t0": time.perf_counter(),
+            "spans": [],
+            "attrs": {}
+        }
+        _current_turn.set(turn)
+        return turn
+
+    def attach(self, turn: dict):
+        """Continue a turn begun in another task (e.g. an event handler)"""
+        _current_turn.set(turn)
+
+    def span(self, stage: str) -> _Span:
+        """Time a stage: `with tracer.span("intent"): ...`"""
+        return _Span(self, stage)
+
+    def record(self, stage: str, start: float, end: float):
+        """Record a stage that ran between two perf_counter() readings"""
+        duration = end - start
+        turn = _current_turn.get()
+        with self._lock:
+            self._durations[stage].append(duration)
+            self._counts[stage] += 1
+            self._sums[stage] += duration
+            if turn is not None:
+                turn["spans"].append((stage, start - turn["_t0"], duration))
+
+    def annotate(self, **attrs):
+        """Attach attributes (action, text length, ...) to the current turn"""
+        turn = _current_turn.get()
+        if turn is not None:
+            turn["attrs"].update(attrs)
+
+    def end_turn(self, keep: bool = True) -> dict:
+        """
+        Finish the current turn
+
+        Args:
+            keep: False for windows that produced nothing (stage histograms still count them)
+
+        Returns:
+            The completed turn record, or None if discarded
+        """
+        turn = _current_turn.get()
+        _current_turn.set(None)
+        if turn is None or not keep or "_t0" not in turn:
+            return None
+
+        total = time.perf_counter() - turn.pop("_t0")
+        record = {
+            "turn_id": turn["turn_id"],
+            "kind": turn["kind"],
+            "started_at": turn["started_at"],
+            "duration_ms": round(total * 1000, 2),
+            "spans": [
+                {"stage": stage, "start_ms": round(offset * 1000, 2), "duration_ms": round(duration * 1000, 2)}
+                for stage, offset, duration in turn["spans"]
+            ],
+            **turn["attrs"]
+        }
+        self.record("turn", 0.0, total)
+        with self._lock:
+            self._turns.append(record)
+        return record
+
+    def add_turn(self, record: dict):
+        """Replay a completed turn record (e.g. a `turn` event read from the log)"""
+        for span in record.get("spans", []):
+            self.record(span["stage"], 0.0, span["duration_ms"] / 1000)
+        self.record("turn", 0.0, record.get("duration_ms", 0.0) / 1000)
+        with self._lock:
+            self._turns.append(record)
+
+    def recent_turns(self, limit: int = 20) -> list:
+        """Most recent completed turns (newest last)"""
+        with self._lock:
+            return list(self._turns)[-limit:]
+
+    def percentiles(self) -> dict:
+        """p50/p95/p99 and mean per stage, in milliseconds"""
+        with self._lock:
+            snapshot = {stage: sorted(values) for stage, values in self._durations.items()}
+            counts = dict(self._counts)
+            sums = dict(self._sums)
+
+        stats = {}
+        for stage, values in snapshot.items():
+            stats[stage] = {
+                "count": counts[stage],
+                "mean_ms": round(sums[stage] / counts[stage] * 1000, 2) if counts[stage] else 0.0,
+                **{f"p{int(q * 100)}_ms": round(_percentile(values, q) * 1000, 2) for q in QUANTILES}
+            }
+        return stats
+
+    def prometheus_text(self, prefix: str = "gemma") -> str:
+        """Render stage latencies as a Prometheus summary"""
+        with self._lock:
+            snapshot = {stage: sorted(values) for stage, values in self._durations.items()}
+            counts = dict(self._counts)
+            sums = dict(self._sums)
+
+        name = f"{prefix}_stage_latency_seconds"
+        lines = [
+            f"# HELP {name} Latency of each voice-turn stage",
+            f"# TYPE {name} summary"
+        ]
+        for stage in sorted(snapshot):
+            for q in QUANTILES:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {_percentile(snapshot[stage], q):.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {sums[stage]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {counts[stage]}')
+        return "\n".join(lines) + "\n"
+
+
+_tracer = None
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Transcription Backend
+Trims silence, encodes PCM (WAV/FLAC/Opus) and uploads it to OpenAI Whisper
+"""
+
+import io
+import os
+import time
+import wave
+import logging
+import numpy as np
+from dotenv import load_dotenv
+
+# Load config
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+
+class WavEncoder:
+    """Raw 16-bit PCM in a WAV container (the original upload format)"""
+
+    name = "wav"
+    filename = "audio.wav"
+    mime_type = "audio/wav"
+
+    def encode(self, pcm: np.ndarray, sample_rate: int) -> bytes:
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(pcm)
+        return buffer.getvalue()
+
+
+class SoundFileEncoder:
+    """Compressed encoders backed by libsndfile (optional 'soundfile' dependency)"""
+
+    def __init__(self, name: str, format: str, subtype: str, filename: str, mime_type: str):
+        import soundfile  # noqa: F401 - fail early if the optional dependency is missing
+        self.name = name
+        self.format = format
+        self.subtype = subtype
+        self.filename = filename
+        self.mime_type = mime_type
+
+    def encode(self, pcm: np.ndarray, sample_rate: int) -> bytes:
+        import soundfile
+        buffer = io.BytesIO()
+        soundfile.write(buffer, pcm, sample_rate, format=self.format, subtype=self.subtype)
+        return buffer.getvalue()
+
+
+def get_encoder(name: str = None):
+    """
+    Get an upload encoder by name
+
+    Args:
+        name: 'wav', 'flac' or 'opus' (defaults to TRANSCRIPTION_ENCODER env var)
+
+    Returns:
+        Encoder instance - falls back to WAV if the codec is unavailable
+    """
+    name = (name or os.getenv('TRANSCRIPTION_ENCODER', 'flac')).lower()
+
+    try:
+        if name == "flac":
+            return SoundFileEncoder("flac", "FLAC", "PCM_16", "audio.flac", "audio/flac")
+        if name in ("opus", "ogg"):
+            return SoundFileEncoder("opus", "OGG", "OPUS", "audio.ogg", "audio/ogg")
+    except Exception as e:
+        logger.warning(f"⚠️ {name} encoder unavailable ({e}), falling back to WAV")
+
+    return WavEncoder()
+
+
+def trim_silence(pcm: np.ndarray, sample_rate: int, threshold: int,
+                 frame_ms: int = 20, pad_ms: int = 200) -> np.ndarray:
+    """
+    Trim leading/trailing frames whose RMS stays below threshold
+
+    Args:
+        pcm: int16 samples
+        sample_rate: Sample rate in Hz
+        threshold: int16 frame RMS that counts as sound
+        frame_ms: Analysis frame length
+        pad_ms: Audio kept on each side of the detected sound
+
+    Returns:
+        View into pcm (empty if no frame reaches the threshold)
+    """
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n_frames = pcm.shape[0] // frame_len
+    if threshold <= 0 or n_frames == 0:
+        return pcm
+
+    frames = pcm[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    frame_rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_len)
+    loud = np.flatnonzero(frame_rms >= threshold)
+    if loud.size == 0:
+        return pcm[:0]
+
+    pad = sample_rate * pad_ms // 1000
+    start = max(0, loud[0] * frame_len - pad)
+    end = min(pcm.shape[0], (loud[-1] + 1) * frame_len + pad)
+    return pcm[start:end]
+
+
+class WhisperTranscriber:
+    """Transcription backend: silence trimming + encoding + Whisper upload"""
+
+    def __init__(self, openai_client, sample_rate: int = 16000, encoder=None,
+                 model: str = "whisper-1", language: str = "en"):
+        self.openai_client = openai_client
+        self.sample_rate = sample_rate
+        self.encoder = encoder or get_encoder()
+        self.model = model
+        self.language = language
+
+        # Upload metrics
+        self.requests = 0
+        self.raw_bytes = 0
+        self.uploaded_bytes = 0
+        self.last_latency = 0.0
+
+        logger.info(f"✅ Whisper transcriber ready ({self.encoder.name} upload)")
+
+    def encode(self, pcm: np.ndarray, silence_threshold: int = 0) -> bytes:
+        """
+        Trim and encode PCM for upload
+
+        Returns:
+            Encoded bytes, or b"" if the window is silent after trimming
+        """
+        trimmed = trim_silence(pcm, self.sample_rate, silence_threshold)
+        if trimmed.shape[0] == 0:
+            return b""
+        return self.encoder.encode(trimmed, self.sample_rate)
+
+    def transcribe(self, pcm: np.ndarray, silence_threshold: int = 0) -> str:
+        """
+        Transcribe int16 PCM
+
+        Args:
+            pcm: int16 mono samples
+            silence_threshold: int16 frame RMS below which edges are trimmed
+
+        Returns:
+            Transcript text ("" on silence or error)
+        """
+        start = time.monotonic()
+        payload = self.encode(pcm, silence_threshold)
+        if not payload:
+            return ""
+
+        self.requests += 1
+        self.raw_bytes += pcm.shape[0] * 2
+        self.uploaded_bytes += len(payload)
+
+        try:
+            transcript = self.openai_client.audio.transcriptions.create(
+                model=self.model,
+                file=(self.encoder.filename, payload, self.encoder.mime_type),
+                language=self.language,
+                response_format="text"
+            )
+            return transcript.strip() if transcript else ""
+        finally:
+            self.last_latency = time.monotonic() - start
+
+    def get_stats(self) -> dict:
+        """Get upload metrics"""
+        return {
+            "encoder": self.encoder.name,
+            "requests": self.requests,
+            "raw_bytes": self.raw_bytes,
+            "uploaded_bytes": self.uploaded_bytes,
+            "compression_ratio": self.raw_bytes / self.uploaded_bytes if self.uploaded_bytes else 0.0,
+            "last_latency": self.last_latency
+        }
@@ -290,13 +290,13 @@ class VoiceAssistantWithNotifications:
         """Handle user input with intent parsing"""
         print("🧠 Understanding intent...")
 
-        intent = self.intent_parser.parse(user_text, self.conversation_history)
+        intent = self.intent_parser.parse(user_text)
 
         if intent["action"] == "send_message" and intent["success"]:
             print(f"📱 Message intent ({intent.get('confidence', 0):.0%})")
 
             message = intent.get("message")
-            recipient = intent.get("recipient", "recipient")
+            recipient = intent.get("recipient") or "unknown"  # The schema allows null
 
             if not message:
                 return "I couldn't figure out what message to send."
@@ -328,12 +328,12 @@ class VoiceAssistantWithNotifications:
             # Send message
             try:
                 result = self.mcp_client.send_telegram_message(message, recipient)
-                if result and "successfully" in result:
+                if result.success:
                     response = f"Message sent to {recipient}!"
                     self.intent_parser.update_context(user_text, response, recipient)
                     return response
                 else:
-                    return f"Failed to send. {result}"
+                    return f"Failed to send. {result.error}"
             except Exception as e:
                 print(f"❌ Error: {e}")
                 return "Sorry, I had trouble sending."
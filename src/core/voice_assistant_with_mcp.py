@@ -57,10 +57,10 @@ class VoiceAssistantMCP:
             message = parsed["arguments"]["message"]
             result = self.mcp_client.send_telegram_message(message)
 
-            if result and "successfully" in result:
+            if result.success:
                 return f"Message sent to {parsed.get('recipient', 'recipient')}!"
             else:
-                return f"Failed to send message: {result}"
+                return f"Failed to send message: {result.error}"
 
         elif parsed["action"] == "send_photo":
             # Note: This is a placeholder - in real use, you'd specify the photo
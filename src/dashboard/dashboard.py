@@ -2,28 +2,39 @@
 """
 Gemma Voice Assistant Dashboard
 - Web interface to view conversations
-- Real-time log monitoring
+- Real-time conversation events from logs/events.jsonl
 - Optional visual feedback
+- Per-turn latency waterfalls and Prometheus metrics
 """
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response
 import json
 import os
+import sys
 import time
 from datetime import datetime
 import threading
 
+# Add project root to path for tracing imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.tracing import Tracer
+from src.core.structured_logging import DEFAULT_LOG_DIR
+
 app = Flask(__name__)
 
+EVENTS_FILE = os.path.join(os.getenv('LOG_DIR', DEFAULT_LOG_DIR), 'events.jsonl')
+
 class ConversationLogger:
     def __init__(self):
         self.conversations = []
-        # Use data directory from project root
+        self._lock = threading.Lock()
+        # Conversations logged before structured events existed
         self.log_file = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'conversations.json')
         self.load_conversations()
     
     def load_conversations(self):
-        """Load existing conversations from file"""
+        """Load legacy conversations from file"""
         if os.path.exists(self.log_file):
             try:
                 with open(self.log_file, 'r') as f:
@@ -31,49 +42,60 @@ class ConversationLogger:
             except:
                 self.conversations = []
     
-    def save_conversations(self):
-        """Save conversations to file"""
-        with open(self.log_file, 'w') as f:
-            json.dump(self.conversations, f, indent=2)
-    
-    def add_conversation(self, user_input, ai_response):
+    def add_conversation(self, user_input, ai_response, timestamp=None):
         """Add new conversation entry"""
-        entry = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "user": user_input,
-            "ai": ai_response,
-            "id": len(self.conversations) + 1
-        }
-        self.conversations.append(entry)
-        self.save_conversations()
+        with self._lock:
+            entry = {
+                "timestamp": timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "user": user_input,
+                "ai": ai_response,
+                "id": len(self.conversations) + 1
+            }
+            self.conversations.append(entry)
     
     def get_recent_conversations(self, limit=20):
         """Get recent conversations"""
-        return self.conversations[-limit:] if self.conversations else []
+        with self._lock:
+            return self.conversations[-limit:] if self.conversations else []
 
 # Global logger
 conversation_logger = ConversationLogger()
 
-def monitor_gemma_logs():
-    """Monitor Gemma logs for conversations"""
-    log_file = "gemma.log"
-    if not os.path.exists(log_file):
-        return
-    
-    # Read existing log
-    with open(log_file, 'r') as f:
-        content = f.read()
-    
-    lines = content.split('\n')
-    user_input = None
-    
-    for line in lines:
-        if "👤 User:" in line:
-            user_input = line.split("👤 User:", 1)[1].strip()
-        elif "🗣️  Gemma:" in line and user_input:
-            ai_response = line.split("🗣️  Gemma:", 1)[1].strip()
-            conversation_logger.add_conversation(user_input, ai_response)
-            user_input = None
+# Turn latencies, fed incrementally by follow_events (counters stay monotonic across log rotation)
+turn_tracer = Tracer(max_turns=1000)
+
+def follow_events(path=EVENTS_FILE, poll_interval=1.0):
+    """Tail the structured events log and add conversation/turn events as they arrive"""
+    offset = 0
+    inode = None
+    while True:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            time.sleep(poll_interval)
+            continue
+
+        # Start over when the file was rotated or truncated
+        if stat.st_ino != inode or stat.st_size < offset:
+            inode, offset = stat.st_ino, 0
+
+        if stat.st_size > offset:
+            with open(path, 'r', encoding='utf-8') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith('\n'):
+                        break  # Partial write - pick it up next poll
+                    offset += len(line.encode('utf-8'))
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if event.get("event") == "conversation":
+                        conversation_logger.add_conversation(event.get("user"), event.get("ai"), event.get("timestamp"))
+                    elif event.get("event") == "turn":
+                        turn_tracer.add_turn(event)
+
+        time.sleep(poll_interval)
 
 @app.route('/')
 def dashboard():
@@ -88,6 +110,20 @@ def get_conversations():
         'total': len(conversation_logger.conversations)
     })
 
+@app.route('/api/turns')
+def get_turns():
+    """Recent voice turns with per-stage spans (waterfalls) and stage percentiles"""
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({
+        'turns': turn_tracer.recent_turns(limit),
+        'stages': turn_tracer.percentiles()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus-style stage latency summary"""
+    return Response(turn_tracer.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/status')
 def get_status():
     """Check if Gemma is running"""
@@ -107,8 +143,8 @@ if __name__ == '__main__':
     # Create templates directory
     os.makedirs('templates', exist_ok=True)
     
-    # Monitor logs in background
-    threading.Thread(target=monitor_gemma_logs, daemon=True).start()
+    # Follow conversation events in background
+    threading.Thread(target=follow_events, daemon=True).start()
     
     print("🌐 Starting Gemma Dashboard...")
     print("📊 Open: http://localhost:5001")
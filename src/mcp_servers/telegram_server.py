@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 """
 MCP Server for Telegram Integration
-Exposes Telegram bot capabilities through MCP protocol
+Exposes Telegram bot capabilities through MCP protocol - over stdio for one
+client, or HTTP/SSE so many clients share one warm Telegram session
+
+    python src/mcp_servers/telegram_server.py             # stdio
+    python src/mcp_servers/telegram_server.py --sse       # http://MCP_HOST:MCP_PORT/sse
 """
 
 import os
 import sys
+import time
 import asyncio
+import weakref
 from typing import Any
 from mcp.server import Server
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
@@ -17,17 +23,33 @@ import logging
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.messaging.telethon_user_client import TelethonUserClient
+from src.messaging.shared_telegram_client import get_account_registry
+from src.messaging.message_store import close_message_stores
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Concurrent tool calls allowed per connected client
+CLIENT_CONCURRENCY = int(os.getenv('MCP_CLIENT_CONCURRENCY', '4'))
+
 
 # Initialize MCP server
 app = Server("telegram-server")
 
-# Initialize Telethon user client
+# Initialize Telethon user client (default account)
 telegram_client = TelethonUserClient()
+account_clients = {telegram_client.account: telegram_client}
+
+
+def client_for(account: str = None) -> TelethonUserClient:
+    """User client for an account - other accounts connect on their first tool call"""
+    if not account:
+        return telegram_client
+    account = account.lower()
+    if account not in account_clients:
+        account_clients[account] = TelethonUserClient(account)
+    return account_clients[account]
 
 
 @app.list_tools()
@@ -49,11 +71,111 @@ async def list_tools() -> list[Tool]:
                     "message": {
                         "type": "string",
                         "description": "The message text to send"
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "Optional: account to send from (see list_telegram_accounts). Defaults to the main account"
                     }
                 },
                 "required": ["recipient", "message"]
             }
         ),
+        Tool(
+            name="list_telegram_accounts",
+            description="List the Telegram accounts messages can be sent from and their connection state",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
+        Tool(
+            name="get_recent_messages",
+            description="Read the latest messages of a Telegram chat, newest first, optionally only those from one sender. Served from a local cache and message store; pass next_cursor to page back",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "chat": {
+                        "type": "string",
+                        "description": "Chat: contact name, @username, phone or chat id"
+                    },
+                    "sender": {
+                        "type": "string",
+                        "description": "Optional: only messages sent by this person (name, @username, phone or id), e.g. in a group"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 100,
+                        "description": "Messages per page (default 20)"
+                    },
+                    "cursor": {
+                        "type": "integer",
+                        "description": "Optional: next_cursor from the previous page"
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "Optional: account to read from (see list_telegram_accounts). Defaults to the main account"
+                    }
+                },
+                "required": ["chat"]
+            }
+        ),
+        Tool(
+            name="search_messages",
+            description="Find Telegram messages containing a text, newest first, in one chat or all chats",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "minLength": 1,
+                        "description": "Text to look for"
+                    },
+                    "chat": {
+                        "type": "string",
+                        "description": "Optional: restrict to this chat (name, @username, phone or id)"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 100,
+                        "description": "Results per page (default 20)"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Optional: next_cursor from the previous page"
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "Optional: account to read from (see list_telegram_accounts). Defaults to the main account"
+                    }
+                },
+                "required": ["query"]
+            }
+        ),
+        Tool(
+            name="list_dialogs",
+            description="List Telegram chats by latest activity, with unread counts and the last message",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 100,
+                        "description": "Chats per page (default 20)"
+                    },
+                    "cursor": {
+                        "type": "integer",
+                        "description": "Optional: next_cursor from the previous page"
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "Optional: account to read from (see list_telegram_accounts). Defaults to the main account"
+                    }
+                }
+            }
+        ),
         Tool(
             name="send_telegram_photo",
             description="Send a photo via Telegram bot",
@@ -122,10 +244,65 @@ async def list_tools() -> list[Tool]:
     ]
 
 
+# Request metrics (served at /metrics in SSE mode)
+server_stats = {"clients_connected": 0, "clients_total": 0, "calls": {}}
+_client_limiters = weakref.WeakKeyDictionary()
+
+
+def _client_limiter() -> asyncio.Semaphore:
+    """Per-client semaphore, keyed by the calling MCP session"""
+    try:
+        session = app.request_context.session
+    except LookupError:
+        return asyncio.Semaphore(CLIENT_CONCURRENCY)
+    if session not in _client_limiters:
+        _client_limiters[session] = asyncio.Semaphore(CLIENT_CONCURRENCY)
+    return _client_limiters[session]
+
+
+def _record_call(name: str, seconds: float, failed: bool):
+    calls = server_stats["calls"].setdefault(name, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+    calls["count"] += 1
+    calls["errors"] += int(failed)
+    calls["total_ms"] += seconds * 1000
+    calls["max_ms"] = max(calls["max_ms"], seconds * 1000)
+
+
+def get_stats() -> dict:
+    """Connected clients and per-tool call counts/latency"""
+    return {
+        "clients_connected": server_stats["clients_connected"],
+        "clients_total": server_stats["clients_total"],
+        "calls": {
+            name: {**calls, "avg_ms": calls["total_ms"] / calls["count"]}
+            for name, calls in server_stats["calls"].items()
+        }
+    }
+
+
+def tool_result(text: str, success: bool = True, **fields) -> tuple:
+    """
+    Tool output: the human-readable text plus structured content
+    (success, ids, error_code, retry_after) so clients never parse the text
+    """
+    return [TextContent(type="text", text=text)], {"success": success, **fields}
+
+
 @app.call_tool()
-async def call_tool(name: str, arguments: Any) -> list[TextContent]:
+async def call_tool(name: str, arguments: Any) -> tuple:
+    """
+    Handle tool calls from MCP clients (limited per client, timed for metrics)
+    """
+    start = time.perf_counter()
+    async with _client_limiter():
+        content, structured = await handle_tool(name, arguments)
+    _record_call(name, time.perf_counter() - start, failed=not structured["success"])
+    return content, structured
+
+
+async def handle_tool(name: str, arguments: Any) -> tuple:
     """
-    Handle tool calls from MCP clients
+    Run one tool call
     """
     logger.info(f"📞 Tool called: {name} with args: {arguments}")
 
@@ -135,23 +312,96 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
             message = arguments.get("message")
 
             if not recipient or not message:
-                return [TextContent(
-                    type="text",
-                    text="Error: 'recipient' and 'message' parameters are required"
-                )]
+                return tool_result(
+                    "Error: 'recipient' and 'message' parameters are required",
+                    success=False, error_code="INVALID_ARGUMENTS"
+                )
 
-            result = await telegram_client.send_message(recipient, message)
+            try:
+                client = client_for(arguments.get("account"))
+            except KeyError as e:
+                return tool_result(f"❌ {e.args[0]}", success=False, error_code="UNKNOWN_ACCOUNT")
+
+            result = await client.send_message(recipient, message)
 
             if result["success"]:
-                return [TextContent(
-                    type="text",
-                    text=f"✅ Message sent successfully to {result['recipient']}!\nMessage ID: {result['message_id']}"
-                )]
+                return tool_result(
+                    f"✅ Message sent successfully to {result['recipient']}!\nMessage ID: {result['message_id']}",
+                    recipient=result["recipient"],
+                    message_id=result["message_id"],
+                    peer_id=result["peer_id"],
+                    account=client.account
+                )
+            else:
+                return tool_result(
+                    f"❌ Failed to send message: {result['error']}",
+                    success=False,
+                    recipient=recipient,
+                    error=result["error"],
+                    error_code=result["error_code"],
+                    retry_after=result["retry_after"]
+                )
+
+        elif name == "list_telegram_accounts":
+            accounts = get_account_registry().accounts()
+            return tool_result(
+                "📱 Telegram accounts:\n" + "\n".join(
+                    f"- {account}: {state}" for account, state in accounts.items()
+                ),
+                accounts=accounts
+            )
+
+        elif name in ("get_recent_messages", "search_messages"):
+            try:
+                client = client_for(arguments.get("account"))
+            except KeyError as e:
+                return tool_result(f"❌ {e.args[0]}", success=False, error_code="UNKNOWN_ACCOUNT")
+
+            if name == "get_recent_messages":
+                result = await client.get_recent_messages(
+                    arguments["chat"], arguments.get("limit", 20), arguments.get("cursor"), arguments.get("sender"))
             else:
-                return [TextContent(
-                    type="text",
-                    text=f"❌ Failed to send message: {result['error']}"
-                )]
+                result = await client.search_messages(
+                    arguments["query"], arguments.get("chat"), arguments.get("limit", 20), arguments.get("cursor"))
+
+            if not result["success"]:
+                return tool_result(
+                    f"❌ Failed to read messages: {result['error']}",
+                    success=False, error=result["error"], error_code=result["error_code"],
+                    retry_after=result["retry_after"]
+                )
+            lines = [
+                f"[{m['date'][:16] if m['date'] else '?'}] {'Me' if m['out'] else m['sender_name'] or m['sender_id']}: {m['text']}"
+                for m in reversed(result["messages"])  # Oldest first reads naturally
+            ]
+            return tool_result(
+                "\n".join(lines) or "No messages found",
+                messages=result["messages"],
+                next_cursor=result["next_cursor"],
+                source=result["source"]
+            )
+
+        elif name == "list_dialogs":
+            try:
+                client = client_for(arguments.get("account"))
+            except KeyError as e:
+                return tool_result(f"❌ {e.args[0]}", success=False, error_code="UNKNOWN_ACCOUNT")
+
+            result = await client.list_dialogs(arguments.get("limit", 20), arguments.get("cursor"))
+
+            if not result["success"]:
+                return tool_result(
+                    f"❌ Failed to list chats: {result['error']}",
+                    success=False, error=result["error"], error_code=result["error_code"],
+                    retry_after=result["retry_after"]
+                )
+            lines = [f"- {d['name']} ({d['unread']} unread): {d['last_text'][:60]}" for d in result["dialogs"]]
+            return tool_result(
+                "💬 Chats:\n" + "\n".join(lines),
+                dialogs=result["dialogs"],
+                next_cursor=result["next_cursor"],
+                source=result["source"]
+            )
 
         elif name == "send_telegram_photo":
             photo_path = arguments.get("photo_path")
@@ -159,23 +409,23 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
             chat_id = arguments.get("chat_id")
 
             if not photo_path:
-                return [TextContent(
-                    type="text",
-                    text="Error: 'photo_path' parameter is required"
-                )]
+                return tool_result(
+                    "Error: 'photo_path' parameter is required",
+                    success=False, error_code="INVALID_ARGUMENTS"
+                )
 
             result = await telegram_client.send_photo(photo_path, caption, chat_id)
 
             if result["success"]:
-                return [TextContent(
-                    type="text",
-                    text=f"✅ Photo sent successfully!\nMessage ID: {result['message_id']}"
-                )]
+                return tool_result(
+                    f"✅ Photo sent successfully!\nMessage ID: {result['message_id']}",
+                    message_id=result["message_id"]
+                )
             else:
-                return [TextContent(
-                    type="text",
-                    text=f"❌ Failed to send photo: {result['error']}"
-                )]
+                return tool_result(
+                    f"❌ Failed to send photo: {result['error']}",
+                    success=False, error=result["error"]
+                )
 
         elif name == "send_telegram_document":
             document_path = arguments.get("document_path")
@@ -183,40 +433,40 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
             chat_id = arguments.get("chat_id")
 
             if not document_path:
-                return [TextContent(
-                    type="text",
-                    text="Error: 'document_path' parameter is required"
-                )]
+                return tool_result(
+                    "Error: 'document_path' parameter is required",
+                    success=False, error_code="INVALID_ARGUMENTS"
+                )
 
             result = await telegram_client.send_document(document_path, caption, chat_id)
 
             if result["success"]:
-                return [TextContent(
-                    type="text",
-                    text=f"✅ Document sent successfully!\nMessage ID: {result['message_id']}"
-                )]
+                return tool_result(
+                    f"✅ Document sent successfully!\nMessage ID: {result['message_id']}",
+                    message_id=result["message_id"]
+                )
             else:
-                return [TextContent(
-                    type="text",
-                    text=f"❌ Failed to send document: {result['error']}"
-                )]
+                return tool_result(
+                    f"❌ Failed to send document: {result['error']}",
+                    success=False, error=result["error"]
+                )
 
         elif name == "get_telegram_bot_info":
             result = await telegram_client.get_bot_info()
 
             if result["success"]:
-                return [TextContent(
-                    type="text",
-                    text=f"🤖 Bot Information:\n"
-                         f"Name: {result['bot_name']}\n"
-                         f"Username: @{result['bot_username']}\n"
-                         f"ID: {result['bot_id']}"
-                )]
+                return tool_result(
+                    f"🤖 Bot Information:\n"
+                    f"Name: {result['bot_name']}\n"
+                    f"Username: @{result['bot_username']}\n"
+                    f"ID: {result['bot_id']}",
+                    bot_id=result["bot_id"]
+                )
             else:
-                return [TextContent(
-                    type="text",
-                    text=f"❌ Failed to get bot info: {result['error']}"
-                )]
+                return tool_result(
+                    f"❌ Failed to get bot info: {result['error']}",
+                    success=False, error=result["error"]
+                )
 
         elif name == "get_telegram_chat_info":
             chat_id = arguments.get("chat_id")
@@ -227,32 +477,66 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
                 first_name = result.get('first_name', 'N/A')
                 username = result.get('username', 'N/A')
 
-                return [TextContent(
-                    type="text",
-                    text=f"💬 Chat Information:\n"
-                         f"Chat ID: {result['chat_id']}\n"
-                         f"Type: {chat_type}\n"
-                         f"Name: {first_name}\n"
-                         f"Username: @{username if username != 'N/A' else 'None'}"
-                )]
+                return tool_result(
+                    f"💬 Chat Information:\n"
+                    f"Chat ID: {result['chat_id']}\n"
+                    f"Type: {chat_type}\n"
+                    f"Name: {first_name}\n"
+                    f"Username: @{username if username != 'N/A' else 'None'}",
+                    chat_id=result["chat_id"]
+                )
             else:
-                return [TextContent(
-                    type="text",
-                    text=f"❌ Failed to get chat info: {result['error']}"
-                )]
+                return tool_result(
+                    f"❌ Failed to get chat info: {result['error']}",
+                    success=False, error=result["error"]
+                )
 
         else:
-            return [TextContent(
-                type="text",
-                text=f"❌ Unknown tool: {name}"
-            )]
+            return tool_result(
+                f"❌ Unknown tool: {name}",
+                success=False, error_code="UNKNOWN_TOOL"
+            )
 
     except Exception as e:
         logger.error(f"❌ Error in tool execution: {e}")
-        return [TextContent(
-            type="text",
-            text=f"❌ Error: {str(e)}"
-        )]
+        return tool_result(
+            f"❌ Error: {str(e)}",
+            success=False, error=str(e), error_code=type(e).__name__
+        )
+
+
+async def serve_sse(host: str, port: int):
+    """Serve MCP over HTTP/SSE - every client shares this process's Telegram connection"""
+    import uvicorn
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Mount, Route
+
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request):
+        server_stats["clients_connected"] += 1
+        server_stats["clients_total"] += 1
+        try:
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await app.run(read_stream, write_stream, app.create_initialization_options())
+        finally:
+            server_stats["clients_connected"] -= 1
+        return Response()
+
+    async def metrics(request):
+        return JSONResponse(get_stats())
+
+    starlette_app = Starlette(routes=[
+        Route("/sse", endpoint=handle_sse),
+        Mount("/messages/", app=sse.handle_post_message),
+        Route("/metrics", endpoint=metrics)
+    ])
+
+    logger.info(f"🌐 Serving MCP over SSE at http://{host}:{port}/sse")
+    config = uvicorn.Config(starlette_app, host=host, port=port, log_level="warning")
+    await uvicorn.Server(config).serve()
 
 
 async def main():
@@ -266,12 +550,24 @@ async def main():
     logger.info(f"📱 Logged in as: {me['first_name']} (@{me.get('username', 'No username')})")
     logger.info("✅ Server ready!")
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    # The default account stays connected; others disconnect when idle
+    telegram_client.shared_client.pinned = True
+    reaper = asyncio.create_task(get_account_registry().run_idle_reaper())
+
+    try:
+        if "--sse" in sys.argv or os.getenv('MCP_TRANSPORT', 'stdio').lower() == 'sse':
+            await serve_sse(os.getenv('MCP_HOST', '127.0.0.1'), int(os.getenv('MCP_PORT', '8765')))
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await app.run(
+                    read_stream,
+                    write_stream,
+                    app.create_initialization_options()
+                )
+    finally:
+        reaper.cancel()
+        await get_account_registry().disconnect_all()
+        close_message_stores()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Message Cache
+Recent messages per chat and the dialog list, fed live by the listener, so
+read tools answer from memory and only ask Telegram for what's missing
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from dotenv import load_dotenv
+from .sender_cache import display_name
+from .message_store import get_message_store, match_terms, text_matches
+
+# Load environment variables
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("cache", "store", "telegram")  # A page reports the furthest source it needed
+
+
+def message_record(message, sender_name: str = None) -> dict:
+    """Plain dict for a Telethon message - what the cache stores and the tools return"""
+    if sender_name is None:
+        sender = getattr(message, 'sender', None)  # Entities shipped with the response, no RPC
+        if sender is not None:
+            sender_name = (display_name(sender.first_name, getattr(sender, 'last_name', None))
+                           if hasattr(sender, 'first_name') else getattr(sender, 'title', None))
+    return {
+        "id": message.id,
+        "chat_id": message.chat_id,
+        "sender_id": message.sender_id,
+        "sender_name": sender_name,
+        "text": message.message or "",
+        "date": message.date.isoformat() if message.date else None,
+        "out": bool(message.out)
+    }
+
+
+class _ChatHistory:
+    """
+    One chat's cached messages
+
+    [low, high] is the id range known to hold every message of the chat;
+    messages outside it (search hits) are kept but never used for paging.
+    """
+
+    def __init__(self):
+        self.messages = {}
+        self.low = None
+        self.high = None
+        self.complete = False  # low is the chat's first message
+        self.synced_at = 0.0   # Last time the head was checked against Telegram
+        self.stored = None     # (low, high, complete) the message store holds without gaps
+        self.stored_generation = None  # store.compactions when `stored` was read (None: not read yet)
+
+    def in_range(self, before: int = None) -> list:
+        """Contiguous messages older than `before`, newest first"""
+        if self.high is None:
+            return []
+        upper = self.high if before is None else min(self.high, before - 1)
+        return sorted((m for i, m in self.messages.items() if self.low <= i <= upper),
+                      key=lambda m: m["id"], reverse=True)
+
+
+class MessageCache:
+    """Per-chat message history plus dialog index, bounded and LRU across chats"""
+
+    def __init__(self, max_chats: int = None, per_chat: int = None, ttl: float = None):
+        """
+        Args:
+            max_chats: Chats kept (default: MESSAGE_CACHE_CHATS or 100)
+            per_chat: Messages kept per chat (default: MESSAGE_CACHE_PER_CHAT or 200)
+            ttl: Seconds a chat head or the dialog list counts as fresh
+                 (default: MESSAGE_CACHE_TTL or 300)
+        """
+        self.max_chats = max_chats or int(os.getenv('MESSAGE_CACHE_CHATS', '100'))
+        self.per_chat = per_chat or int(os.getenv('MESSAGE_CACHE_PER_CHAT', '200'))
+        self.ttl = float(os.getenv('MESSAGE_CACHE_TTL', '300')) if ttl is None else ttl
+
+        self._chats = OrderedDict()
+        self.dialogs = {}  # chat_id -> dialog summary
+        self.dialogs_synced_at = 0.0
+        self.dialogs_complete = False  # The last fetch returned every dialog
+        self.store = None  # MessageStore: every message added is persisted; reads fall back to it before Telegram
+
+        # Metrics
+        self.cache_hits = 0
+        self.store_hits = 0
+        self.telegram_fetches = 0
+
+    def _chat(self, chat_id) -> _ChatHistory:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _ChatHistory()
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return chat
+
+    async def _load_range(self, chat_id, chat: _ChatHistory):
+        """Read the store's gap-free range for a chat first used, or again after retention moved it"""
+        if self.store is None or chat.stored_generation == self.store.compactions:
+            return
+        generation = self.store.compactions
+        chat.stored = await asyncio.to_thread(self.store.get_range, chat_id)
+        chat.stored_generation = generation
+
+    def _fresh(self, synced_at: float) -> bool:
+        return time.monotonic() - synced_at < self.ttl
+
+    def _trim(self, chat: _ChatHistory):
+        """Drop the oldest of the contiguous range beyond per_chat, then loose messages"""
+        if len(chat.messages) <= self.per_chat:
+            return
+        contiguous = chat.in_range()
+        in_range = {m["id"] for m in contiguous}
+        loose = sorted((i for i in chat.messages if i not in in_range), reverse=True)
+        keep = [m["id"] for m in contiguous[:self.per_chat]] + loose[:max(0, self.per_chat - len(contiguous))]
+        chat.messages = {i: chat.messages[i] for i in keep}
+        if len(contiguous) > self.per_chat:
+            chat.low = contiguous[self.per_chat - 1]["id"]
+            chat.complete = False
+
+    def add(self, record: dict):
+        """
+        Add one new message (listener or our own send)
+
+        The listener only sees incoming private messages, so a live message
+        never extends the contiguous range - it marks the head stale and the
+        next read re-syncs the gap from Telegram.
+        """
+        if self.store is not None:
+            self.store.add(record)
+        chat = self._chat(record["chat_id"])
+        chat.messages[record["id"]] = record
+        if chat.high is not None and record["id"] > chat.high:
+            chat.synced_at = 0.0
+        self._trim(chat)
+
+        dialog = self.dialogs.get(record["chat_id"])
+        if dialog is not None and record["id"] >= (dialog["last_message_id"] or 0):
+            dialog.update(last_message_id=record["id"], last_text=record["text"], date=record["date"])
+            if not record["out"]:
+                dialog["unread"] += 1
+
+    def _add_block(self, chat_id, chat: _ChatHistory, records: list, connects_above: bool, connects_below: bool,
+                   reached_start: bool, persist: bool = True):
+        """
+        Merge a run of messages fetched in one request (no gaps between them)
+
+        Args:
+            persist: Write the records to the store (False when they came from it)
+        """
+        for record in records:
+            chat.messages[record["id"]] = record
+            if persist and self.store is not None:
+                self.store.add(record)
+        if records:
+            low, high = min(r["id"] for r in records), max(r["id"] for r in records)
+            if chat.high is None or not (connects_above or connects_below):
+                chat.low, chat.high = low, high  # New range - older cached messages become loose
+                chat.complete = False
+            else:
+                chat.low, chat.high = min(chat.low, low), max(chat.high, high)
+        if reached_start and chat.high is not None:
+            chat.complete = True
+        self._sync_stored(chat_id, chat)
+        self._trim(chat)
+
+    def _sync_stored(self, chat_id, chat: _ChatHistory):
+        """Extend the store's gap-free range with the cache's contiguous range"""
+        if self.store is None or chat.high is None:
+            return
+        stored = chat.stored
+        if stored is not None and chat.low <= stored[1] and chat.high >= stored[0]:
+            # Two overlapping gap-free ranges: their union has no gaps either
+            merged = (min(chat.low, stored[0]), max(chat.high, stored[1]), chat.complete or stored[2])
+        elif stored is None or chat.low > stored[1]:
+            merged = (chat.low, chat.high, chat.complete)
+        else:
+            return  # An older disjoint block - the stored range reaching the head is worth more
+        if merged != stored:
+            chat.stored = merged
+            self.store.set_range(chat_id, *merged, generation=chat.stored_generation)
+
+    def seed_dialogs(self, dialogs, complete: bool = False) -> int:
+        """
+        Index Telethon dialogs (from the listener's startup fetch or a tool's refresh)
+
+        Args:
+            complete: The fetch returned every dialog the account has
+        """
+        for dialog in dialogs:
+            entity = dialog.entity
+            self.dialogs[dialog.id] = {
+                "chat_id": dialog.id,
+                "name": dialog.name,
+                "username": getattr(entity, 'username', None),
+                "type": "user" if dialog.is_user else "group" if dialog.is_group else "channel",
+                "unread": dialog.unread_count,
+                "last_message_id": dialog.message.id if dialog.message else None,
+                "last_text": (dialog.message.message or "") if dialog.message else "",
+                "date": dialog.date.isoformat() if dialog.date else None
+            }
+        self.dialogs_synced_at = time.monotonic()
+        self.dialogs_complete = complete
+        return len(dialogs)
+
+    def find_dialog(self, name: str):
+        """chat_id for a dialog name, first name or @username (None if not indexed)"""
+        wanted = name.lower().lstrip('@')
+        for dialog in self.dialogs.values():
+            names = {(dialog["name"] or "").lower(), (dialog["name"] or "").split(" ")[0].lower(),
+                     (dialog["username"] or "").lower()}
+            if wanted in names:
+                return dialog["chat_id"]
+        return None
+
+    async def get_recent(self, client, chat_id, limit: int = 20, before: int = None, sender_id=None) -> dict:
+        """
+        Newest messages of a chat, paged backwards
+
+        Memory first, then the message store's gap-free range, then Telegram
+        for whatever neither holds.
+
+        Args:
+            client: Anything with Telethon's get_messages/get_dialogs, used only for missing ranges
+            chat_id: Peer id
+            limit: Page size
+            before: Cursor from a previous page (messages older than this id)
+            sender_id: Only messages from this sender ("my last messages from X" in a group)
+
+        Returns:
+            {"messages": [...newest first], "next_cursor": id or None, "source": "cache" | "store" | "telegram"}
+        """
+        chat = self._chat(chat_id)
+        await self._load_range(chat_id, chat)
+        if sender_id is not None:
+            return await self._get_from_sender(client, chat_id, chat, sender_id, limit, before)
+
+        if before is not None and chat.low is not None and before < chat.low and not chat.complete:
+            # Cursor older than what's kept in memory
+            page, at_start, source = await self._older(client, chat_id, chat, before, limit)
+            return {"messages": page, "source": source,
+                    "next_cursor": page[-1]["id"] if page and not at_start else None}
+
+        source = await self._refresh_head(client, chat_id, chat, limit, before)
+        page = chat.in_range(before)[:limit]
+        at_start = chat.complete and (len(page) < limit or page[-1]["id"] == chat.low)
+        if len(page) < limit and not chat.complete:
+            older, at_start, older_source = await self._older(client, chat_id, chat, chat.low, limit - len(page))
+            self._add_block(chat_id, chat, older, connects_above=False, connects_below=True,
+                            reached_start=at_start, persist=False)
+            page = page + older  # All older than the cached part (and kept even if trimmed)
+            source = max(source, older_source, key=SOURCES.index)
+
+        if source == "cache":
+            self.cache_hits += 1
+        more = bool(page) and not at_start
+        return {"messages": page, "next_cursor": page[-1]["id"] if more else None, "source": source}
+
+    async def _refresh_head(self, client, chat_id, chat: _ChatHistory, limit: int, before: int = None) -> str:
+        """Make the chat head current for a first page - returns the furthest source used"""
+        source = "cache"
+        if chat.high is None and chat.stored is not None:
+            source = await self._load_stored(chat_id, chat)
+        if chat.high is None or (not self._fresh(chat.synced_at) and before is None):
+            await self._sync_head(client, chat_id, chat, limit)
+            source = "telegram"
+        return source
+
+    async def _load_stored(self, chat_id, chat: _ChatHistory) -> str:
+        """Start a cold chat from the store's range - its head is then re-synced with Telegram"""
+        low, high, complete = chat.stored
+        records = await asyncio.to_thread(self.store.recent, chat_id, limit=self.per_chat,
+                                          min_id=low, max_id=high + 1)
+        if not records:
+            return "cache"
+        self.store_hits += 1
+        self._add_block(chat_id, chat, records, connects_above=False, connects_below=False,
+                        reached_start=complete and len(records) < self.per_chat, persist=False)
+        chat.synced_at = 0.0  # Whatever arrived while we were away is only on Telegram
+        return "store"
+
+    async def _older(self, client, chat_id, chat: _ChatHistory, max_id: int, limit: int) -> tuple:
+        """
+        Up to `limit` messages below max_id: from the store while its gap-free
+        range reaches, the rest from Telegram (which then extends the range)
+
+        Returns:
+            (records newest first, reached the chat's first message, source)
+        """
+        stored = chat.stored
+        records = []
+        if self.store is not None and stored is not None and stored[0] < max_id <= stored[1] + 1:
+            records = await asyncio.to_thread(self.store.recent, chat_id, limit=limit,
+                                              min_id=stored[0], max_id=max_id)
+            if len(records) == limit or stored[2]:
+                self.store_hits += 1
+                return records, len(records) < limit, "store"
+
+        upper = records[-1]["id"] if records else max_id
+        missing = limit - len(records)
+        self.telegram_fetches += 1
+        messages = await client.get_messages(chat_id, limit=missing, max_id=upper)
+        fetched = [message_record(m) for m in messages]
+        at_start = len(fetched) < missing
+        if self.store is not None:
+            for record in fetched:
+                self.store.add(record)
+            if stored is not None and stored[0] <= upper <= stored[1] + 1:
+                # Continues the stored range downwards
+                chat.stored = (fetched[-1]["id"] if fetched else stored[0], stored[1], at_start)
+                self.store.set_range(chat_id, *chat.stored, generation=chat.stored_generation)
+        return records + fetched, at_start, "telegram"
+
+    async def _get_from_sender(self, client, chat_id, chat: _ChatHistory, sender_id, limit: int,
+                               before: int = None) -> dict:
+        """One sender's messages in a chat: the store when its range answers the page, else Telegram"""
+        source = await self._refresh_head(client, chat_id, chat, limit, before)
+        stored = chat.stored
+        if (self.store is not None and stored is not None and stored[1] >= chat.high
+                and (before is None or stored[0] < before <= stored[1] + 1)):
+            page = await asyncio.to_thread(self.store.recent, chat_id, sender_id=sender_id, limit=limit,
+                                           min_id=stored[0], max_id=before or stored[1] + 1)
+            if len(page) == limit or stored[2]:
+                self.store_hits += 1
+                return {"messages": page, "next_cursor": page[-1]["id"] if len(page) == limit else None,
+                        "source": max(source, "store", key=SOURCES.index)}
+
+        self.telegram_fetches += 1
+        messages = await client.get_messages(chat_id, limit=limit, max_id=before or 0, from_user=sender_id)
+        page = [message_record(m) for m in messages]
+        if self.store is not None:
+            for record in page:
+                self.store.add(record)
+        return {"messages": page, "next_cursor": page[-1]["id"] if len(page) == limit else None,
+                "source": "telegram"}
+
+    async def _sync_head(self, client, chat_id, chat: _ChatHistory, limit: int):
+        """Fetch what arrived since the cached head (everything up to `limit` if nothing cached)"""
+        self.telegram_fetches += 1
+        messages = await client.get_messages(chat_id, limit=limit, min_id=chat.high or 0)
+        connects = chat.high is not None and len(messages) < limit
+        self._add_block(chat_id, chat, [message_record(m) for m in messages], connects_above=connects,
+                        connects_below=False, reached_start=chat.high is None and len(messages) < limit)
+        if chat.high is None and not messages:
+            chat.low = chat.high = 0  # Empty chat
+            chat.complete = True
+            self._sync_stored(chat_id, chat)
+        chat.synced_at = time.monotonic()
+
+    async def search(self, client, query: str, chat_id=None, limit: int = 20, before: str = None) -> dict:
+        """
+        Messages whose text has every word of query, newest first
+
+        Words match as prefixes, ignoring case and accents - the same rule
+        in memory (text_matches) as in the store's full-text index.
+
+        Cached messages answer when they fill the page; then the local
+        full-text store; only then Telegram's server-side search, whose hits
+        are cached.
+
+        Args:
+            chat_id: Restrict to one chat (None searches every chat)
+            before: Cursor from a previous page ("<date>/<chat_id>/<id>")
+
+        Returns:
+            {"messages": [...], "next_cursor": str or None, "source": "cache" | "store" | "telegram"}
+        """
+        terms = match_terms(query)
+        if chat_id is None:
+            chats = list(self._chats.values())
+        elif chat_id in self._chats:
+            chats = [self._chats[chat_id]]
+            await self._load_range(chat_id, chats[0])
+            if chats[0].complete and not self._fresh(chats[0].synced_at):
+                await self._sync_head(client, chat_id, chats[0], limit)
+        else:
+            chats = []
+        hits = {}
+        for chat in chats:
+            for record in chat.messages.values():
+                if text_matches(terms, record["text"]):
+                    hits[(record["chat_id"], record["id"])] = record
+
+        def key(record):
+            return record["date"] or "", record["chat_id"], record["id"]
+
+        def older(record):
+            if before is None:
+                return True
+            date, peer, message_id = before.split("/")
+            return key(record) < (date, int(peer), int(message_id))
+
+        page = sorted((r for r in hits.values() if older(r)), key=key, reverse=True)[:limit]
+        source = "cache"
+        fully_cached = chat_id is not None and chat_id in self._chats and self._chats[chat_id].complete
+        if len(page) < limit and not fully_cached and self.store is not None:
+            # The store pages by whole seconds: over-fetch past messages sharing the cursor's second
+            until = datetime.fromisoformat(before.split("/")[0]).timestamp() + 1 if before else None
+            stored = await asyncio.to_thread(self.store.search, query, chat_id=chat_id, limit=limit * 2,
+                                             before=until)
+            for record in stored:
+                if older(record):
+                    hits.setdefault((record["chat_id"], record["id"]), record)
+            stored = sorted((r for r in hits.values() if older(r)), key=key, reverse=True)[:limit]
+            chat = self._chats.get(chat_id) if chat_id is not None else None
+            # A chat stored without gaps from its first message up to the head has nothing left to find
+            fully_stored = (chat is not None and chat.stored is not None and chat.stored[2]
+                            and chat.high is not None and chat.stored[1] >= chat.high and self._fresh(chat.synced_at))
+            if len(stored) == limit or fully_stored:
+                page, source = stored, "store"
+                self.store_hits += 1
+        if len(page) < limit and not fully_cached and source == "cache":
+            self.telegram_fetches += 1
+            max_id = int(before.split("/")[2]) if before and chat_id is not None else 0
+            messages = await client.get_messages(chat_id, search=query, limit=limit, max_id=max_id)
+            for message in messages:
+                record = message_record(message)
+                self._chat(record["chat_id"]).messages.setdefault(record["id"], record)
+                if self.store is not None:
+                    self.store.add(record)
+                if older(record) and text_matches(terms, record["text"]):  # Same rule as the other sources
+                    hits[(record["chat_id"], record["id"])] = record
+            page = sorted((r for r in hits.values() if older(r)), key=key, reverse=True)[:limit]
+            source = "telegram"
+        elif source == "cache":
+            self.cache_hits += 1
+
+        last = page[-1] if len(page) == limit else None
+        return {
+            "messages": page,
+            "next_cursor": f"{last['date']}/{last['chat_id']}/{last['id']}" if last else None,
+            "source": source
+        }
+
+    async def list_dialogs(self, client, limit: int = 20, cursor: int = 0) -> dict:
+        """
+        Dialogs by latest activity, paged by offset
+
+        Returns:
+            {"dialogs": [...], "next_cursor": offset or None, "source": "cache" | "telegram"}
+        """
+        source = "cache"
+        if not self._fresh(self.dialogs_synced_at) or (len(self.dialogs) < cursor + limit
+                                                       and not self.dialogs_complete):
+            self.telegram_fetches += 1
+            fetch_limit = max(cursor + limit, 100)
+            dialogs = await client.get_dialogs(limit=fetch_limit)
+            self.seed_dialogs(dialogs, complete=len(dialogs) < fetch_limit)
+            source = "telegram"
+        else:
+            self.cache_hits += 1
+
+        ordered = sorted(self.dialogs.values(), key=lambda d: d["date"] or "", reverse=True)
+        page = ordered[cursor:cursor + limit]
+        return {
+            "dialogs": page,
+            "next_cursor": cursor + limit if len(ordered) > cursor + limit else None,
+            "source": source
+        }
+
+    def get_stats(self) -> dict:
+        """Cache metrics"""
+        return {
+            "chats": len(self._chats),
+            "messages": sum(len(chat.messages) for chat in self._chats.values()),
+            "dialogs": len(self.dialogs),
+            "cache_hits": self.cache_hits,
+            "store_hits": self.store_hits,
+            "telegram_fetches": self.telegram_fetches
+        }
+
+
+_caches = {}
+
+
+def get_message_cache(account: str = None) -> MessageCache:
+    """Process-wide cache per account, shared by the listener and the MCP tools"""
+    account = (account or "default").lower()
+    if account not in _caches:
+        _caches[account] = MessageCache()
+        _caches[account].store = get_message_store(account)
+    return _caches[account]
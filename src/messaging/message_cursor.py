@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Message Cursor
+Last processed incoming message id per chat, persisted so the listener can
+catch up on what arrived while it was disconnected
+"""
+
+import os
+import json
+import time
+import logging
+from collections import deque
+from dotenv import load_dotenv
+
+# Load environment variables
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CURSOR_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'listener_cursor.json')
+
+
+class MessageCursor:
+    """chat_id -> last processed message id, with duplicate suppression"""
+
+    def __init__(self, path: str = None, recent: int = 256):
+        """
+        Args:
+            path: JSON file (default: LISTENER_CURSOR_PATH or data/listener_cursor.json)
+            recent: (chat_id, message_id) pairs remembered to drop duplicates
+        """
+        self.path = path or os.getenv('LISTENER_CURSOR_PATH', DEFAULT_CURSOR_PATH)
+        self.chats = {}
+        self.updated_at = None  # Unix time of the last advance, None on first run
+        self.dirty = False
+        self._recent = deque(maxlen=recent)
+        self._recent_set = set()
+        self.load()
+
+    def get(self, chat_id) -> int:
+        """Last processed message id (0 if unknown)"""
+        return self.chats.get(chat_id, 0)
+
+    def advance(self, chat_id, message_id: int) -> bool:
+        """
+        Mark a message processed
+
+        Returns:
+            False if it was already processed (seen by both the live handler and catch-up)
+        """
+        key = (chat_id, message_id)
+        if key in self._recent_set:
+            return False
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_set.discard(self._recent[0])
+        self._recent.append(key)
+        self._recent_set.add(key)
+
+        if message_id > self.chats.get(chat_id, 0):
+            self.chats[chat_id] = message_id
+        self.updated_at = time.time()
+        self.dirty = True
+        return True
+
+    def baseline(self, chat_id, message_id: int):
+        """Start tracking a chat from its current newest message (nothing to catch up)"""
+        if message_id > self.chats.get(chat_id, 0):
+            self.chats[chat_id] = message_id
+            self.dirty = True
+        if self.updated_at is None:
+            self.updated_at = time.time()
+
+    def load(self):
+        """Restore cursors from disk"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.chats = {int(chat_id): message_id for chat_id, message_id in data.get("chats", {}).items()}
+            self.updated_at = data.get("updated_at")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load listener cursor: {e}")
+
+    def save(self):
+        """Write cursors atomically (cheap - one small JSON file)"""
+        data = {"chats": {str(chat_id): message_id for chat_id, message_id in self.chats.items()},
+                "updated_at": self.updated_at}
+        self.dirty = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.dirty = True
+            logger.warning(f"⚠️ Could not save listener cursor: {e}")
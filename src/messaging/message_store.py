@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Message Store
+Persistent SQLite history of received and sent Telegram messages with an
+FTS5 keyword index, written in batches off the event loop
+"""
+
+import os
+import re
+import time
+import queue
+import unicodedata
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Load environment variables
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'messages.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    sender_id INTEGER,
+    sender_name TEXT,
+    text TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    out INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS messages_chat_id ON messages (chat_id, id);
+CREATE INDEX IF NOT EXISTS messages_chat_date ON messages (chat_id, date);
+CREATE INDEX IF NOT EXISTS messages_sender_date ON messages (sender_id, date);
+CREATE INDEX IF NOT EXISTS messages_date ON messages (date);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, sender_name, content='messages', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text, sender_name) VALUES (new.rowid, new.text, new.sender_name);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, sender_name)
+    VALUES ('delete', old.rowid, old.text, old.sender_name);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, sender_name)
+    VALUES ('delete', old.rowid, old.text, old.sender_name);
+    INSERT INTO messages_fts (rowid, text, sender_name) VALUES (new.rowid, new.text, new.sender_name);
+END;
+
+-- Per chat, the id range for which every message is stored (no gaps)
+CREATE TABLE IF NOT EXISTS ranges (
+    chat_id INTEGER PRIMARY KEY,
+    low INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+COLUMNS = "chat_id, id, sender_id, sender_name, text, date, out"
+M_COLUMNS = "m.chat_id, m.id, m.sender_id, m.sender_name, m.text, m.date, m.out"
+
+# Upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the FTS delete trigger
+UPSERT = (f"INSERT INTO messages ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?) "
+          "ON CONFLICT (chat_id, id) DO UPDATE SET text = excluded.text, "
+          "sender_name = coalesce(excluded.sender_name, sender_name)")
+UPSERT_RANGE = ("INSERT INTO ranges (chat_id, low, high, complete) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (chat_id) DO UPDATE SET low = excluded.low, high = excluded.high, "
+                "complete = excluded.complete")
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _to_row(record: dict) -> tuple:
+    date = datetime.fromisoformat(record["date"]).timestamp() if record.get("date") else time.time()
+    return (record["chat_id"], record["id"], record.get("sender_id"), record.get("sender_name"),
+            record.get("text") or "", int(date), int(bool(record.get("out"))))
+
+
+def _to_record(row) -> dict:
+    """Same shape as message_cache.message_record"""
+    chat_id, message_id, sender_id, sender_name, text, date, out = row
+    return {
+        "id": message_id,
+        "chat_id": chat_id,
+        "sender_id": sender_id,
+        "sender_name": sender_name,
+        "text": text,
+        "date": datetime.fromtimestamp(date, tz=timezone.utc).isoformat(),
+        "out": bool(out)
+    }
+
+
+def _fold(text: str) -> str:
+    """Casefold and strip diacritics, like the FTS tokenizer (unicode61 remove_diacritics)"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def match_terms(query: str) -> list:
+    """Words of a search query, folded the way the index folds text"""
+    return _WORD.findall(_fold(query))
+
+
+def text_matches(terms: list, text: str) -> bool:
+    """
+    The store's matching rule, for messages searched outside it (the cache)
+
+    Every term must start a word of the text: "lunch tom" matches
+    "Lunch with Tomás?" but not "brunch".
+    """
+    if not terms:
+        return False
+    words = _WORD.findall(_fold(text or ""))
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+
+def _fts_query(terms: list) -> str:
+    """Terms as FTS5 prefix queries on the text column only ("lunch tom" -> text : ("lunch"* "tom"*))"""
+    return "text : (" + " ".join(f'"{term}"*' for term in terms) + ")"
+
+
+class MessageStore:
+    """
+    Append-mostly message history
+
+    add() only queues; a writer thread inserts batches in one transaction.
+    Reads use their own WAL connection, so they never wait for a flush.
+    """
+
+    def __init__(self, path: str = None, batch_size: int = 100, flush_interval: float = 2.0,
+                 retention_days: float = None):
+        """
+        Args:
+            path: SQLite file (default: MESSAGE_STORE_PATH or data/messages.db)
+            batch_size: Queued messages that trigger a flush
+            flush_interval: Longest a queued message waits, in seconds
+            retention_days: Delete messages older than this (default: MESSAGE_RETENTION_DAYS or 0 = keep all)
+        """
+        self.path = path or os.getenv('MESSAGE_STORE_PATH', DEFAULT_STORE_PATH)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = (float(os.getenv('MESSAGE_RETENTION_DAYS', '0'))
+                               if retention_days is None else retention_days)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._write_conn = self._connect()
+        self._write_conn.executescript(SCHEMA)
+        self._write_lock = threading.Lock()
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._last_compact = 0.0
+        self.compactions = 0  # Bumped whenever retention deletes messages (and moves ranges)
+
+        # Metrics
+        self.written = 0
+        self.batches = 0
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="MessageStore")
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def add(self, record: dict):
+        """Queue a message (message_cache.message_record dict) - never blocks the caller"""
+        self._queue.put(record)
+
+    def set_range(self, chat_id: int, low: int, high: int, complete: bool, generation: int = None):
+        """
+        Queue a chat's gap-free id range (written after the messages queued before it)
+
+        Args:
+            complete: low is the chat's first message
+            generation: self.compactions the range was based on - dropped if
+                        retention has deleted messages since (None: current)
+        """
+        self._queue.put((chat_id, low, high, int(complete),
+                         self.compactions if generation is None else generation))
+
+    def get_range(self, chat_id: int):
+        """(low, high, complete) of the gap-free stored range, or None"""
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT low, high, complete FROM ranges WHERE chat_id = ?", (chat_id,)).fetchone()
+        return (row[0], row[1], bool(row[2])) if row else None
+
+    def _write_loop(self):
+        while not self._stopped.is_set() or not self._queue.empty():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if self.retention_days and time.monotonic() - self._last_compact > 3600:
+                self.compact()
+
+    def _write(self, batch: list):
+        records = [item for item in batch if isinstance(item, dict)]
+        # A range read before the last compaction may start below what retention left
+        ranges = [item[:4] for item in batch if not isinstance(item, dict) and item[4] == self.compactions]
+        try:
+            with self._write_lock, self._write_conn:
+                self._write_conn.executemany(UPSERT, [_to_row(record) for record in records])
+                self._write_conn.executemany(UPSERT_RANGE, ranges)
+            self.written += len(records)
+            self.batches += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to store {len(batch)} message(s): {e}")
+
+    def _query(self, sql: str, params: tuple) -> list:
+        with self._read_lock:
+            return [_to_record(row) for row in self._read_conn.execute(sql, params)]
+
+    def recent(self, chat_id: int = None, sender_id: int = None, limit: int = 20, before: float = None,
+               min_id: int = None, max_id: int = None) -> list:
+        """
+        Latest messages, newest first ("read my last messages from X")
+
+        Args:
+            chat_id: Only this chat
+            sender_id: Only this sender
+            before: Unix time cursor - messages strictly older
+            min_id: Message ids >= min_id (with chat_id: stay inside the stored range)
+            max_id: Message ids < max_id (with chat_id: page below a cursor)
+        """
+        where, params = self._filters(chat_id, sender_id, before, min_id=min_id, max_id=max_id)
+        return self._query(
+            f"SELECT {COLUMNS} FROM messages {where} ORDER BY date DESC, id DESC LIMIT ?",
+            (*params, limit)
+        )
+
+    def search(self, query: str, chat_id: int = None, sender_id: int = None, limit: int = 20,
+               before: float = None) -> list:
+        """Messages whose text has every word of query (prefix match, see text_matches), newest first"""
+        terms = match_terms(query)
+        if not terms:
+            return []
+        match = _fts_query(terms)
+        where, params = self._filters(chat_id, sender_id, before, prefix="m.")
+        where = f"{where} AND" if where else "WHERE"
+        return self._query(
+            f"SELECT {M_COLUMNS} FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+            f"{where} messages_fts MATCH ? ORDER BY m.date DESC, m.id DESC LIMIT ?",
+            (*params, match, limit)
+        )
+
+    @staticmethod
+    def _filters(chat_id, sender_id, before, prefix: str = "", min_id: int = None, max_id: int = None) -> tuple:
+        clauses, params = [], []
+        if chat_id is not None:
+            clauses.append(f"{prefix}chat_id = ?")
+            params.append(chat_id)
+        if sender_id is not None:
+            clauses.append(f"{prefix}sender_id = ?")
+            params.append(sender_id)
+        if before is not None:
+            clauses.append(f"{prefix}date < ?")
+            params.append(int(before))
+        if min_id is not None:
+            clauses.append(f"{prefix}id >= ?")
+            params.append(min_id)
+        if max_id is not None:
+            clauses.append(f"{prefix}id < ?")
+            params.append(max_id)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", tuple(params)
+
+    def compact(self) -> int:
+        """
+        Apply retention and merge FTS segments (runs on the writer thread hourly)
+
+        Returns:
+            Messages deleted
+        """
+        self._last_compact = time.monotonic()
+        deleted = 0
+        try:
+            with self._write_lock, self._write_conn:
+                if self.retention_days:
+                    cutoff = time.time() - self.retention_days * 86400
+                    deleted = self._write_conn.execute("DELETE FROM messages WHERE date < ?", (int(cutoff),)).rowcount
+                    if deleted:
+                        # Retention removes the oldest messages: ranges now start at what's left
+                        self._write_conn.execute(
+                            "UPDATE ranges SET complete = 0, low = coalesce((SELECT min(id) FROM messages m "
+                            "WHERE m.chat_id = ranges.chat_id AND m.id >= ranges.low), high + 1) "
+                            "WHERE NOT EXISTS (SELECT 1 FROM messages m "
+                            "WHERE m.chat_id = ranges.chat_id AND m.id = ranges.low)"
+                        )
+                        self._write_conn.execute("DELETE FROM ranges WHERE low > high")
+                self._write_conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')")
+            if deleted:
+                self.compactions += 1  # Only once committed, so a reader never pairs it with the old ranges
+            with self._write_lock:
+                self._write_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if deleted:
+                logger.info(f"🧹 Message store: deleted {deleted} message(s) past retention")
+        except Exception as e:
+            logger.warning(f"⚠️ Message store compaction failed: {e}")
+        return deleted
+
+    def get_stats(self) -> dict:
+        """Store metrics"""
+        with self._read_lock:
+            count = self._read_conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return {
+            "messages": count,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches
+        }
+
+    def close(self):
+        """Flush queued messages and close"""
+        self._stopped.set()
+        self._writer.join(timeout=10)
+        self._write_conn.close()
+        self._read_conn.close()
+
+
+_stores = {}
+
+
+def get_message_store(account: str = None):
+    """
+    Process-wide store per account (None if MESSAGE_STORE_PATH is set to "")
+
+    The default account uses data/messages.db, others data/messages_<account>.db.
+    """
+    account = (account or "default").lower()
+    if account not in _stores:
+        path = os.getenv('MESSAGE_STORE_PATH', DEFAULT_STORE_PATH)
+        if not path:
+            _stores[account] = None
+        else:
+            if account != "default":
+                root, ext = os.path.splitext(path)
+                path = f"{root}_{account}{ext}"
+            _stores[account] = MessageStore(path)
+    return _stores[account]
+
+
+def close_message_stores():
+    """Flush and close every open store (on shutdown)"""
+    for store in _stores.values():
+        if store is not None:
+            store.close()
+    _stores.clear()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Notification Queue
+Bounded queue between the Telegram listener and the assistant: coalesces
+bursts per sender, debounces them and hands out one notification at a time
+"""
+
+import os
+import time
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+def _split_env(name: str, default: str = "") -> set:
+    return {item.strip().lower() for item in os.getenv(name, default).split(',') if item.strip()}
+
+
+class NotificationQueue:
+    """
+    Per-sender batches of incoming messages, delivered to a single consumer
+
+    A sender's batch is released once no new message arrived for `debounce`
+    seconds (or `max_delay` after its first message). High-priority batches
+    skip the debounce and are delivered before normal ones.
+    """
+
+    def __init__(self, maxsize: int = None, debounce: float = None, max_delay: float = None,
+                 priority_senders: set = None, urgent_keywords: set = None, keep_messages: int = 5):
+        """
+        Args:
+            maxsize: Max senders with pending batches (default: NOTIFY_QUEUE_SIZE or 20)
+            debounce: Quiet period before a batch is released (default: NOTIFY_DEBOUNCE_SECONDS or 1.5)
+            max_delay: Longest a batch waits during a continuous burst (default: 4x debounce)
+            priority_senders: Lowercase names/usernames that are announced first (default: NOTIFY_PRIORITY_SENDERS)
+            urgent_keywords: Words that make a message high priority (default: NOTIFY_URGENT_KEYWORDS)
+            keep_messages: Message texts kept per batch (older ones are only counted)
+        """
+        self.maxsize = maxsize or int(os.getenv('NOTIFY_QUEUE_SIZE', '20'))
+        self.debounce = float(os.getenv('NOTIFY_DEBOUNCE_SECONDS', '1.5')) if debounce is None else debounce
+        self.max_delay = self.debounce * 4 if max_delay is None else max_delay
+        self.priority_senders = _split_env('NOTIFY_PRIORITY_SENDERS') if priority_senders is None else priority_senders
+        self.urgent_keywords = (_split_env('NOTIFY_URGENT_KEYWORDS', 'urgent,asap,emergency')
+                                if urgent_keywords is None else urgent_keywords)
+        self.keep_messages = keep_messages
+
+        self._batches = {}  # sender_id -> batch, in arrival order
+        self._depth = 0
+        self._wakeup = None
+
+        # Metrics
+        self.received = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._started = time.monotonic()
+
+    def _event(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def priority_of(self, message: dict) -> int:
+        """High for priority senders and urgent keywords, normal otherwise"""
+        names = {
+            (message.get("sender_name") or "").lower(),
+            (message.get("sender_name") or "").split(" ")[0].lower(),
+            (message.get("sender_username") or "").lower()
+        }
+        if names & self.priority_senders:
+            return PRIORITY_HIGH
+        text = (message.get("message") or "").lower()
+        if any(keyword in text for keyword in self.urgent_keywords):
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+
+    def put_nowait(self, message: dict) -> bool:
+        """
+        Add an incoming message (never blocks the Telegram handler)
+
+        Messages from a sender with a pending batch are always coalesced into
+        it, so memory is bounded by maxsize senders x keep_messages texts.
+
+        Returns:
+            False if the queue was full and the message was dropped
+        """
+        self.received += 1
+        now = time.monotonic()
+        priority = self.priority_of(message)
+        batch = self._batches.get(message["sender_id"])
+
+        if batch is None and len(self._batches) >= self.maxsize:
+            if not self._evict_for(priority):
+                self.dropped += 1
+                logger.warning(f"⚠️ Notification queue full ({len(self._batches)} senders), "
+                               f"dropped message from {message.get('sender_name')}")
+                return False
+
+        if batch is None:
+            self._batches[message["sender_id"]] = {
+                "latest": message,
+                "messages": [message.get("message")],
+                "count": 1,
+                "priority": priority,
+                "first_at": now,
+                "last_at": now
+            }
+        else:
+            batch["latest"] = message
+            batch["messages"] = (batch["messages"] + [message.get("message")])[-self.keep_messages:]
+            batch["count"] += 1
+            batch["priority"] = min(batch["priority"], priority)
+            batch["last_at"] = now
+            self.coalesced += 1
+
+        self._depth += 1
+        self.max_depth = max(self.max_depth, self._depth)
+        self._event().set()
+        return True
+
+    def _evict_for(self, priority: int) -> bool:
+        """Make room for a high-priority sender by dropping the oldest normal batch"""
+        if priority != PRIORITY_HIGH:
+            return False
+        for sender_id, batch in self._batches.items():
+            if batch["priority"] == PRIORITY_NORMAL:
+                del self._batches[sender_id]
+                self._depth -= batch["count"]
+                self.dropped += batch["count"]
+                logger.warning(f"⚠️ Notification queue full, dropped {batch['count']} message(s) "
+                               f"from {batch['latest'].get('sender_name')} for a priority sender")
+                return True
+        return False
+
+    def _ready_at(self, batch: dict) -> float:
+        if batch["priority"] == PRIORITY_HIGH:
+            return batch["first_at"]
+        return min(batch["last_at"] + self.debounce, batch["first_at"] + self.max_delay)
+
+    def _pop_ready(self):
+        """Remove and return the best ready batch, or (None, seconds until the next one)"""
+        if not self._batches:
+            return None, None
+        now = time.monotonic()
+        ready = [(batch["priority"], batch["first_at"], sender_id)
+                 for sender_id, batch in self._batches.items() if self._ready_at(batch) <= now]
+        if not ready:
+            return None, min(self._ready_at(batch) for batch in self._batches.values()) - now
+
+        _, _, sender_id = min(ready)
+        batch = self._batches.pop(sender_id)
+        self._depth -= batch["count"]
+        return batch, 0.0
+
+    async def get(self) -> dict:
+        """
+        Wait for the next notification
+
+        Returns:
+            The sender's latest message dict plus "count" and "messages" (recent texts, oldest first)
+        """
+        wakeup = self._event()
+        while True:
+            batch, wait = self._pop_ready()
+            if batch is not None:
+                self.delivered += 1
+                return {
+                    **batch["latest"],
+                    "count": batch["count"],
+                    "messages": batch["messages"],
+                    "priority": batch["priority"]
+                }
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be delivered"""
+        return self._depth
+
+    def get_stats(self) -> dict:
+        """Queue metrics"""
+        uptime = time.monotonic() - self._started
+        return {
+            "received": self.received,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "depth": self._depth,
+            "max_depth": self.max_depth,
+            "pending_senders": len(self._batches),
+            "received_per_minute": self.received / uptime * 60 if uptime else 0.0
+        }
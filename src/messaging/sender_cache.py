@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Sender Profile Cache
+LRU of display name, username and contact key per Telegram sender id, so the
+message handler doesn't need get_sender() RPCs or name recomputation
+"""
+
+import os
+import logging
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Load environment variables
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+
+def display_name(first_name: str, last_name: str = None) -> str:
+    """'First Last' the way the listener has always announced senders"""
+    name = first_name or ""
+    if last_name:
+        name += f" {last_name}"
+    return name
+
+
+class SenderProfileCache:
+    """LRU sender_id -> profile, seeded from dialogs and kept fresh by user updates"""
+
+    def __init__(self, contact_map: dict = None, maxsize: int = None):
+        """
+        Args:
+            contact_map: contacts.json mapping (contact key -> @username / phone / id)
+            maxsize: Profiles kept (default: SENDER_CACHE_SIZE or 512)
+        """
+        self.maxsize = maxsize or int(os.getenv('SENDER_CACHE_SIZE', '512'))
+        self._profiles = OrderedDict()
+
+        # Reverse contact map: normalized target -> contact key
+        self._contact_keys = {}
+        for key, target in (contact_map or {}).items():
+            self._contact_keys[str(target).lower().lstrip('@').replace(' ', '')] = key
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def _contact_key(self, user_id, username: str, phone: str):
+        for candidate in (username, f"+{phone.lstrip('+')}" if phone else None, user_id):
+            if candidate:
+                key = self._contact_keys.get(str(candidate).lower().lstrip('@'))
+                if key:
+                    return key
+        return None
+
+    def get(self, sender_id) -> dict:
+        """Cached profile or None"""
+        profile = self._profiles.get(sender_id)
+        if profile is None:
+            self.misses += 1
+            return None
+        self._profiles.move_to_end(sender_id)
+        self.hits += 1
+        return profile
+
+    def put(self, entity) -> dict:
+        """
+        Cache a Telethon entity
+
+        Returns:
+            The profile, or None if the entity is not a user (channels, chats)
+        """
+        if entity is None or not hasattr(entity, 'first_name'):
+            return None
+
+        username = getattr(entity, 'username', None)
+        profile = {
+            "sender_id": entity.id,
+            "sender_name": display_name(entity.first_name, getattr(entity, 'last_name', None)),
+            "sender_username": username,
+            "contact_key": self._contact_key(entity.id, username, getattr(entity, 'phone', None))
+        }
+        self._profiles[entity.id] = profile
+        self._profiles.move_to_end(entity.id)
+        while len(self._profiles) > self.maxsize:
+            self._profiles.popitem(last=False)
+        return profile
+
+    def update_name(self, user_id, first_name: str, last_name: str = None, username: str = None):
+        """Apply a name change pushed by Telegram (no-op if the user isn't cached)"""
+        profile = self._profiles.get(user_id)
+        if profile is None:
+            return
+        profile["sender_name"] = display_name(first_name, last_name)
+        if username is not None:
+            profile["sender_username"] = username
+            profile["contact_key"] = self._contact_key(user_id, username, None) or profile["contact_key"]
+
+    def invalidate(self, user_id):
+        """Drop a profile so the next message refetches it"""
+        self._profiles.pop(user_id, None)
+
+    def seed(self, dialogs) -> int:
+        """
+        Pre-load profiles from the dialog list fetched at startup
+
+        Returns:
+            Profiles cached
+        """
+        seeded = sum(1 for dialog in dialogs if dialog.is_user and self.put(dialog.entity))
+        logger.info(f"✅ Sender cache seeded with {seeded} profiles")
+        return seeded
+
+    def get_stats(self) -> dict:
+        """Cache metrics"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._profiles),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 """
-Shared Telegram Client - Singleton pattern to avoid database locks
+Shared Telegram Client - one client per account, shared to avoid database locks
+Tracks connection state explicitly and caches authorization after the first check.
+Accounts are kept in a registry: connected lazily, disconnected when idle.
 """
 import os
 import json
+import time
+import random
+import asyncio
 import logging
-from telethon import TelegramClient
+from telethon import TelegramClient, errors, utils
 from dotenv import load_dotenv
+from .telegram_session import WALSQLiteSession
+from .message_cache import get_message_cache, message_record
 
 logger = logging.getLogger(__name__)
 
@@ -14,36 +21,117 @@ logger = logging.getLogger(__name__)
 config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
 load_dotenv(config_path)
 
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'config')
+DEFAULT_ACCOUNT = "default"
+
+
+class ConnectionState:
+    """Shared client connection states"""
+    DISCONNECTED = "disconnected"  # Not connected (initial, or the connection dropped)
+    CONNECTING = "connecting"      # connect() / authorization in progress
+    AUTHORIZED = "authorized"      # Connected and logged in - sends go straight through
+    DEGRADED = "degraded"          # Last attempt failed - callers back off and retry
+
+
+class NotAuthorizedError(Exception):
+    """The account has no logged-in session - only an interactive start() can create one"""
+
+
+class Backoff:
+    """Exponential backoff with full jitter: sleep uniform(0, min(cap, base * 2^attempt))"""
+
+    def __init__(self, base: float = 1.0, cap: float = 60.0):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** self.attempt))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+class RateLimiter:
+    """Token bucket: `rate` sends per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float = 1.0, burst: int = 5):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def error_details(e: Exception) -> dict:
+    """Machine-readable failure fields for send results: error, error_code, retry_after"""
+    details = {"error": str(e), "error_code": type(e).__name__, "retry_after": None}
+    if isinstance(e, errors.RPCError) and e.message:
+        details["error_code"] = e.message  # e.g. USERNAME_NOT_OCCUPIED, FLOOD_WAIT_X
+    if isinstance(e, (errors.FloodWaitError, errors.SlowModeWaitError)):
+        details["error_code"] = "FLOOD_WAIT"
+        details["retry_after"] = e.seconds
+    if isinstance(e, NotAuthorizedError):
+        details["error_code"] = "NOT_AUTHORIZED"
+    return details
+
+
+def _account_env(account: str, name: str, default: str = None) -> str:
+    """TELEGRAM_<ACCOUNT>_<NAME> for extra accounts, falling back to TELEGRAM_<NAME>"""
+    if account != DEFAULT_ACCOUNT:
+        value = os.getenv(f"TELEGRAM_{account.upper()}_{name}")
+        if value:
+            return value
+    return os.getenv(f"TELEGRAM_{name}", default)
+
 
 class SharedTelegramClient:
-    """Singleton Telethon client to prevent database lock issues"""
+    """One account's Telethon client - created lazily so idle accounts cost no connection"""
 
-    _instance = None
-    _client = None
-    _contact_map = None
+    def __init__(self, account: str = DEFAULT_ACCOUNT):
+        self.account = account
+        self.api_id = int(_account_env(account, 'API_ID'))
+        self.api_hash = _account_env(account, 'API_HASH')
+        self.phone = _account_env(account, 'PHONE_NUMBER')
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+        suffix = "" if account == DEFAULT_ACCOUNT else f"_{account}"
+        self.session_file = os.path.join(CONFIG_DIR, f'telegram_session{suffix}')
+        self._contacts_path = os.path.join(CONFIG_DIR, f'contacts{suffix}.json')
+        if suffix and not os.path.exists(self._contacts_path):
+            self._contacts_path = os.path.join(CONFIG_DIR, 'contacts.json')
 
-    def __init__(self):
-        # Only initialize once
-        if self._client is None:
-            self.api_id = int(os.getenv('TELEGRAM_API_ID'))
-            self.api_hash = os.getenv('TELEGRAM_API_HASH')
-            self.phone = os.getenv('TELEGRAM_PHONE_NUMBER')
+        self._client = None
+        self._contact_map = self._load_contact_map()
+        self.rate_limiter = RateLimiter(
+            rate=float(_account_env(account, 'SEND_RATE', '1.0')),
+            burst=int(_account_env(account, 'SEND_BURST', '5'))
+        )
 
-            session_file = os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'telegram_session')
-            self._client = TelegramClient(session_file, self.api_id, self.api_hash)
-            self._contact_map = self._load_contact_map()
-            logger.info("✅ Shared Telethon client initialized")
+        self.state = ConnectionState.DISCONNECTED
+        self._authorized = False  # Cached after the first successful check
+        self._ready = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+        self.pinned = False  # Pinned accounts (e.g. the listener's) are never idle-disconnected
+        self.last_used = time.monotonic()
+        logger.info(f"✅ Shared Telethon client initialized ({account})")
 
     def _load_contact_map(self) -> dict:
         """Load contacts from JSON"""
-        contacts_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'contacts.json')
         try:
-            with open(contacts_path, 'r') as f:
+            with open(self._contacts_path, 'r') as f:
                 return json.load(f)
         except Exception as e:
             logger.error(f"❌ Failed to load contacts: {e}")
@@ -51,7 +139,10 @@ class SharedTelegramClient:
 
     @property
     def client(self):
-        """Get the Telethon client instance"""
+        """Get the Telethon client instance (opens the session on first use)"""
+        if self._client is None:
+            # WAL session: the MCP server process shares this file without lock errors
+            self._client = TelegramClient(WALSQLiteSession(self.session_file), self.api_id, self.api_hash)
         return self._client
 
     @property
@@ -59,33 +150,90 @@ class SharedTelegramClient:
         """Get the contact map"""
         return self._contact_map
 
-    async def start(self):
-        """Start the client (idempotent - safe to call multiple times)"""
-        try:
-            if not self._client.is_connected():
-                logger.info("🔌 Connecting client...")
-                await self._client.connect()
-                logger.info("✅ Client connected")
-
-            if not await self._client.is_user_authorized():
-                logger.info("🔐 Starting authentication...")
-                await self._client.start(phone=self.phone)
-                logger.info("✅ Telethon client authenticated")
-            else:
-                logger.info("✅ Telethon client already authenticated")
-        except Exception as e:
-            logger.error(f"❌ Error in start(): {e}")
-            # If already connected in another place, that's OK
-            if "already" in str(e).lower() or "lock" in str(e).lower():
-                logger.warning("⚠️ Client may already be connected elsewhere, continuing...")
-            else:
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.info(f"🔌 Telegram client: {self.state} → {state}")
+        self.state = state
+        if state == ConnectionState.AUTHORIZED:
+            self._ready.set()
+        else:
+            self._ready.clear()
+
+    def _on_disconnected(self, _future):
+        self._set_state(ConnectionState.DISCONNECTED)
+
+    @property
+    def is_ready(self) -> bool:
+        """Connected and authorized - no RPC needed to know"""
+        return self.state == ConnectionState.AUTHORIZED and self.client.is_connected()
+
+    async def start(self, interactive: bool = True):
+        """
+        Connect and authorize (idempotent - safe to call multiple times)
+
+        Authorization is checked once per process; reconnects skip the RPC.
+        Raises on failure, leaving the client DEGRADED so the caller can back off.
+
+        Args:
+            interactive: Run Telethon's phone/code login if there is no session;
+                         otherwise raise NotAuthorizedError
+        """
+        if self.is_ready:
+            return
+
+        async with self._start_lock:
+            if self.is_ready:
+                return
+            self._set_state(ConnectionState.CONNECTING)
+            try:
+                if not self.client.is_connected():
+                    logger.info("🔌 Connecting client...")
+                    await self.client.connect()
+                    self.client.disconnected.add_done_callback(self._on_disconnected)
+                    logger.info("✅ Client connected")
+
+                if not self._authorized:
+                    if not await self.client.is_user_authorized():
+                        if not interactive:
+                            raise NotAuthorizedError(
+                                f"Telegram account '{self.account}' is not logged in - "
+                                f"run `python -m src.messaging.telethon_user_client` first"
+                            )
+                        logger.info("🔐 Starting authentication...")
+                        await self.client.start(phone=self.phone)
+                        logger.info("✅ Telethon client authenticated")
+                    else:
+                        logger.info("✅ Telethon client already authenticated")
+                    self._authorized = True
+
+                self._set_state(ConnectionState.AUTHORIZED)
+            except BaseException as e:
+                if not isinstance(e, asyncio.CancelledError):
+                    logger.error(f"❌ Error in start(): {e}")
+                self._set_state(ConnectionState.DEGRADED)
                 raise
 
+    async def wait_ready(self, timeout: float = 10.0):
+        """
+        Return once the client is usable
+
+        Waits on the ready event while another task is connecting, otherwise
+        connects itself. Raises asyncio.TimeoutError if not ready in time, and
+        NotAuthorizedError rather than starting a login the timeout would cut off.
+        """
+        self.last_used = time.monotonic()
+        if self.is_ready:
+            return
+        if self.state == ConnectionState.CONNECTING:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        else:
+            await asyncio.wait_for(self.start(interactive=False), timeout=timeout)
+
     async def send_message(self, recipient: str, message: str) -> dict:
         """Send message using shared client"""
         try:
-            # Ensure connected
-            await self.start()
+            # Ready event instead of an is_user_authorized() RPC per send
+            await self.wait_ready()
 
             recipient_lower = recipient.lower()
 
@@ -99,32 +247,106 @@ class SharedTelegramClient:
                 target = recipient
                 logger.info(f"📞 Sending to username: {recipient}")
 
-            # Send message
-            sent_message = await self._client.send_message(target, message)
+            # Send message (per-account flood protection)
+            await self.rate_limiter.acquire()
+            sent_message = await self.client.send_message(target, message)
+            get_message_cache(self.account).add(message_record(sent_message))
 
             return {
                 "success": True,
                 "message": f"Message sent to {recipient}",
                 "recipient": recipient,
-                "message_id": sent_message.id
+                "message_id": sent_message.id,
+                "peer_id": utils.get_peer_id(sent_message.peer_id)
             }
 
         except Exception as e:
             logger.error(f"❌ Failed to send message: {e}")
             return {
                 "success": False,
-                "error": str(e),
-                "recipient": recipient
+                "recipient": recipient,
+                **error_details(e)
             }
 
     async def disconnect(self):
         """Disconnect the client"""
-        if self._client and self._client.is_connected():
-            await self._client.disconnect()
+        if self._client and self.client.is_connected():
+            await self.client.disconnect()
             logger.info("🔌 Telethon client disconnected")
+        self._set_state(ConnectionState.DISCONNECTED)
+
+
+class TelegramAccountRegistry:
+    """Per-account shared clients multiplexed on one event loop"""
+
+    def __init__(self, idle_timeout: float = None):
+        """
+        Args:
+            idle_timeout: Seconds without use before an unpinned account disconnects
+                          (default: TELEGRAM_IDLE_DISCONNECT or 600, 0 disables)
+        """
+        self.idle_timeout = float(os.getenv('TELEGRAM_IDLE_DISCONNECT', '600')) if idle_timeout is None else idle_timeout
+        self._clients = {}
+
+    @staticmethod
+    def configured_accounts() -> list:
+        """Accounts from TELEGRAM_ACCOUNTS (comma separated), default first"""
+        names = [name.strip().lower() for name in os.getenv('TELEGRAM_ACCOUNTS', '').split(',') if name.strip()]
+        return [DEFAULT_ACCOUNT] + [name for name in names if name != DEFAULT_ACCOUNT]
+
+    def get(self, account: str = None) -> SharedTelegramClient:
+        """The account's client, created on first request"""
+        account = (account or DEFAULT_ACCOUNT).lower()
+        if account not in self._clients:
+            if account not in self.configured_accounts():
+                raise KeyError(f"Unknown Telegram account '{account}' (add it to TELEGRAM_ACCOUNTS)")
+            self._clients[account] = SharedTelegramClient(account)
+        return self._clients[account]
+
+    def accounts(self) -> dict:
+        """Connection state per configured account"""
+        return {
+            account: self._clients[account].state if account in self._clients else ConnectionState.DISCONNECTED
+            for account in self.configured_accounts()
+        }
+
+    async def disconnect_idle(self) -> int:
+        """Disconnect unpinned accounts unused for idle_timeout - returns how many"""
+        if not self.idle_timeout:
+            return 0
+        now = time.monotonic()
+        idle = [c for c in self._clients.values()
+                if not c.pinned and c.state != ConnectionState.DISCONNECTED and now - c.last_used > self.idle_timeout]
+        for shared in idle:
+            logger.info(f"💤 Disconnecting idle Telegram account {shared.account}")
+            await shared.disconnect()
+        return len(idle)
+
+    async def run_idle_reaper(self, interval: float = 60.0):
+        """Background task: periodically disconnect idle accounts"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.disconnect_idle()
+            except Exception as e:
+                logger.warning(f"⚠️ Idle disconnect failed: {e}")
+
+    async def disconnect_all(self):
+        for shared in self._clients.values():
+            await shared.disconnect()
+
+
+_registry = None
+
+
+def get_account_registry() -> TelegramAccountRegistry:
+    """Get the process-wide account registry"""
+    global _registry
+    if _registry is None:
+        _registry = TelegramAccountRegistry()
+    return _registry
 
 
-# Singleton instance getter
-def get_shared_client() -> SharedTelegramClient:
-    """Get the shared Telegram client instance"""
-    return SharedTelegramClient()
+def get_shared_client(account: str = None) -> SharedTelegramClient:
+    """Get the shared Telegram client for an account (default account if None)"""
+    return get_account_registry().get(account)
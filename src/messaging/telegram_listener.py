@@ -6,11 +6,17 @@ Listens for incoming messages and notifies the voice assistant
 
 import os
 import asyncio
+import inspect
 from telethon import events
+from telethon.tl import types
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
 from .shared_telegram_client import get_shared_client
+from .message_cache import get_message_cache, message_record
+from .notification_queue import NotificationQueue
+from .sender_cache import SenderProfileCache
+from .message_cursor import MessageCursor
 
 # Load environment variables
 config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
@@ -27,17 +33,36 @@ logger = logging.getLogger(__name__)
 class TelegramMessageListener:
     """Listens for incoming Telegram messages and provides callbacks"""
 
-    def __init__(self, on_message_callback=None):
+    def __init__(self, on_message_callback=None, notifications: NotificationQueue = None,
+                 cursor: MessageCursor = None):
         # Use shared client to avoid database locks
         self.shared_client = get_shared_client()
+        self.shared_client.pinned = True  # The listener needs a live connection - never idle-disconnect
         self.client = self.shared_client.client
 
-        # Callback for when a message is received
+        # Callback for when a message is received - called by a single consumer,
+        # once per coalesced batch ("count" > 1 when a sender sent several)
         self.on_message_callback = on_message_callback
+        self.notifications = notifications or NotificationQueue()
+
+        # Sender profiles by id - the message path only does an RPC on a cold miss
+        self.sender_cache = SenderProfileCache(self.shared_client.contact_map)
+
+        # Recent history for the read tools, kept current by this listener
+        self.message_cache = get_message_cache(self.shared_client.account)
+
+        # Last processed message per chat, for catch-up after a disconnect
+        self.cursor = cursor or MessageCursor()
+        self.dialog_limit = int(os.getenv('LISTENER_DIALOG_LIMIT', '200'))
+        self.catchup_limit = int(os.getenv('LISTENER_CATCHUP_LIMIT', '50'))
+        self.catchup_concurrency = int(os.getenv('LISTENER_CATCHUP_CONCURRENCY', '4'))
 
         # Track last received message for reply context
         self.last_message = None
 
+        self._new_message_filter = events.NewMessage(incoming=True, func=lambda e: e.is_private)
+        self._user_update_filter = events.Raw((types.UpdateUserName, types.UpdateUser))
+
         logger.info("✅ Telegram listener initialized")
 
     async def start(self):
@@ -48,51 +73,143 @@ class TelegramMessageListener:
         me = await self.client.get_me()
         logger.info(f"✅ Listening as: {me.first_name} (@{me.username})")
 
-        # Register message handler - ONLY personal messages (no channels/groups)
-        @self.client.on(events.NewMessage(incoming=True, func=lambda e: e.is_private))
-        async def handle_new_message(event):
-            """Handle incoming messages from users only"""
-            try:
-                sender = await event.get_sender()
-                message_text = event.message.message
-
-                # Get sender name (users only, not channels)
-                if hasattr(sender, 'first_name'):
-                    sender_name = sender.first_name or ""
-                    if hasattr(sender, 'last_name') and sender.last_name:
-                        sender_name += f" {sender.last_name}"
-                else:
-                    # Skip non-user messages (channels, etc.)
-                    logger.info(f"⏭️ Skipping non-user message from {sender.title if hasattr(sender, 'title') else 'Unknown'}")
-                    return
-
-                # Get username safely
-                sender_username = getattr(sender, 'username', None)
+        # Live handlers go first so nothing arriving during catch-up is missed (the cursor drops duplicates)
+        self.client.add_event_handler(self._handle_new_message, self._new_message_filter)
+        self.client.add_event_handler(self._handle_user_update, self._user_update_filter)
 
-                # Store message for context
-                self.last_message = {
-                    "sender_id": sender.id,
-                    "sender_name": sender_name,
-                    "sender_username": sender_username,
-                    "message": message_text,
-                    "timestamp": datetime.now()
-                }
+        try:
+            dialogs = await self.client.get_dialogs(limit=self.dialog_limit)
+            self.sender_cache.seed(dialogs)
+            self.message_cache.seed_dialogs(dialogs, complete=len(dialogs) < self.dialog_limit)
+            await self._catch_up(dialogs)
+        except Exception as e:
+            logger.warning(f"⚠️ Startup catch-up failed: {e}")
 
-                logger.info(f"📩 New message from {sender_name}: {message_text}")
+        logger.info("👂 Listening for incoming messages...")
 
-                # Call callback if provided
-                if self.on_message_callback:
-                    await self.on_message_callback(self.last_message)
+        tasks = [
+            asyncio.create_task(self._deliver_notifications()),
+            asyncio.create_task(self._save_cursor_periodically())
+        ]
+        try:
+            # Keep running
+            await self.client.run_until_disconnected()
+        finally:
+            for task in tasks:
+                task.cancel()
+            # The shared client outlives this listener - don't leave handlers behind for the next one
+            self.client.remove_event_handler(self._handle_new_message, self._new_message_filter)
+            self.client.remove_event_handler(self._handle_user_update, self._user_update_filter)
+            self.cursor.save()
+
+    async def _handle_new_message(self, event):
+        """Handle incoming messages from users only"""
+        try:
+            profile = self.sender_cache.get(event.sender_id)
+            if profile is None:
+                # Entities shipped with the update first, RPC only if Telethon doesn't have it
+                sender = event.sender or await event.get_sender()
+                profile = self.sender_cache.put(sender)
+                if profile is None:
+                    # Skip non-user messages (channels, etc.)
+                    logger.info(f"⏭️ Skipping non-user message from {getattr(sender, 'title', 'Unknown')}")
+                    return
 
+            self._enqueue(event.chat_id, event.message, profile)
+
+        except Exception as e:
+            logger.error(f"❌ Error handling message: {e}", exc_info=True)
+
+    async def _handle_user_update(self, update):
+        """Profile changes pushed by Telegram (UserUpdate itself only carries status/typing)"""
+        if isinstance(update, types.UpdateUserName):
+            usernames = [u.username for u in (update.usernames or []) if getattr(u, 'active', True)]
+            self.sender_cache.update_name(
+                update.user_id, update.first_name, update.last_name,
+                usernames[0] if usernames else None
+            )
+        else:
+            self.sender_cache.invalidate(update.user_id)
+
+    def _enqueue(self, chat_id, message, profile: dict, replayed: bool = False) -> bool:
+        """Record the message and queue it for the notification consumer - never waits on the assistant"""
+        if not self.cursor.advance(chat_id, message.id):
+            return False
+        self.message_cache.add(message_record(message, profile["sender_name"]))
+
+        # Store message for context
+        self.last_message = {
+            **profile,
+            "message": message.message,
+            "timestamp": datetime.now()
+        }
+
+        label = "Missed message" if replayed else "New message"
+        logger.info(f"📩 {label} from {profile['sender_name']}: {message.message}")
+        self.notifications.put_nowait(self.last_message)
+        return True
+
+    async def _catch_up(self, dialogs: list):
+        """Replay messages that arrived while disconnected - cost scales with the gap, not history"""
+        first_run = self.cursor.updated_at is None
+        gaps = []
+        for dialog in dialogs:
+            if not dialog.is_user or dialog.message is None:
+                continue
+            last_id = self.cursor.get(dialog.id)
+            if first_run:
+                self.cursor.baseline(dialog.id, dialog.message.id)  # Don't announce old history
+            elif last_id and dialog.message.id > last_id:
+                gaps.append((dialog, last_id, self.catchup_limit))
+            elif not last_id and dialog.unread_count and dialog.date.timestamp() > self.cursor.updated_at:
+                gaps.append((dialog, 0, min(dialog.unread_count, self.catchup_limit)))  # New chat while away
+            elif not last_id:
+                self.cursor.baseline(dialog.id, dialog.message.id)
+
+        if not gaps:
+            return
+
+        semaphore = asyncio.Semaphore(self.catchup_concurrency)
+
+        async def fetch(dialog, min_id, limit):
+            async with semaphore:
+                return await self.client.get_messages(dialog.entity, min_id=min_id, limit=limit)
+
+        results = await asyncio.gather(*(fetch(*gap) for gap in gaps), return_exceptions=True)
+
+        replayed = 0
+        for (dialog, _, _), messages in zip(gaps, results):
+            if isinstance(messages, Exception):
+                logger.warning(f"⚠️ Catch-up failed for {dialog.name}: {messages}")
+                continue
+            profile = self.sender_cache.get(dialog.id) or self.sender_cache.put(dialog.entity)
+            if profile is None:
+                continue
+            for message in reversed(messages):  # Oldest first
+                if not message.out and self._enqueue(dialog.id, message, profile, replayed=True):
+                    replayed += 1
+
+        logger.info(f"📬 Caught up {replayed} missed message(s) across {len(gaps)} chat(s)")
+
+    async def _save_cursor_periodically(self, interval: float = 5.0):
+        while True:
+            await asyncio.sleep(interval)
+            if self.cursor.dirty:
+                self.cursor.save()
+
+    async def _deliver_notifications(self):
+        """Single consumer: hand coalesced notifications to the callback one at a time"""
+        while True:
+            notification = await self.notifications.get()
+            if not self.on_message_callback:
+                continue
+            try:
+                # Awaited, so the queue only releases the next batch once this one was handled
+                result = self.on_message_callback(notification)
+                if inspect.isawaitable(result):
+                    await result
             except Exception as e:
-                logger.error(f"❌ Error handling message: {e}")
-                import traceback
-                traceback.print_exc()
-
-        logger.info("👂 Listening for incoming messages...")
-
-        # Keep running
-        await self.client.run_until_disconnected()
+                logger.error(f"❌ Notification callback error: {e}")
 
     def get_last_sender(self):
         """Get the last person who sent you a message"""
@@ -116,7 +233,7 @@ async def main():
     async def on_message(message):
         """Callback when message is received"""
         print(f"\n🔔 NOTIFICATION:")
-        print(f"   From: {message['sender_name']}")
+        print(f"   From: {message['sender_name']} ({message['count']} new)")
         print(f"   Message: {message['message']}")
         print(f"   Time: {message['timestamp'].strftime('%H:%M:%S')}")
 
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Telegram Session Storage
+Telethon's SQLite session opened in WAL mode with a busy timeout, so the
+assistant and the MCP server process can share one session file without
+"database is locked" errors
+"""
+
+import os
+import sqlite3
+import logging
+from telethon.sessions import SQLiteSession
+from dotenv import load_dotenv
+
+# Load environment variables
+config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
+load_dotenv(config_path)
+
+logger = logging.getLogger(__name__)
+
+
+class WALSQLiteSession(SQLiteSession):
+    """
+    SQLiteSession tuned for several processes
+
+    - WAL journal: readers never block the writer and vice versa
+    - busy timeout: a second writer waits instead of failing immediately
+    - autocommit: every write commits at once, so no process holds the
+      write lock between Telethon's occasional save() calls; multi-statement
+      updates that must not be seen half-done run in explicit transactions
+    """
+
+    def __init__(self, session_id: str = None, busy_timeout: float = None):
+        """
+        Args:
+            session_id: Session file path (".session" is appended like Telethon does)
+            busy_timeout: Seconds to wait for another process's write lock
+                          (default: TELEGRAM_SESSION_BUSY_TIMEOUT or 30)
+        """
+        self.busy_timeout = busy_timeout or float(os.getenv('TELEGRAM_SESSION_BUSY_TIMEOUT', '30'))
+        super().__init__(session_id)
+
+    def _cursor(self):
+        """Open the connection with WAL pragmas on first use, then return a cursor"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.filename, timeout=self.busy_timeout,
+                                         check_same_thread=False, isolation_level=None)
+            self._conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+            if self.filename != ':memory:':
+                mode = self._conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+                if mode.lower() != 'wal':
+                    logger.warning(f"⚠️ Session journal mode is {mode}, not WAL")
+            # WAL keeps the database consistent without an fsync per commit
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        return self._conn.cursor()
+
+    def _update_session_table(self):
+        """Replace the auth key row in one transaction (Telethon deletes, then inserts)"""
+        self._cursor().close()
+        if self._conn.in_transaction:
+            return super()._update_session_table()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            super()._update_session_table()
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self):
+        """Checkpoint the WAL into the main file before closing"""
+        if self._conn is not None:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            except sqlite3.Error as e:
+                logger.debug(f"WAL checkpoint skipped: {e}")
+        super().close()
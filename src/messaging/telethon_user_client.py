@@ -8,7 +8,9 @@ import os
 import asyncio
 from dotenv import load_dotenv
 import logging
-from .shared_telegram_client import get_shared_client
+from telethon import utils
+from .shared_telegram_client import get_shared_client, error_details
+from .message_cache import get_message_cache, message_record
 
 # Load environment variables
 config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', '.env')
@@ -25,13 +27,23 @@ logger = logging.getLogger(__name__)
 class TelethonUserClient:
     """Telegram User client for sending messages from YOUR account"""
 
-    def __init__(self):
+    def __init__(self, account: str = None):
+        """
+        Args:
+            account: Account from TELEGRAM_ACCOUNTS (None for the default account)
+        """
         # Use shared client to avoid database locks
-        self.shared_client = get_shared_client()
-        self.client = self.shared_client.client
+        self.shared_client = get_shared_client(account)
+        self.account = self.shared_client.account
         self.contact_map = self.shared_client.contact_map
+        self.message_cache = get_message_cache(self.account)
+
+        logger.info(f"✅ Telethon user client initialized ({self.account})")
 
-        logger.info("✅ Telethon user client initialized")
+    @property
+    def client(self):
+        """Telethon client (created on first use)"""
+        return self.shared_client.client
 
     async def start(self):
         """Start the client and authenticate if needed"""
@@ -50,9 +62,8 @@ class TelethonUserClient:
             dict with message details
         """
         try:
-            # Start client if not started
-            if not self.client.is_connected():
-                await self.start()
+            # Start client if not started (no RPC once authorized)
+            await self.shared_client.wait_ready()
 
             # Resolve recipient (check contact map first)
             recipient_lower = recipient.lower()
@@ -65,14 +76,17 @@ class TelethonUserClient:
                 # Use as-is (username, phone, or ID)
                 target = recipient
 
-            # Send message
+            # Send message (per-account flood protection)
+            await self.shared_client.rate_limiter.acquire()
             sent_message = await self.client.send_message(target, message)
+            self.message_cache.add(message_record(sent_message))
 
             logger.info(f"✅ Message sent to {recipient}: {message[:50]}...")
 
             return {
                 "success": True,
                 "message_id": sent_message.id,
+                "peer_id": utils.get_peer_id(sent_message.peer_id),
                 "recipient": recipient,
                 "text": message,
                 "date": sent_message.date.isoformat()
@@ -82,14 +96,87 @@ class TelethonUserClient:
             logger.error(f"❌ Failed to send message: {e}")
             return {
                 "success": False,
-                "error": str(e)
+                "recipient": recipient,
+                **error_details(e)
             }
 
+    async def _resolve_chat(self, chat: str) -> int:
+        """Peer id for a contact name, dialog name, @username, phone or id - no RPC when cached"""
+        chat = str(chat).strip()
+        target = self.contact_map.get(chat.lower(), chat)
+        if str(target).lstrip('-').isdigit():
+            return int(target)
+        chat_id = self.message_cache.find_dialog(str(target)) or self.message_cache.find_dialog(chat)
+        if chat_id is not None:
+            return chat_id
+        await self.shared_client.wait_ready()
+        return utils.get_peer_id(await self.client.get_input_entity(target))
+
+    async def get_messages(self, *args, **kwargs):
+        """Telethon get_messages, connecting first - the cache calls this only for gaps"""
+        await self.shared_client.wait_ready()
+        return await self.client.get_messages(*args, **kwargs)
+
+    async def get_dialogs(self, *args, **kwargs):
+        """Telethon get_dialogs, connecting first"""
+        await self.shared_client.wait_ready()
+        return await self.client.get_dialogs(*args, **kwargs)
+
+    async def get_recent_messages(self, chat: str, limit: int = 20, cursor: int = None, sender: str = None) -> dict:
+        """
+        Recent messages of a chat, newest first
+
+        Args:
+            chat: Name, @username, phone or chat id
+            limit: Page size
+            cursor: next_cursor from the previous page
+            sender: Only messages from this person (same forms as chat)
+
+        Returns:
+            dict with messages, next_cursor and source ("cache", "store" or "telegram")
+        """
+        try:
+            chat_id = await self._resolve_chat(chat)
+            sender_id = await self._resolve_chat(sender) if sender else None
+            page = await self.message_cache.get_recent(self, chat_id, limit, cursor, sender_id)
+            return {"success": True, "chat_id": chat_id, **page}
+        except Exception as e:
+            logger.error(f"❌ Failed to get messages: {e}")
+            return {"success": False, **error_details(e)}
+
+    async def search_messages(self, query: str, chat: str = None, limit: int = 20, cursor: str = None) -> dict:
+        """
+        Messages containing query, newest first (one chat, or all if chat is None)
+
+        Returns:
+            dict with messages, next_cursor and source ("cache", "store" or "telegram")
+        """
+        try:
+            chat_id = await self._resolve_chat(chat) if chat else None
+            page = await self.message_cache.search(self, query, chat_id, limit, cursor)
+            return {"success": True, **page}
+        except Exception as e:
+            logger.error(f"❌ Failed to search messages: {e}")
+            return {"success": False, **error_details(e)}
+
+    async def list_dialogs(self, limit: int = 20, cursor: int = 0) -> dict:
+        """
+        Chats by latest activity
+
+        Returns:
+            dict with dialogs, next_cursor and source ("cache" or "telegram")
+        """
+        try:
+            page = await self.message_cache.list_dialogs(self, limit, cursor or 0)
+            return {"success": True, **page}
+        except Exception as e:
+            logger.error(f"❌ Failed to list dialogs: {e}")
+            return {"success": False, **error_details(e)}
+
     async def get_me(self) -> dict:
         """Get information about your account"""
         try:
-            if not self.client.is_connected():
-                await self.start()
+            await self.shared_client.wait_ready()
 
             me = await self.client.get_me()
 
@@ -111,7 +198,7 @@ class TelethonUserClient:
 
     async def disconnect(self):
         """Disconnect the client"""
-        await self.client.disconnect()
+        await self.shared_client.disconnect()
         logger.info("👋 Disconnected")
 
 